@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark answer writes through the journal into each storage backend
+
+For every DATABASE_URL given, answers are recorded from several threads
+and then written out the way the journal's flusher thread does, in
+batches. It reports:
+
+    enqueue   latency of record_user_answer() on the callback path
+    flush     time per answer of journal.flush(), split into the journal
+              file write, the backend's executemany() and the in-memory apply
+    unbatched time per answer of one save_answers() transaction per
+              answer, as a write-through store would do it
+
+Run from the repository root, e.g. against SQLite and a local PostgreSQL:
+
+    createdb quizbot_bench
+    python benchmarks/bench_answer_writes.py \
+        --database-url sqlite:////tmp/quizbot_bench.db postgresql://localhost/quizbot_bench
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DISPATCHER_WORKERS
+from models.quiz import Quiz, Question
+from utils import database
+
+def make_quiz(question_count):
+    """Create and register a quiz with the given number of questions"""
+    quiz = Quiz("Benchmark", "Write latency benchmark", 0)
+    for i in range(question_count):
+        quiz.add_question(Question(f"Question {i}?", ["A", "B", "C", "D"], i % 4))
+    database.add_quiz(quiz)
+    return quiz
+
+class Stopwatch:
+    """Wraps a callable, adding up the time spent in it"""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.seconds = 0.0
+
+    def __call__(self, *args):
+        start = time.perf_counter()
+        try:
+            return self.fn(*args)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+def open_database(database_url, journal_path):
+    """Initialize the database with a journal that only flushes when told to"""
+    database.quizzes.clear()
+    database.users.clear()
+    database.quiz_results.clear()
+    database.quiz_results_by_quiz.clear()
+    database.leaderboards.clear()
+    database.ANSWER_JOURNAL_PATH = journal_path
+    database.ANSWER_JOURNAL_FLUSH_INTERVAL = 3600
+    database.init_database(database_url)
+    database._journal.batch_size = float('inf')
+
+def run(database_url, answers, threads, question_count, batch_size, journal_path):
+    """
+    Benchmark one backend
+
+    Returns:
+        dict: enqueue latencies (ms), and per-answer microseconds of the
+              flush stages and of unbatched writes
+    """
+    open_database(database_url, journal_path)
+    quiz = make_quiz(question_count)
+    journal = database._journal
+    backend = database._backend
+
+    def answer(n):
+        start = time.perf_counter()
+        database.record_user_answer(n % 1000, quiz.id, n % question_count, n % 4, n % 4 == 0)
+        return (time.perf_counter() - start) * 1000
+
+    # Enqueue everything first, then flush it in batches of the flusher's size
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = sorted(pool.map(answer, range(answers)))
+    pending = list(journal._buffer)
+    journal._buffer.clear()
+
+    apply_batch = journal.apply_batch = Stopwatch(journal.apply_batch)
+    if backend is not None:
+        save_answers = backend.save_answers = Stopwatch(backend.save_answers)
+    flush_seconds = 0.0
+    for i in range(0, len(pending), batch_size):
+        journal._buffer.extend(pending[i:i + batch_size])
+        start = time.perf_counter()
+        journal.flush()
+        flush_seconds += time.perf_counter() - start
+
+    per_answer = lambda seconds: seconds / len(pending) * 1e6
+    backend_seconds = save_answers.seconds if backend is not None else 0.0
+    result = {
+        'latencies': latencies,
+        'flush': per_answer(flush_seconds),
+        'journal': per_answer(flush_seconds - apply_batch.seconds),
+        'backend': per_answer(backend_seconds),
+        'apply': per_answer(apply_batch.seconds - backend_seconds),
+        'unbatched': None
+    }
+
+    if backend is not None:
+        # One transaction per answer, as a write-through store would do it
+        save_answers.seconds = 0.0
+        sample = pending[:min(len(pending), 1000)]
+        for record in sample:
+            save_answers([record])
+        result['unbatched'] = save_answers.seconds / len(sample) * 1e6
+
+    database.close_database()
+    database._journal = None
+    return result
+
+def report(label, result):
+    """Print one backend's results"""
+    latencies = result['latencies']
+    p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+    print(f"{label}")
+    print(f"  enqueue    n={len(latencies):<6} mean={statistics.mean(latencies):.3f}ms "
+          f"p50={p(0.5):.3f}ms p99={p(0.99):.3f}ms max={latencies[-1]:.3f}ms")
+    print(f"  flush      {result['flush']:8.1f}us/answer = journal file {result['journal']:.1f} "
+          f"+ backend executemany {result['backend']:.1f} + in-memory apply {result['apply']:.1f}")
+    if result['unbatched'] is not None:
+        speedup = result['unbatched'] / result['backend'] if result['backend'] else float('inf')
+        print(f"  unbatched  {result['unbatched']:8.1f}us/answer in the backend "
+              f"({speedup:.1f}x slower than batched)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", nargs="+",
+                        default=[os.environ.get("BENCH_DATABASE_URL", "postgresql://localhost/quizbot_bench")])
+    parser.add_argument("--answers", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=DISPATCHER_WORKERS)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=500, help="Answers per flush (the journal's batch_size)")
+    parser.add_argument("--no-journal-file", action="store_true", help="Batch without a journal file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i, url in enumerate(["sqlite:///:memory:"] + args.database_url):
+            journal_path = "" if args.no_journal_file else os.path.join(directory, f"answers{i}.journal")
+            label = "memory" if url == "sqlite:///:memory:" else url
+            report(label, run(url, args.answers, args.threads, args.questions, args.batch, journal_path))
+
+if __name__ == "__main__":
+    main()
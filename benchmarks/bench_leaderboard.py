@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark leaderboard updates and rank/top-N queries
+
+Run from the repository root:
+
+    python benchmarks/bench_leaderboard.py --results 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.leaderboard import Leaderboard
+
+def per_call_us(func, calls):
+    """Average microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) * 1e6 / calls
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=10000)
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    board = Leaderboard()
+    start = time.perf_counter()
+    for user_id in range(args.results):
+        board.update(user_id, rng.randint(0, 100), rng.random())
+    elapsed = time.perf_counter() - start
+    print(f"built {args.results} entries in {elapsed:.1f}s ({elapsed * 1e6 / args.results:.1f} us/update)")
+    
+    users = [rng.randrange(args.results) for _ in range(args.queries)]
+    it = iter(users * 3)
+    print(f"update existing user: {per_call_us(lambda: board.update(next(it), rng.randint(0, 100), rng.random()), args.queries):8.1f} us")
+    print(f"my rank:              {per_call_us(lambda: board.rank(next(it)), args.queries):8.1f} us")
+    print(f"top 10:               {per_call_us(lambda: board.top(10), args.queries):8.1f} us")
+    print(f"page 10 at offset:    {per_call_us(lambda: board.top(10, next(it)), args.queries):8.1f} us")
+
+if __name__ == "__main__":
+    main()
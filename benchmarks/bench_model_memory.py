@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure memory per resident question when loading a large question bank
+
+Run from the repository root:
+
+    python benchmarks/bench_model_memory.py --questions 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.quiz import Question
+
+class DictQuestion:
+    """The previous Question layout: a per-instance __dict__ and list options"""
+    
+    def __init__(self, text, options, correct_option, time_limit=None):
+        self.text = text
+        self.options = options
+        self.correct_option = correct_option
+        self.time_limit = time_limit
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['text'], data['options'], data['correct_option'], data.get('time_limit'))
+
+COMMON_OPTIONS = ["All of the above", "None of the above", "True", "False", "Both A and B"]
+
+def make_bank(question_count):
+    """Serialized question bank as it arrives from an import"""
+    rng = random.Random(42)
+    questions = []
+    for i in range(question_count):
+        options = [f"Option {letter} of question {i}" for letter in "AB"] + rng.sample(COMMON_OPTIONS, 2)
+        questions.append({
+            'text': f"Question {i}: which statement about topic {i % 500} is correct?",
+            'options': options,
+            'correct_option': i % 4,
+            'time_limit': None
+        })
+    return json.dumps(questions)
+
+def measure(question_class, bank):
+    """Bytes held by the loaded questions"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    # Decode inside the traced region: decoded strings are what stays resident
+    questions = [question_class.from_dict(data) for data in json.loads(bank)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return used, len(questions)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    args = parser.parse_args()
+    
+    bank = make_bank(args.questions)
+    for label, question_class in (("__dict__ models", DictQuestion), ("slotted models", Question)):
+        used, count = measure(question_class, bank)
+        print(f"{label:<16} {used / 1024 / 1024:8.1f} MiB, {used / count:6.0f} bytes/question")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark outbound Bot API traffic against the fake Bot API server
+
+Every chat gets a countdown edit each second and an interactive message
+(question, feedback or result) every few seconds. The direct mode calls the
+bot from a thread pool like the handlers used to, the queued mode goes
+through OutboundDispatcher and the coalesced mode also sends countdowns
+through CountdownEditor. Run from the repository root:
+
+    python benchmarks/bench_outbound.py --chats 50 --seconds 10
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot
+from telegram.utils.request import Request
+
+from benchmarks.fake_bot_api import serve
+from utils.outbound import OutboundDispatcher, PRIORITY_INTERACTIVE, PRIORITY_COUNTDOWN
+from utils.countdown import CountdownEditor
+
+WORKERS = 8
+
+def run(mode, bot, limits, chats, seconds, interactive_every):
+    """Replay the workload; returns (interactive latencies, failures, 429s)"""
+    latencies = []
+    failures = [0]
+    lock = threading.Lock()
+    rejected_before = limits.rejected
+
+    if mode != "direct":
+        outbound = OutboundDispatcher(bot, workers=WORKERS)
+        outbound.start()
+        editor = CountdownEditor(outbound)
+    else:
+        pool = ThreadPoolExecutor(WORKERS)
+
+    def direct(method, chat_id, started, interactive, **kwargs):
+        try:
+            getattr(bot, method)(chat_id=chat_id, **kwargs)
+        except Exception:
+            with lock:
+                failures[0] += 1
+            return
+        if interactive:
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    def queued_done(future, started, interactive):
+        if future.exception() is not None:
+            with lock:
+                failures[0] += 1
+        elif interactive:
+            with lock:
+                latencies.append(time.monotonic() - started)
+
+    start = time.monotonic()
+    for second in range(seconds):
+        for chat_id in range(1, chats + 1):
+            interactive = (chat_id + second) % interactive_every == 0
+            method = "send_message" if interactive else "edit_message_text"
+            kwargs = {"text": f"t={second}"} if interactive else {"message_id": 1, "text": f"t={second}"}
+            started = time.monotonic()
+            if mode == "coalesced" and not interactive:
+                editor.update(chat_id, 1, kwargs["text"])
+            elif mode != "direct":
+                priority = PRIORITY_INTERACTIVE if interactive else PRIORITY_COUNTDOWN
+                future = outbound.submit(method, chat_id, priority, **kwargs)
+                future.add_done_callback(lambda f, s=started, i=interactive: queued_done(f, s, i))
+            else:
+                pool.submit(direct, method, chat_id, started, interactive, **kwargs)
+        delay = start + second + 1 - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    if mode != "direct":
+        while outbound.pending():
+            time.sleep(0.1)
+        outbound.stop()
+    else:
+        pool.shutdown(wait=True)
+    return latencies, failures[0], limits.rejected - rejected_before
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--interactive-every", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake server latency per call")
+    args = parser.parse_args()
+
+    server, limits = serve(latency=args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bot"
+    bot = Bot("123456:FAKE", base_url=base_url, request=Request(con_pool_size=WORKERS + 2))
+
+    for mode in ("direct", "queued", "coalesced"):
+        started = time.monotonic()
+        latencies, failures, rejected = run(
+            mode, bot, limits, args.chats, args.seconds, args.interactive_every
+        )
+        elapsed = time.monotonic() - started
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0
+        print(f"{mode:>9}: {elapsed:5.1f}s, 429 responses {rejected:5d}, failed calls {failures:5d}, "
+              f"interactive delivered {len(latencies)} (p50 {p50:.0f} ms, p99 {p99:.0f} ms)")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the memory copies and disk writes of handing a PDF upload to the importer
+
+Compares the old handling (download into a BytesIO, getvalue(), write a
+NamedTemporaryFile, reopen it for PyMuPDF and read it again for PyPDF2)
+with keeping the downloaded bytes object, and with spooling large uploads
+to a file that workers open by path. For each it reports the peak Python
+memory while the document is received and opened, the bytes written to
+disk, and the bytes pickled to the workers of a parallel import. Run from
+the repository root:
+
+    python benchmarks/bench_pdf_buffers.py --pages 500 3000 --workers 4
+"""
+
+import argparse
+import io
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_corpus import build_pdf
+from utils.pdf_import import open_pdf
+
+class FakeFile:
+    """telegram.File stand-in; download() gets a fresh bytes object like Request.retrieve()"""
+
+    def __init__(self, data):
+        self._data = data
+
+    def download(self, custom_path=None, out=None):
+        buf = bytes(memoryview(self._data))
+        if out is not None:
+            out.write(buf)
+            return out
+        with open(custom_path, 'wb') as f:
+            f.write(buf)
+        return custom_path
+
+class DownloadBuffer:
+    def write(self, data):
+        self.data = data
+
+def old_handling(file):
+    file_bytes = io.BytesIO()
+    file.download(out=file_bytes)
+    file_bytes.seek(0)
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
+        temp_file.write(file_bytes.getvalue())
+        path = temp_file.name
+    import fitz
+    doc = fitz.open(path)
+    doc.load_page(0).get_text()
+    doc.close()
+    with open(path, 'rb') as f:
+        all_bytes = f.read()
+    written = os.path.getsize(path)
+    os.unlink(path)
+    return file_bytes.getvalue(), written, all_bytes
+
+def in_memory_handling(file):
+    buffer = DownloadBuffer()
+    file.download(out=buffer)
+    with open_pdf(buffer.data) as (doc, _):
+        doc.load_page(0).get_text()
+    return buffer.data, 0
+
+def spooled_handling(file):
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    file.download(custom_path=path)
+    with open_pdf(path) as (doc, _):
+        doc.load_page(0).get_text()
+    written = os.path.getsize(path)
+    return path, written
+
+def measure(handling, file, workers):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = handling(file)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    source, written = result[0], result[1]
+    pickled = len(pickle.dumps(source)) * workers
+    if isinstance(source, str):
+        os.unlink(source)
+    return elapsed, peak, written, pickled
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[500, 3000])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'handling':<10}{'pages':>6}{'size MB':>9}{'time ms':>9}{'peak MB':>9}{'disk MB':>9}{'to workers MB':>15}")
+    for pages in args.pages:
+        data, _ = build_pdf("numbered", pages)
+        file = FakeFile(data)
+        for name, handling in (("old", old_handling), ("bytes", in_memory_handling), ("spooled", spooled_handling)):
+            elapsed, peak, written, pickled = measure(handling, file, args.workers)
+            print(f"{name:<10}{pages:>6}{len(data) / 2**20:>9.2f}{elapsed * 1000:>9.1f}{peak / 2**20:>9.2f}"
+                  f"{written / 2**20:>9.2f}{pickled / 2**20:>15.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark the streaming PDF question import
+
+For every layout and size of the generated corpus (see pdf_corpus.py) this
+prints the time spent extracting, tokenizing and parsing, checks the
+questions against the ones rendered into the PDF, and compares peak Python
+memory with the old approach of joining all page text before parsing.
+Run from the repository root:
+
+    python benchmarks/bench_pdf_import.py --pages 10 100 500
+"""
+
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_corpus import LAYOUTS, build_pdf
+from utils.pdf_import import ImportStats, iter_pages, iter_questions, parse_pdf_questions, tokenize
+
+def concatenated_import(data):
+    """What the old parsers did: the whole document's text as one string, then parse"""
+    all_text = ""
+    for page in iter_pages(data):
+        all_text += page + "\n"
+    return list(iter_questions(tokenize([all_text])))
+
+def peak_memory(fn, data):
+    tracemalloc.start()
+    try:
+        fn(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--layouts", nargs="+", default=list(LAYOUTS), choices=LAYOUTS)
+    args = parser.parse_args()
+
+    print(f"{'layout':<17}{'pages':>6}{'questions':>10}{'extract':>9}{'tokenize':>9}{'parse':>8}"
+          f"{'total':>8}{'q/s':>8}{'peak MB':>9}{'joined MB':>10}")
+    failed = False
+    for layout in args.layouts:
+        for pages in args.pages:
+            data, expected = build_pdf(layout, pages)
+
+            stats = ImportStats()
+            questions = parse_pdf_questions(data, stats)
+            if questions != expected:
+                wrong = sum(1 for got, want in zip(questions, expected) if got != want)
+                wrong += abs(len(questions) - len(expected))
+                print(f"  {layout} {pages}p: {wrong} of {len(expected)} questions differ")
+                failed = True
+
+            streaming_peak = peak_memory(parse_pdf_questions, data)
+            joined_peak = peak_memory(concatenated_import, data)
+
+            print(
+                f"{layout:<17}{pages:>6}{stats.questions:>10}{stats.extract_seconds:>8.2f}s"
+                f"{stats.tokenize_seconds:>8.2f}s{stats.parse_seconds:>7.2f}s{stats.total_seconds:>7.2f}s"
+                f"{stats.questions / stats.total_seconds:>8.0f}"
+                f"{streaming_peak / 2**20:>9.1f}{joined_peak / 2**20:>10.1f}"
+            )
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
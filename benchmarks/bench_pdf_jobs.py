@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark how much a PDF import stalls the dispatcher threads
+
+A thread standing in for a dispatcher worker wakes every few milliseconds,
+like a handler answering a quiz callback, and records how late each wake-up
+is. The same PDFs are then imported inline on another thread (what the
+handler used to do) and through the PDF import pool. Run from the
+repository root:
+
+    python benchmarks/bench_pdf_jobs.py --pages 500 --uploads 2
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_corpus import build_pdf
+from utils.pdf_import import parse_pdf_questions
+from utils.pdf_jobs import PDFImportPool
+
+INTERVAL = 0.005
+
+def measure_lateness(run):
+    """Run the imports while a ticking thread records its lateness; returns (seconds, lateness list)"""
+    lateness = []
+    stop = threading.Event()
+
+    def tick():
+        while not stop.is_set():
+            expected = time.perf_counter() + INTERVAL
+            time.sleep(INTERVAL)
+            lateness.append(time.perf_counter() - expected)
+
+    ticker = threading.Thread(target=tick)
+    ticker.start()
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    ticker.join()
+    return elapsed, sorted(lateness)
+
+def report(label, elapsed, lateness):
+    p50 = lateness[len(lateness) // 2] * 1000
+    p99 = lateness[int(len(lateness) * 0.99)] * 1000
+    print(f"{label:<8} imports took {elapsed:6.2f}s, tick lateness p50 {p50:6.2f} ms, "
+          f"p99 {p99:7.2f} ms, max {lateness[-1] * 1000:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--uploads", type=int, default=2, help="Imports run at the same time")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    data, expected = build_pdf("numbered", args.pages)
+    print(f"{args.uploads} uploads of {args.pages} pages ({len(expected)} questions each)")
+
+    def run_inline():
+        threads = [threading.Thread(target=parse_pdf_questions, args=(data,)) for _ in range(args.uploads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    pool = PDFImportPool(workers=args.workers, max_jobs=args.uploads, per_admin=args.uploads)
+    started = time.perf_counter()
+    pool.start()
+    # Wait for the warm-up so it isn't counted below
+    pool.submit(0, build_pdf("numbered", 1)[0], lambda job: None)[0].future.result()
+    print(f"pool of {args.workers} started and warmed up in {time.perf_counter() - started:.2f}s")
+
+    def run_pool():
+        jobs = [pool.submit(0, data, lambda job: None)[0] for _ in range(args.uploads)]
+        for job in jobs:
+            questions, _ = job.result()
+            assert questions == expected
+
+    report("inline", *measure_lateness(run_inline))
+    report("pool", *measure_lateness(run_pool))
+    pool.stop()
+
+if __name__ == "__main__":
+    main()
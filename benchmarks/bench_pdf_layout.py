@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark layout-aware PDF extraction on a bilingual two-column bank
+
+Imports an English/Hindi question bank laid out in two columns, with the
+options in a grid and the correct answers printed in bold or red, once
+with plain text extraction and once with layout-aware extraction. For
+each it reports the time, how many questions came out exactly as written
+and with the right answer, and the peak Python memory while streaming
+the questions without keeping them, which should not grow with the page
+count. Needs PyMuPDF. Run from the repository root:
+
+    python benchmarks/bench_pdf_layout.py --pages 50 200
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_corpus import build_bilingual_pdf
+from utils.pdf_import import iter_pdf_questions
+
+def timed_import(data, layout, repeat):
+    """Best elapsed time of a few imports, with the questions of the last one"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        questions = list(iter_pdf_questions(data, layout=layout))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, questions
+
+def streaming_peak(data, layout):
+    """Peak traced memory while consuming the questions one by one"""
+    tracemalloc.start()
+    for _ in iter_pdf_questions(data, layout=layout):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'pages':>6}{'questions':>11}{'found':>7}{'exact':>7}{'answers':>9}"
+          f"{'time s':>8}{'ms/page':>9}{'peak MB':>9}")
+    for pages in args.pages:
+        data, expected = build_bilingual_pdf(pages)
+        by_text = {question['question']: question for question in expected}
+        for mode, layout in (("plain", False), ("layout", True)):
+            elapsed, questions = timed_import(data, layout, args.repeat)
+            exact = sum(1 for question in questions if by_text.get(question['question']) == question)
+            answers = sum(
+                1 for question in questions
+                if question['question'] in by_text
+                and by_text[question['question']]['correct_answer'] == question['correct_answer']
+            )
+            peak = streaming_peak(data, layout)
+            print(f"{mode:<8}{pages:>6}{len(expected):>11}{len(questions):>7}{exact:>7}{answers:>9}"
+                  f"{elapsed:>8.2f}{elapsed / pages * 1000:>9.1f}{peak / 2**20:>9.2f}")
+
+if __name__ == "__main__":
+    main()
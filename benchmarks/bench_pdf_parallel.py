@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark parallel per-page-range PDF imports
+
+Imports the same large question bank through PDF import pools of growing
+size, each splitting the document into one page range per worker, and
+reports the speedup over a single worker. Questions in the corpus run on
+across pages, so every run also checks that questions crossing a range
+boundary come out the same as in a serial import. Run from the repository
+root, on a machine with at least as many cores as the largest pool:
+
+    python benchmarks/bench_pdf_parallel.py --pages 300 500 --workers 1 2 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_corpus import build_pdf
+from utils.pdf_jobs import PDFImportPool
+
+def timed_import(pool, data, repeat):
+    """Best elapsed time of a few imports, with the questions of the last one"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        job, _ = pool.submit(0, data, lambda job: None)
+        questions, _ = job.result()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, questions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[300, 500])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--layout", default="numbered")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs available")
+    documents = {pages: build_pdf(args.layout, pages, flow=True) for pages in args.pages}
+
+    baseline = {}
+    failed = False
+    for workers in args.workers:
+        pool = PDFImportPool(workers=workers, max_jobs=1, per_admin=1, parallel_pages=1)
+        pool.start()
+        # Wait for the warm-up so it isn't counted
+        pool.submit(0, build_pdf(args.layout, 1)[0], lambda job: None)[0].future.result()
+
+        for pages, (data, expected) in documents.items():
+            elapsed, questions = timed_import(pool, data, args.repeat)
+            if questions != expected:
+                print(f"  {workers} workers, {pages} pages: questions differ from the serial import")
+                failed = True
+            baseline.setdefault(pages, elapsed)
+            print(f"{workers} workers, {pages:>4} pages: {elapsed:6.2f}s, "
+                  f"{len(questions) / elapsed:6.0f} questions/s, speedup {baseline[pages] / elapsed:4.2f}x")
+        pool.stop()
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
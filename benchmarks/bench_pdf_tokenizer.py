@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark of PDF line classification
+
+Classifies a synthetic question bank of about a million lines, in every
+layout of the corpus, with the importer's tokenizer and with the per-line
+approach of the old parsers (three re.search calls with inline patterns
+per line, then scans for each check mark). Only text handling is timed;
+no PDF is involved. Run from the repository root:
+
+    python benchmarks/bench_pdf_tokenizer.py --lines 1000000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_corpus import LAYOUTS, make_questions, render_question
+from utils.pdf_import import tokenize
+
+def make_lines(count):
+    """Question bank text lines cycling through the layouts"""
+    lines = []
+    questions = make_questions(count // 6 + 1)
+    for number, question in enumerate(questions, 1):
+        lines.extend(render_question(LAYOUTS[number % len(LAYOUTS)], number, question))
+        lines.append("")
+        if len(lines) >= count:
+            break
+    return lines[:count]
+
+def legacy_classify(lines):
+    """Line handling of the removed extract_and_parse_questions, without its logging"""
+    kinds = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        kind = 'text'
+        if re.search(r'(?:Q|q)?\.?\s*(\d+)\.?\s+(.+)', line):
+            kind = 'question'
+        option_match = re.search(r'(?:\()?([A-Da-d])(?:\))?\.?\s+(.+)', line)
+        if option_match:
+            kind = 'option'
+            if "✓" in line or "✔" in line or "√" in line:
+                kind = 'marked option'
+        if re.search(r'(?:Correct|Answer|Ans):\s*([A-Da-d])', line, re.IGNORECASE):
+            kind = 'answer'
+        if "correct" in line.lower():
+            kind = 'answer'
+        kinds.append(kind)
+    return kinds
+
+def count_tokens(pages):
+    """Consume tokenize() the way the importer does, without keeping the tokens"""
+    count = 0
+    for _ in tokenize(pages):
+        count += 1
+    return count
+
+def run(label, fn, lines, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(lines)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<10} {best:6.2f}s  {len(lines) / best / 1e6:5.2f}M lines/s  ({result} tokens)")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines)
+    print(f"{len(lines)} lines, {sum(len(line) for line in lines) / 2**20:.1f} MB of text")
+
+    legacy = run("legacy", lambda _: len(legacy_classify(lines)), lines, args.repeat)
+    # tokenize() takes page texts; one page per 50 lines, as in the corpus
+    pages = ["\n".join(lines[i:i + 50]) for i in range(0, len(lines), 50)]
+    current = run("tokenize", lambda _: count_tokens(pages), lines, args.repeat)
+    print(f"speedup {legacy / current:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark per-quiz report latency: full scan of quiz_results against the per-quiz index
+
+Run from the repository root:
+
+    python benchmarks/bench_quiz_results.py --users 100000 --quizzes 50
+
+Each user takes --per-user of the quizzes (all of them with --per-user 50,
+which needs several GB of memory).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import database
+
+def scan_quiz_results(quiz_id):
+    """The previous get_quiz_results: a scan over every user's results"""
+    results = []
+    for user_id, user_results in database.quiz_results.items():
+        if quiz_id in user_results:
+            results.append({
+                'user_id': user_id,
+                'result': user_results[quiz_id]
+            })
+    return results
+
+def populate(users, quizzes, per_user):
+    """Fill the in-memory store with random results"""
+    rng = random.Random(42)
+    quiz_ids = [f"quiz{i:04d}" for i in range(quizzes)]
+    for user_id in range(users):
+        for quiz_id in rng.sample(quiz_ids, per_user):
+            database.record_quiz_result(user_id, quiz_id, rng.randint(0, 20), 20, [])
+    return quiz_ids
+
+def timed(func, quiz_ids):
+    """Average milliseconds per call over all quizzes"""
+    start = time.perf_counter()
+    for quiz_id in quiz_ids:
+        func(quiz_id)
+    return (time.perf_counter() - start) * 1000 / len(quiz_ids)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--quizzes", type=int, default=50)
+    parser.add_argument("--per-user", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+    
+    database.init_database()
+    start = time.perf_counter()
+    quiz_ids = populate(args.users, args.quizzes, min(args.per_user, args.quizzes))
+    print(f"populated {args.users} users x {args.per_user} of {args.quizzes} quizzes "
+          f"in {time.perf_counter() - start:.1f}s")
+    
+    print(f"full scan (before):         {timed(scan_quiz_results, quiz_ids):8.3f} ms/report")
+    print(f"index lookup (after):       {timed(database.get_quiz_results, quiz_ids):8.3f} ms/report")
+    print(f"first page sorted by score: {timed(lambda q: database.get_quiz_results_page(q, 0, args.page_size), quiz_ids):8.3f} ms/report")
+
+if __name__ == "__main__":
+    main()
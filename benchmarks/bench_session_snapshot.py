@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark session snapshot cost and restore time
+
+Sessions are held in a SessionManager and snapshotted under its session
+locks, as the bot does. Reported:
+
+    first snapshot        every session encoded, as when they all start at once
+    incremental snapshot  a typical tick, 5% of the sessions changed
+    restore               loading the file, then the first snapshot after
+                          adopting the restored sessions
+
+Run from the repository root:
+
+    python benchmarks/bench_session_snapshot.py --sessions 10000
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.quiz import Quiz, Question
+from utils.quiz_manager import QuizSession
+from utils.session_manager import SessionManager
+from utils.session_store import SessionSnapshotter
+
+def make_quiz(question_count):
+    quiz = Quiz("Benchmark", "Snapshot benchmark", 1, 30)
+    for i in range(question_count):
+        quiz.add_question(Question(f"Question {i}?", ["A", "B", "C", "D"], i % 4))
+    return quiz
+
+def advance(session, rng):
+    """Answer the current question without going through the answer journal"""
+    index = session.current_question_index
+    if index < len(session.selected_options):
+        session.selected_options[index] = rng.randrange(4)
+    session.move_to_next_question()
+    session.set_current_message(session.user_id, index + 1, time.time() + 30)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    quiz = make_quiz(args.questions)
+    sessions = SessionManager(args.sessions)
+    for user_id in range(args.sessions):
+        session = QuizSession(user_id, quiz)
+        advance(session, rng)
+        sessions.add(user_id, session)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sessions.snapshot")
+        snapshotter = SessionSnapshotter(path, sessions, session_lock=sessions.lock)
+        
+        # Collect the setup's garbage so its collection isn't timed
+        gc.collect()
+        start = time.perf_counter()
+        snapshotter.snapshot()
+        full = time.perf_counter() - start
+        print(f"first snapshot, all {args.sessions} sessions: {full * 1000:.2f} ms "
+              f"({full * 1000 * 1000 / args.sessions:.2f} ms per 1k)")
+        
+        # Typical tick: a few percent of the sessions answered since the last one
+        changed = max(1, args.sessions // 20)
+        total = 0.0
+        for _ in range(args.rounds):
+            for user_id in rng.sample(range(args.sessions), changed):
+                advance(sessions[user_id], rng)
+            gc.collect()
+            start = time.perf_counter()
+            snapshotter.snapshot()
+            total += time.perf_counter() - start
+        per_round = total / args.rounds
+        print(f"incremental snapshot, {changed} changed of {args.sessions}: {per_round * 1000:.2f} ms "
+              f"({per_round * 1000 * 1000 / args.sessions:.3f} ms per 1k sessions)")
+        
+        for user_id in range(0, args.sessions, 10):
+            del sessions[user_id]
+        snapshotter.snapshot()
+        snapshotter.close()
+        
+        restored = SessionManager(args.sessions)
+        snapshotter = SessionSnapshotter(path, restored, session_lock=restored.lock)
+        start = time.perf_counter()
+        states = snapshotter.load()
+        elapsed = time.perf_counter() - start
+        print(f"restore: {len(states)} sessions from {os.path.getsize(path) / 1024:.0f} KB in {elapsed * 1000:.1f} ms")
+        
+        for user_id, session in sessions.items():
+            state = states[user_id]
+            assert state.current_question_index == session.current_question_index
+            assert state.selected_options == session.selected_options
+        assert len(states) == len(sessions)
+        
+        # Rebuilt the way restore_sessions() does it
+        for state in states.values():
+            session = QuizSession(state.user_id, quiz)
+            session.current_question_index = state.current_question_index
+            session.selected_options = state.selected_options
+            session.correct_bits = state.correct_bits
+            session.set_current_message(state.chat_id, state.message_id, state.deadline, state.poll_id)
+            snapshotter.adopt(session, state)
+            restored.add(session.user_id, session)
+        size = os.path.getsize(path)
+        gc.collect()
+        start = time.perf_counter()
+        snapshotter.snapshot()
+        elapsed = time.perf_counter() - start
+        print(f"first snapshot after restore: {elapsed * 1000:.2f} ms "
+              f"({elapsed * 1000 * 1000 / len(states):.3f} ms per 1k), {os.path.getsize(path) - size} bytes written")
+        snapshotter.close()
+
+if __name__ == "__main__":
+    main()
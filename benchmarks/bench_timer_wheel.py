@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark timer wheel arm/cancel cost and firing lag
+
+Run from the repository root:
+
+    python benchmarks/bench_timer_wheel.py --timers 100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.timer_wheel import TimerWheel
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--timers", type=int, default=100000)
+    parser.add_argument("--spread", type=float, default=5.0, help="Timers are due within this many seconds")
+    parser.add_argument("--tick", type=float, default=0.1)
+    args = parser.parse_args()
+    
+    rng = random.Random(42)
+    wheel = TimerWheel(tick=args.tick)
+    wheel.start()
+    
+    lags = []
+    lock = threading.Lock()
+    
+    def fired(due):
+        lag = time.monotonic() - due
+        with lock:
+            lags.append(lag)
+    
+    delays = [rng.uniform(0, args.spread) for _ in range(args.timers)]
+    start = time.perf_counter()
+    for user_id, delay in enumerate(delays):
+        wheel.schedule(delay, fired, time.monotonic() + delay, key=f"time_up_{user_id}")
+    arm_us = (time.perf_counter() - start) * 1e6 / args.timers
+    
+    # Answering a question re-arms its deadline; model that for a third of the users
+    start = time.perf_counter()
+    rearmed = range(0, args.timers, 3)
+    for user_id in rearmed:
+        delay = rng.uniform(0, args.spread)
+        wheel.schedule(delay, fired, time.monotonic() + delay, key=f"time_up_{user_id}")
+    rearm_us = (time.perf_counter() - start) * 1e6 / len(rearmed)
+    
+    start = time.perf_counter()
+    cancelled = range(1, args.timers, 3)
+    for user_id in cancelled:
+        wheel.cancel(f"time_up_{user_id}")
+    cancel_us = (time.perf_counter() - start) * 1e6 / len(cancelled)
+    
+    # Every timer is due within the spread
+    while len(wheel):
+        time.sleep(args.tick)
+    time.sleep(1)
+    wheel.stop()
+    
+    lags.sort()
+    print(f"arm:    {arm_us:6.2f} us")
+    print(f"re-arm: {rearm_us:6.2f} us")
+    print(f"cancel: {cancel_us:6.2f} us")
+    print(f"fired {len(lags)}; lag p50 {lags[len(lags) // 2] * 1000:.0f} ms, "
+          f"p99 {lags[int(len(lags) * 0.99)] * 1000:.0f} ms, max {lags[-1] * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Minimal fake Telegram Bot API server with Telegram-like rate limits
+
+Implements enough of sendMessage, editMessageText, answerCallbackQuery and
+getMe for the bot's outbound traffic, and answers 429 with retry_after
+once the global or per-chat limits are exceeded. Point the bot at it with
+
+    python benchmarks/fake_bot_api.py --port 8081
+    BOT_API_BASE_URL=http://127.0.0.1:8081/bot python standalone.py
+"""
+
+import argparse
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class RateLimits:
+    """Token buckets mirroring Telegram's documented limits"""
+
+    def __init__(self, global_rate=30, chat_rate=1.0, chat_burst=3, latency=0.0):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._global = [global_rate, time.monotonic()]
+        self._chats = {}
+        self.accepted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _take(bucket, rate, capacity, now):
+        tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0
+        bucket[0] = tokens
+        return math.ceil((1 - tokens) / rate)
+
+    def check(self, chat_id):
+        """Count a message; returns retry_after seconds, or 0 if it is allowed"""
+        with self._lock:
+            now = time.monotonic()
+            chat = self._chats.setdefault(chat_id, [self.chat_burst, now])
+            retry_after = self._take(chat, self.chat_rate, self.chat_burst, now)
+            if not retry_after:
+                retry_after = self._take(self._global, self.global_rate, self.global_rate, now)
+                if retry_after:
+                    # Refund the chat token; the message was not delivered
+                    chat[0] += 1
+            if retry_after:
+                self.rejected += 1
+            else:
+                self.accepted += 1
+            return retry_after
+
+def make_handler(limits):
+    """Build a request handler class bound to a set of rate limits"""
+    message_ids = iter(range(1, 1 << 62))
+    message_ids_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _params(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            if not body:
+                return {}
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                return json.loads(body)
+            from urllib.parse import parse_qsl
+            return dict(parse_qsl(body.decode()))
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            method = self.path.rsplit("/", 1)[-1]
+            params = self._params()
+            if limits.latency:
+                time.sleep(limits.latency)
+
+            if method == "getMe":
+                self._reply(200, {"ok": True, "result": {
+                    "id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"
+                }})
+                return
+            if method == "answerCallbackQuery":
+                self._reply(200, {"ok": True, "result": True})
+                return
+            if method not in ("sendMessage", "editMessageText"):
+                self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                return
+
+            chat_id = int(params["chat_id"])
+            retry_after = limits.check(chat_id)
+            if retry_after:
+                self._reply(429, {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after}
+                })
+                return
+
+            if method == "sendMessage":
+                with message_ids_lock:
+                    message_id = next(message_ids)
+            else:
+                message_id = int(params["message_id"])
+            self._reply(200, {"ok": True, "result": {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", "")
+            }})
+
+        do_GET = do_POST
+
+    return Handler
+
+def serve(port=0, **limit_options):
+    """
+    Start the fake server on a background thread
+
+    Returns:
+        tuple: (server, limits); server.server_address[1] is the bound port
+    """
+    limits = RateLimits(**limit_options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(limits))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-bot-api", daemon=True).start()
+    return server, limits
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--chat-rate", type=float, default=1.0)
+    parser.add_argument("--chat-burst", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every call")
+    args = parser.parse_args()
+
+    server, limits = serve(
+        args.port, global_rate=args.global_rate, chat_rate=args.chat_rate,
+        chat_burst=args.chat_burst, latency=args.latency
+    )
+    print(f"Fake Bot API listening on http://127.0.0.1:{server.server_address[1]}/bot")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"accepted {limits.accepted}, rejected with 429: {limits.rejected}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Sample question-bank PDFs for the PDF import benchmarks
+
+The corpus is generated with reportlab (already a dependency for result
+PDFs) instead of being checked in, one file per layout the importer
+accepts, each in several sizes. Every document comes with the questions
+it contains, so benchmarks can check what they parsed.
+
+build_bilingual_pdf() makes a different kind of bank, written with
+PyMuPDF since reportlab can't embed its Devanagari font: English and
+Hindi on two columns typeset row by row, options in a 2x2 grid, and
+the correct option printed in bold or in red instead of being named.
+
+Run from the repository root to write the corpus to a directory:
+
+    python benchmarks/pdf_corpus.py --out /tmp/pdf_corpus --pages 10 100 500
+"""
+
+import argparse
+import io
+import os
+import random
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+# Bitstream Vera ships with reportlab and has the √ check mark
+FONT = "Vera"
+FONT_SIZE = 10
+LINE_HEIGHT = 14
+MARGIN = 50
+
+LAYOUTS = ("numbered", "checkmark", "inline", "numbered_options")
+
+WORDS = (
+    "which", "river", "capital", "largest", "element", "planet", "author", "century",
+    "equation", "velocity", "protein", "empire", "treaty", "ocean", "mountain", "language",
+    "constitution", "molecule", "festival", "dynasty", "temperature", "currency", "satellite"
+)
+
+HINDI_WORDS = (
+    "नदी", "राजधानी", "सबसे", "विशाल", "तत्व", "ग्रह", "लेखक", "शताब्दी",
+    "समीकरण", "वेग", "प्रोटीन", "साम्राज्य", "संधि", "महासागर", "पर्वत", "भाषा",
+    "संविधान", "अणु", "त्योहार", "राजवंश", "तापमान", "मुद्रा", "उपग्रह"
+)
+RED = (0.8, 0, 0)
+
+def _register_font():
+    if FONT not in pdfmetrics.getRegisteredFontNames():
+        import reportlab
+        path = os.path.join(os.path.dirname(reportlab.__file__), "fonts", "Vera.ttf")
+        pdfmetrics.registerFont(TTFont(FONT, path))
+
+def make_questions(count, seed=1):
+    """
+    Random questions in the importer's output format
+
+    Every fifth question text is long enough to wrap onto a second line.
+    """
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        length = 22 if len(questions) % 5 == 4 else rng.randint(6, 10)
+        text = " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + "?"
+        options = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) for _ in range(4)]
+        questions.append({'question': text, 'options': options, 'correct_answer': rng.randint(1, 4)})
+    return questions
+
+def _wrap(text, width=80):
+    lines = []
+    while len(text) > width:
+        cut = text.rfind(" ", 0, width)
+        lines.append(text[:cut])
+        text = text[cut + 1:]
+    lines.append(text)
+    return lines
+
+def render_question(layout, number, question):
+    """Text lines of one question in a layout"""
+    letters = "ABCD"
+    correct = question['correct_answer']
+    stem = _wrap(question['question'])
+    options = question['options']
+
+    if layout == "numbered":
+        lines = [f"{number}. {stem[0]}"] + stem[1:]
+        lines += [f"{letters[i]}) {option}" for i, option in enumerate(options)]
+        lines.append(f"Correct: {letters[correct - 1]}")
+    elif layout == "checkmark":
+        lines = [f"Q{number}. {stem[0]}"] + stem[1:]
+        lines += [
+            f"({letters[i]}) {option}" + (" √" if i + 1 == correct else "")
+            for i, option in enumerate(options)
+        ]
+    elif layout == "inline":
+        lines = [f"Q {number}. {stem[0]}"] + stem[1:]
+        marked = [f"({letters[i]}) {option}" for i, option in enumerate(options)]
+        lines += ["   ".join(marked[:2]), "   ".join(marked[2:])]
+        lines.append(f"Ans: {letters[correct - 1]}")
+    else:
+        lines = [f"Question: {stem[0]}"] + stem[1:]
+        lines += [f"{i + 1}. {option}" for i, option in enumerate(options)]
+        lines.append(f"Answer: {correct}")
+    return lines
+
+def build_pdf(layout, pages, seed=1, flow=False):
+    """
+    Render a question bank
+
+    Args:
+        layout (str): One of LAYOUTS
+        pages (int): Number of pages
+        flow (bool): Let questions run over onto the next page instead of
+                     starting each one on the page it fits on
+
+    Returns:
+        tuple: (PDF bytes, list of the questions it contains)
+    """
+    _register_font()
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    lines_per_page = int((height - 2 * MARGIN) // LINE_HEIGHT)
+
+    # Enough questions to fill the pages; the shortest layout takes 5 lines
+    questions = make_questions(pages * lines_per_page // 5 + 1, seed)
+    placed = []
+    page = 0
+    y = height - MARGIN
+    for question in questions:
+        lines = render_question(layout, len(placed) + 1, question)
+        if y - LINE_HEIGHT * len(lines) < MARGIN:
+            if flow and page < pages - 1:
+                # Fill the rest of the page and continue on the next one
+                while y >= MARGIN:
+                    pdf.setFont(FONT, FONT_SIZE)
+                    pdf.drawString(MARGIN, y, lines.pop(0))
+                    y -= LINE_HEIGHT
+            pdf.showPage()
+            page += 1
+            y = height - MARGIN
+            if page == pages:
+                break
+        pdf.setFont(FONT, FONT_SIZE)
+        for line in lines:
+            pdf.drawString(MARGIN, y, line)
+            y -= LINE_HEIGHT
+        y -= LINE_HEIGHT
+        placed.append(question)
+    else:
+        pdf.showPage()
+
+    pdf.save()
+    return buffer.getvalue(), placed
+
+def make_bilingual_questions(count, seed=1):
+    """
+    Random questions with English and Hindi text
+
+    Returns:
+        list: (question in the importer's output format, English stem,
+              Hindi stem, English options, Hindi options)
+    """
+    rng = random.Random(seed)
+    # Short option words keep a wide gap between the columns of the option grid
+    english_words = [word for word in WORDS if len(word) <= 8]
+    hindi_words = [word for word in HINDI_WORDS if len(word) <= 6]
+    questions = []
+    for i in range(count):
+        length = 14 if i % 4 == 3 else rng.randint(5, 8)
+        english = " ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + "?"
+        hindi = " ".join(rng.choice(HINDI_WORDS) for _ in range(length)) + "?"
+        english_options = rng.sample(english_words, 4)
+        hindi_options = rng.sample(hindi_words, 4)
+        question = {
+            'question': f"{english} {hindi}",
+            'options': [f"{e} / {h}" for e, h in zip(english_options, hindi_options)],
+            'correct_answer': rng.randint(1, 4)
+        }
+        questions.append((question, english, hindi, english_options, hindi_options))
+    return questions
+
+def build_bilingual_pdf(pages, seed=1):
+    """
+    Render a two-column English/Hindi question bank with highlighted answers
+
+    Each page has a header and a page number centered across both columns.
+    Lines are written in row order across the columns, as in PDFs typeset
+    line by line, so plain text extraction interleaves the columns.
+
+    Args:
+        pages (int): Number of pages
+
+    Returns:
+        tuple: (PDF bytes, list of the questions it contains)
+    """
+    import fitz
+
+    # Noto Serif Devanagari, bundled with MuPDF; it has no Latin glyphs
+    hindi_font = fitz.Font(script=9)
+    size = 9
+    line_height = 13
+    margin = 40
+    gutter = 24
+    width, height = fitz.paper_size("a4")
+    column_width = (width - 2 * margin - gutter) / 2
+    columns = (margin, margin + column_width + gutter)
+    top = margin + 2 * line_height
+    bottom = height - margin - line_height
+
+    def wrap(text, measure):
+        """Split text into lines no wider than a column"""
+        lines = []
+        for word in text.split():
+            if lines and measure(f"{lines[-1]} {word}") <= column_width:
+                lines[-1] = f"{lines[-1]} {word}"
+            else:
+                lines.append(word)
+        return lines
+
+    def render(number, entry):
+        """(dx, row, text, fontname, color) of one question within its column, and its row count"""
+        question, english, hindi, english_options, hindi_options = entry
+        stem = [(text, "helv") for text in wrap(f"{number}. {english}", lambda t: fitz.get_text_length(t, "helv", size))]
+        stem += [(text, "deva") for text in wrap(hindi, lambda t: hindi_font.text_length(t, size))]
+        parts = [(0, row, text, fontname, None) for row, (text, fontname) in enumerate(stem)]
+        for i, (english_option, hindi_option) in enumerate(zip(english_options, hindi_options)):
+            dx = (i % 2) * column_width / 2
+            row = len(stem) + i // 2
+            highlighted = i + 1 == question['correct_answer']
+            # Alternate between the two ways banks highlight the answer
+            fontname = "hebo" if highlighted and number % 2 == 0 else "helv"
+            color = RED if highlighted and number % 2 else None
+            label = f"{'ABCD'[i]}) {english_option} / "
+            parts.append((dx, row, label, fontname, color))
+            parts.append((dx + fitz.get_text_length(label, fontname, size), row, hindi_option, "deva", color))
+        return parts, len(stem) + 2
+
+    def centered(y, english, hindi):
+        english_width = fitz.get_text_length(english, "helv", size)
+        x = (width - english_width - hindi_font.text_length(hindi, size)) / 2
+        return [(x, y, english, "helv", None), (x + english_width, y, hindi, "deva", None)]
+
+    entries = make_bilingual_questions(pages * 40, seed)
+    doc = fitz.open()
+    placed = []
+    for page_number in range(pages):
+        page = doc.new_page(width=width, height=height)
+        page.insert_font(fontname="deva", fontbuffer=hindi_font.buffer)
+        writes = centered(margin + line_height, "General Knowledge Practice Set / ", "सामान्य ज्ञान अभ्यास")
+        writes += centered(height - margin, f"Page {page_number + 1} / ", f"पृष्ठ {page_number + 1}")
+        for x in columns:
+            y = top
+            while len(placed) < len(entries):
+                parts, rows = render(len(placed) + 1, entries[len(placed)])
+                if y + rows * line_height > bottom:
+                    break
+                writes += [(x + dx, y + row * line_height, text, fontname, color)
+                           for dx, row, text, fontname, color in parts]
+                y += (rows + 1) * line_height
+                placed.append(entries[len(placed)][0])
+        # Row order across both columns, the way line-based typesetting writes them
+        writes.sort(key=lambda write: (write[1], write[0]))
+        for x, y, text, fontname, color in writes:
+            page.insert_text((x, y), text, fontname=fontname, fontsize=size, color=color)
+
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return data, placed
+
+def build_corpus(directory, page_counts=(10, 100), layouts=LAYOUTS):
+    """
+    Write one PDF per layout and size
+
+    Returns:
+        list: (path, layout, pages, question count) per file
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = []
+    for layout in layouts:
+        for pages in page_counts:
+            data, questions = build_pdf(layout, pages)
+            path = os.path.join(directory, f"{layout}_{pages}p.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+            files.append((path, layout, pages, len(questions)))
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default="pdf_corpus")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    args = parser.parse_args()
+
+    for path, layout, pages, count in build_corpus(args.out, args.pages):
+        print(f"{path}: {pages} pages, {count} questions ({os.path.getsize(path) // 1024} KB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Stress the quiz handlers with concurrent callbacks for the same sessions
+
+Every user gets several answer taps (some repeated, some for an older
+question) racing the question's time_up, then Continue taps racing late
+answers, all on a pool of workers like the dispatcher's. Afterwards every
+question must have been recorded exactly once, every quiz must have ended
+exactly once and the stored score must match the stored answers. Run from
+the repository root:
+
+    python benchmarks/stress_session_callbacks.py --users 200 --workers 16
+
+--no-locks runs the same load with the per-user session locks disabled.
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The fake bot answers instantly; don't hold it to Telegram's rate limits
+os.environ.setdefault("OUTBOUND_GLOBAL_RATE", "1000000")
+os.environ.setdefault("OUTBOUND_CHAT_RATE", "1000000")
+os.environ.setdefault("OUTBOUND_CHAT_BURST", "1000000")
+
+import utils.quiz_manager as quiz_manager
+import handlers.quiz_handlers as quiz_handlers
+from models.quiz import Quiz, Question
+from utils.database import add_quiz, get_user_quiz_results, init_database
+from utils.outbound import get_outbound
+from utils.timer_wheel import get_timer_wheel
+
+class FakeBot:
+    """Bot API stand-in that accepts every call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def _message(self, **kwargs):
+        with self._lock:
+            self._next_id += 1
+            return SimpleNamespace(message_id=self._next_id)
+
+    send_message = edit_message_text = _message
+
+class FakeQuery:
+    def __init__(self, user_id, data):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.data = data
+        self.message = SimpleNamespace(
+            chat_id=user_id, message_id=0, text="Question", chat=SimpleNamespace(id=user_id)
+        )
+
+    def answer(self, text=None):
+        pass
+
+    def edit_message_text(self, text, reply_markup=None):
+        pass
+
+def callback_update(user_id, data):
+    return SimpleNamespace(
+        callback_query=FakeQuery(user_id, data),
+        effective_user=SimpleNamespace(id=user_id),
+        effective_chat=SimpleNamespace(id=user_id),
+        message=None
+    )
+
+def command_update(user_id):
+    message = SimpleNamespace(reply_text=lambda text, reply_markup=None: None)
+    return SimpleNamespace(
+        callback_query=None,
+        effective_user=SimpleNamespace(id=user_id),
+        effective_chat=SimpleNamespace(id=user_id),
+        message=message
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--taps", type=int, default=3, help="Answer taps per user and question")
+    parser.add_argument("--no-locks", action="store_true")
+    args = parser.parse_args()
+
+    init_database()
+    if args.no_locks:
+        quiz_handlers.active_sessions.lock = lambda user_id: contextlib.nullcontext()
+
+    # Count how often each question of each user gets recorded
+    recorded = Counter()
+    recorded_lock = threading.Lock()
+    record_user_answer = quiz_manager.record_user_answer
+
+    def counting_record_user_answer(user_id, quiz_id, question_index, selected_option, is_correct):
+        with recorded_lock:
+            recorded[user_id, question_index] += 1
+        record_user_answer(user_id, quiz_id, question_index, selected_option, is_correct)
+
+    quiz_manager.record_user_answer = counting_record_user_answer
+
+    # And how often each user's quiz gets ended
+    ended = Counter()
+    record_quiz_result = quiz_handlers.record_quiz_result
+
+    def counting_record_quiz_result(user_id, quiz_id, score, max_score, answers):
+        with recorded_lock:
+            ended[user_id] += 1
+        record_quiz_result(user_id, quiz_id, score, max_score, answers)
+
+    quiz_handlers.record_quiz_result = counting_record_quiz_result
+
+    quiz = Quiz("Stress", "Concurrent callbacks", 1, time_limit=60)
+    for i in range(args.questions):
+        quiz.add_question(Question(f"Question {i}?", ["A", "B", "C", "D"], i % 4))
+    add_quiz(quiz)
+
+    bot = FakeBot()
+    context = SimpleNamespace(bot=bot, args=[quiz.id])
+    users = list(range(1, args.users + 1))
+    rng = random.Random(7)
+
+    for user_id in users:
+        quiz_handlers.take_quiz(command_update(user_id), context)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.workers) as pool:
+        for index in range(args.questions):
+            # Answers, repeated taps and taps on the previous question race the deadline
+            events = []
+            for user_id in users:
+                for _ in range(args.taps):
+                    tapped = index if rng.random() < 0.8 else max(0, index - 1)
+                    data = f"answer_{tapped}_{rng.randrange(4)}"
+                    events.append((quiz_handlers.answer_callback, callback_update(user_id, data), context))
+                events.append((quiz_handlers.time_up, bot, {
+                    "user_id": user_id, "chat_id": user_id, "question_index": index
+                }))
+            rng.shuffle(events)
+            wait([pool.submit(*event) for event in events])
+
+            # Then double taps on Continue race late answers
+            events = []
+            for user_id in users:
+                for _ in range(2):
+                    events.append((quiz_handlers.time_up_callback, callback_update(user_id, f"time_up_{index}"), context))
+                events.append((quiz_handlers.answer_callback, callback_update(user_id, f"answer_{index}_0"), context))
+            rng.shuffle(events)
+            wait([pool.submit(*event) for event in events])
+    elapsed = time.perf_counter() - started
+
+    outbound = get_outbound(bot)
+    while outbound.pending():
+        time.sleep(0.05)
+    get_timer_wheel().stop()
+    outbound.stop()
+
+    duplicate = sum(1 for count in recorded.values() if count > 1)
+    missing = sum(
+        1 for user_id in users for index in range(args.questions) if (user_id, index) not in recorded
+    )
+    bad_scores = 0
+    for user_id in users:
+        for result in get_user_quiz_results(user_id):
+            correct = sum(1 for answer in result['answers'] if answer['is_correct'])
+            wrong = sum(1 for answer in result['answers'] if answer['selected_option'] != -1 and not answer['is_correct'])
+            expected = max(0, correct - wrong * quiz.negative_marking_factor if wrong else correct)
+            if abs(result['score'] - expected) > 1e-9:
+                bad_scores += 1
+    not_ended = sum(1 for user_id in users if ended[user_id] == 0)
+    ended_twice = sum(1 for user_id in users if ended[user_id] > 1)
+
+    events = args.users * args.questions * (args.taps + 4)
+    print(f"{'without' if args.no_locks else 'with'} locks: {events} callbacks on {args.workers} workers in {elapsed:.2f}s")
+    print(f"  questions recorded twice {duplicate}, never recorded {missing}")
+    print(f"  quizzes not ended {not_ended}, ended twice {ended_twice}, wrong scores {bad_scores}, "
+          f"sessions left {len(quiz_handlers.active_sessions)}")
+
+    failed = duplicate or missing or not_ended or ended_twice or bad_scores or len(quiz_handlers.active_sessions)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
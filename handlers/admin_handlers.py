@@ -6,31 +6,28 @@ Handlers for admin functionality to create and manage quizzes
 """
 
 import logging
-import json
-from io import BytesIO
-
-import subprocess
-import unicodedata
-import io
-import re
 import os
+import subprocess
 import tempfile
-from models.quiz import Quiz, Question
-from utils.database import add_quiz, get_quiz
-from telegram import Update
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import CallbackContext, ConversationHandler
-import re
-import time
+from concurrent.futures import BrokenExecutor
 from datetime import datetime
-from telegram.ext import MessageHandler, Filters
-from models.quiz import Quiz, Question
+
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import CallbackContext
+
+from models.quiz import Quiz, Question, DELIVERY_MODES, DELIVERY_POLL
+from utils.countdown import get_countdown_editor
 from utils.database import (
-    add_quiz, get_quiz, get_quizzes, update_quiz_time,
-    update_question_time_limit, delete_quiz, export_quiz
+    add_quiz, get_quiz, update_question_time_limit, update_quiz_delivery_mode
+)
+from utils.outbound import get_outbound
+from utils.pdf_cache import content_digest, get_pdf_cache
+from utils.pdf_import import TOKEN_QUESTION, TOKEN_OPTION, TOKEN_ANSWER, TOKEN_TEXT
+from utils.pdf_jobs import get_pdf_import_pool
+from config import (
+    ADMIN_USERS, DEFAULT_QUIZ_TIME, DEFAULT_NEGATIVE_MARKING, PDF_SPOOL_BYTES, PDF_LAYOUT_EXTRACTION,
+    PDF_TRACE_SAMPLES
 )
-from config import ADMIN_USERS, DEFAULT_QUIZ_TIME, DEFAULT_NEGATIVE_MARKING
 
 # Enable logging
 logging.basicConfig(
@@ -57,7 +54,14 @@ def admin_command(update: Update, context: CallbackContext) -> None:
         "/adminhelp - Show detailed admin help",
         "/edittime (quiz_id) - Edit quiz time limit",
         "/editquestiontime (quiz_id) (question_index) (time_limit) - Edit time limit for a specific question",
+        "/setdelivery (quiz_id) (buttons|poll) - Send questions as buttons or as Telegram quiz polls",
+        "/broadcast (quiz_id) - Run a live quiz for everyone in the current group or channel",
+        "/stopbroadcast - Stop the live quiz in the current group or channel",
+        "/sessionstats - Show active quiz sessions and their memory use",
         "/import - Import a quiz from JSON",
+        "/diagnose_pdf_import - Show how the next PDF you send is parsed",
+        "/cancel_pdf - Stop your PDF import in progress",
+        "/pdfstats - Show PDF import and cache counters",
     ]
     
     update.message.reply_text(
@@ -77,6 +81,10 @@ def admin_help(update: Update, context: CallbackContext) -> None:
         "/create - Create a new quiz\n"
         "/edittime - Edit time limit for a quiz\n"
         "/editquestiontime - Edit time limit for a specific question\n"
+        "/setdelivery - Send a quiz's questions as buttons or as Telegram quiz polls\n"
+        "/broadcast - Run a live quiz for everyone in the current group or channel\n"
+        "/stopbroadcast - Stop the live quiz in the current group or channel\n"
+        "/sessionstats - Show active quiz sessions and their memory use\n"
         "/start_marathon - Start a marathon quiz (multiple questions)\n"
         "/finalize_marathon - Save the current marathon quiz\n"
         "/cancel_marathon - Cancel the current marathon quiz\n"
@@ -91,7 +99,10 @@ def admin_help(update: Update, context: CallbackContext) -> None:
         "B) Option 2\n"
         "C) Option 3\n"
         "D) Option 4\n"
-        "Correct: A"
+        "Correct: A\n\n"
+        "/diagnose_pdf_import - Show how the next PDF you send is parsed\n"
+        "/cancel_pdf - Stop your PDF import in progress\n"
+        "/pdfstats - Show PDF import and cache counters"
     )
 
 def create_quiz(update: Update, context: CallbackContext) -> str:
@@ -386,6 +397,41 @@ def edit_question_time(update: Update, context: CallbackContext) -> int:
         )
         return
 
+def set_delivery_mode(update: Update, context: CallbackContext) -> None:
+    """Choose whether a quiz is delivered as inline buttons or as Telegram quiz polls."""
+    user_id = update.effective_user.id
+    
+    # Check if the user is an admin
+    if user_id not in ADMIN_USERS:
+        update.message.reply_text("Sorry, only admins can edit quizzes.")
+        return
+    
+    if len(context.args) < 2 or context.args[1] not in DELIVERY_MODES:
+        update.message.reply_text(
+            "Please use the format: /setdelivery (quiz_id) (buttons|poll)"
+        )
+        return
+    
+    quiz_id, delivery_mode = context.args[0], context.args[1]
+    quiz = get_quiz(quiz_id)
+    
+    if not quiz:
+        update.message.reply_text(
+            f"Quiz with ID {quiz_id} not found. Use /list to see available quizzes."
+        )
+        return
+    
+    update_quiz_delivery_mode(quiz_id, delivery_mode)
+    
+    if delivery_mode == DELIVERY_POLL:
+        update.message.reply_text(
+            f"Questions of {quiz.title} will be sent as Telegram quiz polls. "
+            "Questions that exceed Telegram's poll limits (300 characters, "
+            "2-10 options of up to 100 characters) are still sent with buttons."
+        )
+    else:
+        update.message.reply_text(f"Questions of {quiz.title} will be sent with answer buttons.")
+
 def convert_poll_to_quiz(update: Update, context: CallbackContext) -> None:
     """Convert a poll to a quiz or add it to a marathon quiz."""
     try:
@@ -1228,525 +1274,49 @@ def set_question_correct_answer(update: Update, context: CallbackContext) -> Non
         logger.error(traceback.format_exc())
         update.message.reply_text(f"Error setting correct answer: {str(e)}")
 
-def import_questions_from_pdf(update, context):
-    """
-    Handler function for importing questions from a PDF document
-    """
-    # Check if user is admin
-    user_id = update.effective_user.id
-    if user_id not in ADMIN_USERS:
-        update.message.reply_text("Sorry, only admins can import questions from PDFs.")
-        return
-    
-    # Check if a document was provided
-    if not update.message.document or update.message.document.mime_type != 'application/pdf':
-        update.message.reply_text("Please forward a PDF file.")
-        return
-    
-    # Get the document file
-    document = update.message.document
-    file_id = document.file_id
-    
-    update.message.reply_text("Downloading PDF file...")
-    
-    # Download the file
-    file = context.bot.get_file(file_id)
-    file_bytes = io.BytesIO()
-    file.download(out=file_bytes)
-    file_bytes.seek(0)
-    
-    update.message.reply_text("Processing PDF file. This may take a moment...")
-    
-    # Process the PDF and extract text
-    try:
-        # Try PyMuPDF first
-        try:
-            import fitz
-            doc = fitz.open(stream=file_bytes.getvalue(), filetype="pdf")
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text() + "\n"
-            doc.close()
-        except Exception as e:
-            # Try PyPDF2 as fallback
-            try:
-                import PyPDF2
-                pdf_reader = PyPDF2.PdfReader(file_bytes)
-                text = ""
-                for page_num in range(len(pdf_reader.pages)):
-                    text += pdf_reader.pages[page_num].extract_text() + "\n"
-            except Exception as e:
-                update.message.reply_text(f"Failed to extract text: {str(e)}")
-                return
-        
-        if not text or len(text.strip()) < 10:
-            update.message.reply_text("Could not extract text from the PDF. Please make sure it contains extractable text.")
-            return
-        
-        # Parse questions from the extracted text
-        questions = []
-        lines = text.split('\n')
-        
-        # Initialize variables
-        current_question = None
-        current_options = []
-        correct_option = None
-        
-        # Define patterns
-        question_pattern = re.compile(r'(\d+)[\.)\s]+(.+)')
-        option_pattern = re.compile(r'([A-Da-d])[\.)\s]+(.+)')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check for question pattern
-            question_match = question_pattern.search(line)
-            if question_match and len(question_match.group(2)) > 5:
-                # If we already have a question, save it
-                if current_question and current_options:
-                    # Determine correct answer (default to first option)
-                    correct_idx = 1
-                    if correct_option:
-                        if correct_option.upper() in "ABCD":
-                            correct_idx = ord(correct_option.upper()) - ord('A') + 1
-                        else:
-                            try:
-                                correct_idx = int(correct_option)
-                            except:
-                                pass
-                    
-                    # Ensure correct_idx is valid
-                    if correct_idx < 1 or correct_idx > len(current_options):
-                        correct_idx = 1
-                    
-                    questions.append({
-                        'question': current_question,
-                        'options': current_options,
-                        'correct_answer': correct_idx
-                    })
-                
-                # Start a new question
-                current_question = question_match.group(2)
-                current_options = []
-                correct_option = None
-            
-            # Check for option pattern
-            option_match = option_pattern.search(line)
-            if option_match and current_question:
-                option_letter = option_match.group(1).upper()
-                option_text = option_match.group(2)
-                
-                # Add this option
-                current_options.append(option_text)
-                
-                # Check if this option is marked as correct
-                if "✓" in line or "✔" in line or "√" in line or "correct" in line.lower():
-                    correct_option = option_letter
-        
-        # Add the last question
-        if current_question and current_options:
-            # Determine correct answer (default to first option)
-            correct_idx = 1
-            if correct_option:
-                if correct_option.upper() in "ABCD":
-                    correct_idx = ord(correct_option.upper()) - ord('A') + 1
-                else:
-                    try:
-                        correct_idx = int(correct_option)
-                    except:
-                        pass
-            
-            # Ensure correct_idx is valid
-            if correct_idx < 1 or correct_idx > len(current_options):
-                correct_idx = 1
-            
-            questions.append({
-                'question': current_question,
-                'options': current_options,
-                'correct_answer': correct_idx
-            })
-        
-        if not questions:
-            update.message.reply_text("No questions could be extracted from the PDF. Make sure the format is correct.")
-            return
-        
-        # Store questions temporarily in user data
-        context.user_data['pdf_questions'] = questions
-        
-        # Create a confirmation message with question preview
-        preview_text = "Extracted the following questions:\n\n"
-        for i, question in enumerate(questions[:3], 1):  # Preview first 3 questions
-            preview_text += f"{i}. {question['question'][:50]}...\n"
-            for j, option in enumerate(question['options'][:4], 1):
-                preview_text += f"   {j}. {option[:30]}...\n"
-            preview_text += f"   Correct: Option {question['correct_answer']}\n\n"
-        
-        if len(questions) > 3:
-            preview_text += f"... and {len(questions) - 3} more questions\n\n"
-        
-        # Ask user to confirm import and provide a quiz name
-        keyboard = [
-            [InlineKeyboardButton("Create New Quiz", callback_data="pdf_create")],
-            [InlineKeyboardButton("Add to Marathon Quiz", callback_data="pdf_marathon")],
-            [InlineKeyboardButton("Cancel", callback_data="pdf_cancel")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        update.message.reply_text(
-            f"{preview_text}What would you like to do with these questions?",
-            reply_markup=reply_markup
-        )
+class _DownloadBuffer:
+    """Target for File.download(out=...) that keeps the downloaded bytes object instead of copying it"""
     
-    except Exception as e:
-        update.message.reply_text(f"Error processing PDF: {str(e)}")
-
-def extract_text_from_pdf(file_bytes):
-    """
-    Extract text from PDF using pdfminer.six
-    """
-    try:
-        from pdfminer.high_level import extract_text_to_fp
-        from pdfminer.layout import LAParams
-        from io import StringIO
-        
-        output = StringIO()
-        extract_text_to_fp(file_bytes, output, laparams=LAParams())
-        text = output.getvalue()
-        return text
-    except Exception as e:
-        logging.error(f"Error extracting PDF text: {str(e)}")
-        return None
+    def write(self, data):
+        self.data = data
 
-def import_questions_from_pdf(update, context):
+def _download_document(update, context):
     """
-    Handler function for importing questions from a PDF document
-    """
-    # Check if user is admin
-    user_id = update.effective_user.id
-    if user_id not in ADMIN_USERS:
-        update.message.reply_text("Sorry, only admins can import questions from PDFs.")
-        return
-    
-    # Check if a document was provided
-    if not update.message.document or update.message.document.mime_type != 'application/pdf':
-        update.message.reply_text("Please forward a PDF file.")
-        return
+    Download the message's document
     
-    # Get the document file
+    Returns:
+        bytes or str: The contents, or for documents of PDF_SPOOL_BYTES or
+                      more the path of a temporary file holding them, to be
+                      removed with _release_download()
+    """
     document = update.message.document
-    file_id = document.file_id
-    file_name = document.file_name
-    file_size = document.file_size
-    
-    update.message.reply_text(f"PDF Information:\n- Name: {file_name}\n- Size: {file_size} bytes")
-    update.message.reply_text("Downloading PDF file...")
-    
-    # Download the file
-    file = context.bot.get_file(file_id)
-    
-    # Save to a temporary file with the correct name
-    temp_path = f"/tmp/tmp{file_id}.pdf"
-    file.download(temp_path)
-    
-    update.message.reply_text(f"Download successful")
-    update.message.reply_text(f"Saving to temporary file...")
-    update.message.reply_text(f"Saved to {temp_path}")
-    
-    # Process the PDF and extract text
-    try:
-        update.message.reply_text("Testing extraction with PyMuPDF...")
-        
+    file = context.bot.get_file(document.file_id)
+    if (document.file_size or 0) >= PDF_SPOOL_BYTES:
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
         try:
-            # Try PyMuPDF first
-            import fitz
-            doc = fitz.open(temp_path)
-            
-            # Special handling for Hindi text extraction
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                # Extract text with special parameters for Hindi
-                blocks = page.get_text("dict")["blocks"]
-                for block in blocks:
-                    if "lines" in block:
-                        for line in block["lines"]:
-                            if "spans" in line:
-                                for span in line["spans"]:
-                                    if "text" in span:
-                                        # Ensure proper UTF-8 encoding
-                                        text += span["text"] + " "
-                                text += "\n"
-            
-            doc.close()
-            
-            # Ensure text is properly encoded as UTF-8
-            text = text.encode('utf-8', errors='replace').decode('utf-8')
-            
-        except Exception as e:
-            update.message.reply_text(f"PyMuPDF is not installed. Please install it using: pip install pymupdf")
-            update.message.reply_text("Testing extraction with PyPDF2...")
-            
-            try:
-                # Try PyPDF2 as fallback
-                import PyPDF2
-                with open(temp_path, 'rb') as f:
-                    pdf_reader = PyPDF2.PdfReader(f)
-                    text = ""
-                    for page_num in range(len(pdf_reader.pages)):
-                        page_text = pdf_reader.pages[page_num].extract_text()
-                        # Ensure proper UTF-8 encoding
-                        text += page_text.encode('utf-8', errors='replace').decode('utf-8') + "\n"
-            except Exception as e:
-                update.message.reply_text(f"PyPDF2 is not installed. Please install it using: pip install PyPDF2")
-                update.message.reply_text("No PDF extraction libraries are installed. Please install one of the following:")
-                update.message.reply_text("1️⃣ PyMuPDF (recommended): pip install pymupdf")
-                update.message.reply_text("2️⃣ PyPDF2 (alternative): pip install PyPDF2")
-                update.message.reply_text("Diagnosis complete - PDF libraries need to be installed")
-                os.remove(temp_path)
-                return
-        
-        if not text or len(text.strip()) < 10:
-            update.message.reply_text("Could not extract text from the PDF. Please make sure it contains extractable text.")
-            os.remove(temp_path)
-            return
-        
-        # Parse questions from the extracted text
-        questions = []
-        lines = text.split('\n')
-        
-        # Initialize variables
-        current_question = None
-        current_options = []
-        correct_option = None
-        
-        # Define patterns for multilingual support
-        question_pattern = re.compile(r'(\d+)[\.)\s]+(.+)')
-        option_pattern = re.compile(r'([A-Da-d])[\.)\s]+(.+)')
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check for question pattern
-            question_match = question_pattern.search(line)
-            if question_match and len(question_match.group(2)) > 5:
-                # If we already have a question, save it
-                if current_question and current_options:
-                    # Determine correct answer (default to first option)
-                    correct_idx = 1
-                    if correct_option:
-                        if correct_option.upper() in "ABCD":
-                            correct_idx = ord(correct_option.upper()) - ord('A') + 1
-                        else:
-                            try:
-                                correct_idx = int(correct_option)
-                            except:
-                                pass
-                    
-                    # Ensure correct_idx is valid
-                    if correct_idx < 1 or correct_idx > len(current_options):
-                        correct_idx = 1
-                    
-                    questions.append({
-                        'question': current_question,
-                        'options': current_options,
-                        'correct_answer': correct_idx
-                    })
-                
-                # Start a new question
-                current_question = question_match.group(2)
-                current_options = []
-                correct_option = None
-            
-            # Check for option pattern
-            option_match = option_pattern.search(line)
-            if option_match and current_question:
-                option_letter = option_match.group(1).upper()
-                option_text = option_match.group(2)
-                
-                # Add this option
-                current_options.append(option_text)
-                
-                # Check if this option is marked as correct
-                if "✓" in line or "✔" in line or "√" in line or "correct" in line.lower():
-                    correct_option = option_letter
-        
-        # Add the last question
-        if current_question and current_options:
-            # Determine correct answer (default to first option)
-            correct_idx = 1
-            if correct_option:
-                if correct_option.upper() in "ABCD":
-                    correct_idx = ord(correct_option.upper()) - ord('A') + 1
-                else:
-                    try:
-                        correct_idx = int(correct_option)
-                    except:
-                        pass
-            
-            # Ensure correct_idx is valid
-            if correct_idx < 1 or correct_idx > len(current_options):
-                correct_idx = 1
-            
-            questions.append({
-                'question': current_question,
-                'options': current_options,
-                'correct_answer': correct_idx
-            })
-        
-        # Clean up temporary file
-        os.remove(temp_path)
-        
-        if not questions:
-            update.message.reply_text("No questions could be extracted from the PDF. Make sure the format is correct.")
-            return
-        
-        # Store questions temporarily in user data
-        context.user_data['pdf_questions'] = questions
-        
-        # Create a confirmation message with question preview
-        preview_text = "Extracted the following questions:\n\n"
-        for i, question in enumerate(questions[:3], 1):  # Preview first 3 questions
-            preview_text += f"{i}. {question['question']}\n"
-            for j, option in enumerate(question['options'][:4], 1):
-                preview_text += f"   {j}. {option}\n"
-            preview_text += f"   Correct: Option {question['correct_answer']}\n\n"
-        
-        if len(questions) > 3:
-            preview_text += f"... and {len(questions) - 3} more questions\n\n"
-        
-        # Ask user to confirm import and provide a quiz name
-        keyboard = [
-            [InlineKeyboardButton("Create New Quiz", callback_data="pdf_create")],
-            [InlineKeyboardButton("Add to Marathon Quiz", callback_data="pdf_marathon")],
-            [InlineKeyboardButton("Cancel", callback_data="pdf_cancel")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        update.message.reply_text(
-            f"{preview_text}What would you like to do with these questions?",
-            reply_markup=reply_markup
-        )
-    
-    except Exception as e:
-        update.message.reply_text(f"Error processing PDF: {str(e)}")
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-
-def parse_questions_from_text(text):
-    """
-    Parse questions from extracted text
-    """
-    questions = []
-    lines = text.split('\n')
-    
-    # Initialize variables
-    current_question = None
-    current_question_text = None
-    current_options = []
-    correct_option = None
-    
-    # Very lenient patterns
-    question_pattern = re.compile(r'(\d+)[\.)\s]+(.+)')
-    option_pattern = re.compile(r'([A-Da-d])[\.)\s]+(.+)')
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Check for question pattern
-        question_match = question_pattern.search(line)
-        if question_match and len(question_match.group(2)) > 5:  # Question has reasonable length
-            # If we already have a question, save it
-            if current_question_text and current_options:
-                # Determine correct answer (default to first option)
-                correct_idx = 1
-                if correct_option:
-                    if correct_option.upper() in "ABCD":
-                        correct_idx = ord(correct_option.upper()) - ord('A') + 1
-                    else:
-                        try:
-                            correct_idx = int(correct_option)
-                        except:
-                            pass
-                
-                # Ensure correct_idx is valid
-                if correct_idx < 1 or correct_idx > len(current_options):
-                    correct_idx = 1
-                
-                questions.append({
-                    'question': current_question_text,
-                    'options': current_options,
-                    'correct_answer': correct_idx
-                })
-            
-            # Start a new question
-            current_question = int(question_match.group(1))
-            current_question_text = question_match.group(2)
-            current_options = []
-            correct_option = None
-        
-        # Check for option pattern
-        option_match = option_pattern.search(line)
-        if option_match and current_question_text:
-            option_letter = option_match.group(1).upper()
-            option_text = option_match.group(2)
-            
-            # Add this option
-            current_options.append(option_text)
-            
-            # Check if this option is marked as correct
-            if "✓" in line or "✔" in line or "√" in line or "correct" in line.lower():
-                correct_option = option_letter
-    
-    # Add the last question
-    if current_question_text and current_options:
-        # Determine correct answer (default to first option)
-        correct_idx = 1
-        if correct_option:
-            if correct_option.upper() in "ABCD":
-                correct_idx = ord(correct_option.upper()) - ord('A') + 1
-            else:
-                try:
-                    correct_idx = int(correct_option)
-                except:
-                    pass
-        
-        # Ensure correct_idx is valid
-        if correct_idx < 1 or correct_idx > len(current_options):
-            correct_idx = 1
-        
-        questions.append({
-            'question': current_question_text,
-            'options': current_options,
-            'correct_answer': correct_idx
-        })
+            file.download(custom_path=path)
+        except Exception:
+            _release_download(path)
+            raise
+        return path
     
-    return questions
+    buffer = _DownloadBuffer()
+    file.download(out=buffer)
+    return buffer.data
 
-def diagnose_pdf_import(update, context):
-    """
-    Diagnostic command to identify issues with PDF import
-    """
-    # Check if user is admin
-    user_id = update.effective_user.id
-    if user_id not in ADMIN_USERS:
-        update.message.reply_text("Sorry, only admins can use this command.")
-        return
-    
-    # Set a flag in user_data to indicate diagnostic mode
-    context.user_data['pdf_diagnostic_mode'] = True
-    update.message.reply_text("PDF diagnostic mode activated. Please forward a PDF file to analyze.")
+def _release_download(source):
+    """Remove the temporary file of a spooled download"""
+    if isinstance(source, str):
+        try:
+            os.unlink(source)
+        except OSError:
+            pass
 
 def import_questions_from_pdf(update, context):
     """
     Handler function for importing questions from a PDF document
-    Now handles both regular imports and diagnostic mode
+    Also runs the diagnostics when /diagnose_pdf_import was sent first
     """
     # Check if user is admin
     user_id = update.effective_user.id
@@ -1760,585 +1330,124 @@ def import_questions_from_pdf(update, context):
         return
     
     # Check if we're in diagnostic mode
-    diagnostic_mode = context.user_data.get('pdf_diagnostic_mode', False)
-    if diagnostic_mode:
-        # Clear the diagnostic mode flag
-        context.user_data['pdf_diagnostic_mode'] = False
-        # Run diagnostic process
+    if context.user_data.pop('pdf_diagnostic_mode', False):
         run_pdf_diagnostics(update, context)
         return
     
-    # Get the document file
     document = update.message.document
-    file_id = document.file_id
+    chat_id = update.effective_chat.id
+    user_data = context.user_data
+    bot = context.bot
+    cache = get_pdf_cache()
+    
+    # A file sent before needs neither the download nor the parse
+    cached = cache.get_by_file_id(document.file_unique_id)
+    if cached is not None:
+        send_pdf_questions(bot, chat_id, user_data, cached['questions'], cached['pages'])
+        return
     
-    update.message.reply_text("Downloading PDF file...")
+    # One status message follows the import from download to preview
+    status = update.message.reply_text("Downloading PDF file...")
+    source = _download_document(update, context)
     
-    # Download the file
-    file = context.bot.get_file(file_id)
-    file_bytes = io.BytesIO()
-    file.download(out=file_bytes)
-    file_bytes.seek(0)
+    # The same file forwarded from elsewhere has a new file_unique_id
+    digest = content_digest(source)
+    cached = cache.get_by_digest(digest, document.file_unique_id)
+    if cached is not None:
+        _release_download(source)
+        send_pdf_questions(bot, chat_id, user_data, cached['questions'], cached['pages'])
+        return
     
-    update.message.reply_text("Processing PDF file. This may take a moment...")
+    # Extraction runs in the PDF import pool; progress and the preview are sent from there
+    editor = get_countdown_editor(bot)
     
-    # Try to use basic text extraction
-    try:
-        # Check if PyMuPDF is installed
-        try:
-            import fitz
-            pymupdf_available = True
-        except ImportError:
-            pymupdf_available = False
-        
-        # Check if PyPDF2 is installed
-        try:
-            import PyPDF2
-            pypdf2_available = True
-        except ImportError:
-            pypdf2_available = False
-        
-        if not pymupdf_available and not pypdf2_available:
-            update.message.reply_text("PDF extraction libraries are not installed. Please install PyMuPDF or PyPDF2.")
-            update.message.reply_text("For now, please use the poll-to-quiz conversion feature instead.")
-            return
-        
-        # Extract text using available libraries
-        text = ""
-        if pymupdf_available:
-            # Save to temporary file for PyMuPDF
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(file_bytes.getvalue())
-                temp_file_path = temp_file.name
-            
-            # Extract with PyMuPDF
-            doc = fitz.open(temp_file_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text() + "\n"
-            doc.close()
-            
-            # Clean up
-            os.unlink(temp_file_path)
-        elif pypdf2_available:
-            # Extract with PyPDF2
-            file_bytes.seek(0)
-            pdf_reader = PyPDF2.PdfReader(file_bytes)
-            for page_num in range(len(pdf_reader.pages)):
-                text += pdf_reader.pages[page_num].extract_text() + "\n"
-        
-        if not text:
-            update.message.reply_text("Failed to extract text from PDF. Please try a different PDF or use the poll-to-quiz feature.")
-            return
-        
-        # Simple question parsing
-        lines = text.split('\n')
-        questions = []
-        current_question = None
-        current_options = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Very simple pattern matching for questions and options
-            if re.match(r'\d+[\.\)]\s', line):
-                # This looks like a new question
-                if current_question and len(current_options) >= 2:
-                    # Save previous question
-                    questions.append({
-                        'question': current_question,
-                        'options': current_options,
-                        'correct_answer': 1  # Default to first option
-                    })
-                
-                # Start new question
-                current_question = line
-                current_options = []
-            elif re.match(r'[A-Da-d][\.\)]\s', line) and current_question:
-                # This looks like an option
-                current_options.append(line)
-        
-        # Add the last question
-        if current_question and len(current_options) >= 2:
-            questions.append({
-                'question': current_question,
-                'options': current_options,
-                'correct_answer': 1  # Default to first option
-            })
-        
-        if not questions:
-            update.message.reply_text("No questions could be extracted from the PDF. Make sure the format is correct.")
-            return
-        
-        # Store questions temporarily
-        context.user_data['pdf_questions'] = questions
-        
-        # Create preview
-        preview_text = f"Extracted {len(questions)} questions. Here's a preview:\n\n"
-        for i, q in enumerate(questions[:3], 1):
-            preview_text += f"{q['question']}\n"
-            for opt in q['options'][:4]:
-                preview_text += f"{opt}\n"
-            preview_text += "\n"
-        
-        if len(questions) > 3:
-            preview_text += f"... and {len(questions) - 3} more questions\n\n"
-        
-        # Ask what to do with the questions
-        keyboard = [
-            [InlineKeyboardButton("Create New Quiz", callback_data="pdf_create")],
-            [InlineKeyboardButton("Add to Marathon Quiz", callback_data="pdf_marathon")],
-            [InlineKeyboardButton("Cancel", callback_data="pdf_cancel")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        update.message.reply_text(
-            f"{preview_text}What would you like to do with these questions?",
-            reply_markup=reply_markup
-        )
+    def on_progress(job):
+        editor.update(chat_id, status.message_id, pdf_progress_text(job), _pdf_stop_markup(job))
     
-    except Exception as e:
-        update.message.reply_text(f"Error processing PDF: {str(e)}")
-        update.message.reply_text("Please try a different PDF or use the poll-to-quiz feature.")
-
-def run_pdf_diagnostics(update, context):
-    """
-    Run diagnostics on a PDF file to identify parsing issues
-    """
-    # Get the document file
-    document = update.message.document
-    file_id = document.file_id
-    file_name = document.file_name if document.file_name else "unknown.pdf"
-    file_size = document.file_size
-    
-    update.message.reply_text(f"📄 PDF Information:\n- Name: {file_name}\n- Size: {file_size} bytes")
-    
-    # Download the file
-    try:
-        update.message.reply_text("⬇️ Downloading PDF file...")
-        file = context.bot.get_file(file_id)
-        file_bytes = io.BytesIO()
-        file.download(out=file_bytes)
-        file_bytes.seek(0)
-        update.message.reply_text("✅ Download successful")
-    except Exception as e:
-        update.message.reply_text(f"❌ Download failed: {str(e)}")
-        return
+    def on_done(job):
+        _release_download(source)
+        editor.finish(chat_id, status.message_id)
+        send_pdf_import_preview(bot, chat_id, user_data, job, digest, document.file_unique_id, status.message_id)
     
-    # Save to temporary file
-    try:
-        update.message.reply_text("💾 Saving to temporary file...")
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_file.write(file_bytes.getvalue())
-            temp_file_path = temp_file.name
-        update.message.reply_text(f"✅ Saved to {temp_file_path}")
-    except Exception as e:
-        update.message.reply_text(f"❌ Failed to save: {str(e)}")
+    job, reason = get_pdf_import_pool().submit(user_id, source, on_done, on_progress)
+    if job is None:
+        _release_download(source)
+        status.edit_text(reason)
         return
     
-    # Test PyMuPDF extraction
-    try:
-        update.message.reply_text("🔍 Testing extraction with PyMuPDF...")
-        import fitz
-        doc = fitz.open(temp_file_path)
-        page_count = len(doc)
-        update.message.reply_text(f"📄 PDF has {page_count} pages")
-        
-        # Extract text from first page as sample
-        if page_count > 0:
-            page = doc.load_page(0)
-            text = page.get_text()
-            text_preview = text[:200] + "..." if len(text) > 200 else text
-            update.message.reply_text(f"📝 First page text sample:\n{text_preview}")
-        
-        doc.close()
-        update.message.reply_text("✅ PyMuPDF extraction successful")
-    except ImportError as e:
-        update.message.reply_text(f"❌ PyMuPDF extraction failed: {str(e)}")
-        
-        # Try PyPDF2 as fallback
-        try:
-            update.message.reply_text("🔍 Testing extraction with PyPDF2...")
-            import PyPDF2
-            with open(temp_file_path, 'rb') as f:
-                pdf_reader = PyPDF2.PdfReader(f)
-                page_count = len(pdf_reader.pages)
-                update.message.reply_text(f"📄 PDF has {page_count} pages")
-                
-                # Extract text from first page as sample
-                if page_count > 0:
-                    text = pdf_reader.pages[0].extract_text()
-                    text_preview = text[:200] + "..." if len(text) > 200 else text
-                    update.message.reply_text(f"📝 First page text sample:\n{text_preview}")
-            update.message.reply_text("✅ PyPDF2 extraction successful")
-        except ImportError as e:
-            update.message.reply_text(f"❌ PyPDF2 extraction failed: {str(e)}")
-    
-    # Try to parse questions from the extracted text
-    try:
-        update.message.reply_text("🔍 Attempting to extract all text for question parsing...")
-        
-        # Get all text from PDF
-        all_text = ""
-        
-        try:
-            # Try PyMuPDF first
-            import fitz
-            doc = fitz.open(temp_file_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                all_text += page.get_text() + "\n"
-            doc.close()
-        except Exception:
-            # Fall back to PyPDF2
-            try:
-                import PyPDF2
-                with open(temp_file_path, 'rb') as f:
-                    pdf_reader = PyPDF2.PdfReader(f)
-                    for page_num in range(len(pdf_reader.pages)):
-                        all_text += pdf_reader.pages[page_num].extract_text() + "\n"
-            except Exception as e:
-                update.message.reply_text(f"❌ All text extraction methods failed: {str(e)}")
-                all_text = ""
-        
-        # Clean up temp file
-        try:
-            os.unlink(temp_file_path)
-        except:
-            pass
-        
-        if not all_text:
-            update.message.reply_text("❌ Failed to extract any text for parsing")
-        else:
-            update.message.reply_text(f"✅ Extracted {len(all_text)} characters of text")
-            
-            # Look for potential questions and options
-            lines = all_text.split('\n')
-            question_pattern = re.compile(r'(\d+)[\.)\s]+(.+)')
-            option_pattern = re.compile(r'([A-Da-d])[\.)\s]+(.+)')
-            
-            # Count potential questions and options
-            question_lines = []
-            option_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Check for question pattern
-                question_match = question_pattern.search(line)
-                if question_match:
-                    question_lines.append(line)
-                
-                # Check for option pattern
-                option_match = option_pattern.search(line)
-                if option_match:
-                    option_lines.append(line)
-            
-            update.message.reply_text(f"🔍 Found {len(question_lines)} potential question lines and {len(option_lines)} potential option lines")
-            
-            # Show examples of what was found
-            if question_lines:
-                examples = "\n".join(question_lines[:3])
-                update.message.reply_text(f"📝 Question examples:\n{examples}")
-            else:
-                update.message.reply_text("❌ No lines matched question pattern")
-            
-            if option_lines:
-                examples = "\n".join(option_lines[:3])
-                update.message.reply_text(f"📝 Option examples:\n{examples}")
-            else:
-                update.message.reply_text("❌ No lines matched option pattern")
-    
-    except Exception as e:
-        update.message.reply_text(f"❌ Error during question pattern analysis: {str(e)}")
-    
-    update.message.reply_text("🔍 Diagnosis complete")
+    # The Stop button needs the job ID. Going through the editor, this is
+    # dropped if on_done already finished the status message
+    editor.update(chat_id, status.message_id, pdf_progress_text(job), _pdf_stop_markup(job))
 
-def parse_questions_from_text(text):
-    """
-    Parse questions from extracted text
-    """
-    questions = []
-    lines = text.split('\n')
-    
-    # Initialize variables
-    current_question = None
-    current_question_text = None
-    current_options = []
-    correct_option = None
-    
-    # Very lenient patterns
-    question_pattern = re.compile(r'(\d+)[\.)\s]+(.+)')
-    option_pattern = re.compile(r'([A-Da-d])[\.)\s]+(.+)')
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Check for question pattern
-        question_match = question_pattern.search(line)
-        if question_match and len(question_match.group(2)) > 5:  # Question has reasonable length
-            # If we already have a question, save it
-            if current_question_text and current_options:
-                # Determine correct answer (default to first option)
-                correct_idx = 1
-                if correct_option:
-                    if correct_option.upper() in "ABCD":
-                        correct_idx = ord(correct_option.upper()) - ord('A') + 1
-                    else:
-                        try:
-                            correct_idx = int(correct_option)
-                        except:
-                            pass
-                
-                # Ensure correct_idx is valid
-                if correct_idx < 1 or correct_idx > len(current_options):
-                    correct_idx = 1
-                
-                questions.append({
-                    'question': current_question_text,
-                    'options': current_options,
-                    'correct_answer': correct_idx
-                })
-            
-            # Start a new question
-            current_question = int(question_match.group(1))
-            current_question_text = question_match.group(2)
-            current_options = []
-            correct_option = None
-        
-        # Check for option pattern
-        option_match = option_pattern.search(line)
-        if option_match and current_question_text:
-            option_letter = option_match.group(1).upper()
-            option_text = option_match.group(2)
-            
-            # Add this option
-            current_options.append(option_text)
-            
-            # Check if this option is marked as correct
-            if "✓" in line or "✔" in line or "√" in line or "correct" in line.lower():
-                correct_option = option_letter
-    
-    # Add the last question
-    if current_question_text and current_options:
-        # Determine correct answer (default to first option)
-        correct_idx = 1
-        if correct_option:
-            if correct_option.upper() in "ABCD":
-                correct_idx = ord(correct_option.upper()) - ord('A') + 1
-            else:
-                try:
-                    correct_idx = int(correct_option)
-                except:
-                    pass
-        
-        # Ensure correct_idx is valid
-        if correct_idx < 1 or correct_idx > len(current_options):
-            correct_idx = 1
-        
-        questions.append({
-            'question': current_question_text,
-            'options': current_options,
-            'correct_answer': correct_idx
-        })
-    
-    return questions
+def _pdf_stop_markup(job):
+    """Button on the status message of a running PDF import, stopping only that import"""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("⏹ Stop and use the questions found so far", callback_data=f"pdf_stop:{job.job_id}")]
+    ])
 
-def handle_pdf_import_callback(update: Update, context: CallbackContext) -> None:
-    """Handle callbacks for PDF question import."""
-    try:
-        query = update.callback_query
-        query.answer()
-        
-        user_id = query.from_user.id
-        
-        # Check if user is admin
-        if user_id not in ADMIN_USERS:
-            query.edit_message_text("Sorry, only admins can use this feature.")
-            return
-        
-        # Parse callback data
-        data = query.data.split('_')
-        action = data[1]  # 'marathon' or 'new'
-        file_id = data[2]  # file ID for retrieving questions
-        
-        # Get questions from context
-        questions_key = f'pdf_questions_{file_id}'
-        if questions_key not in context.user_data:
-            query.edit_message_text("Questions not found. Please upload the PDF again.")
-            return
-        
-        questions = context.user_data[questions_key]
-        
-        if action == 'marathon':
-            # Add to marathon
-            if 'marathon_quiz' not in context.user_data:
-                query.edit_message_text("Marathon quiz not found. Start one with /start_marathon first.")
-                return
-            
-            quiz = context.user_data['marathon_quiz']
-            
-            # Add questions to marathon
-            for q in questions:
-                quiz.questions.append(q)
-            
-            query.edit_message_text(
-                f"✅ Added {len(questions)} questions to marathon quiz.\n\n"
-                f"Marathon quiz now has {len(quiz.questions)} questions in total."
-            )
-            
-        elif action == 'new':
-            # Create a new quiz
-            import uuid
-            from models.quiz import Quiz
-            
-            # Generate a quiz ID
-            quiz_id = str(uuid.uuid4())
-            
-            # Create quiz title and description
-            title = f"PDF Quiz {quiz_id[-8:]}"
-            description = f"Created from PDF with {len(questions)} questions"
-            
-            # Create the quiz object
-            quiz = Quiz(
-                title=title,
-                description=description,
-                creator_id=user_id,
-                time_limit=15,  # Default time limit
-                negative_marking_factor=0  # Default no negative marking
-            )
-            
-            # Set the ID
-            quiz.id = quiz_id
-            
-            # Add questions
-            for q in questions:
-                quiz.questions.append(q)
-            
-            # Save to database
-            from utils.database import add_quiz
-            saved_id = add_quiz(quiz)
-            
-            query.edit_message_text(
-                f"✅ Created new quiz with {len(questions)} questions!\n\n"
-                f"Title: {title}\n"
-                f"Description: {description}\n\n"
-                f"Users can take this quiz with:\n/take {saved_id}"
-            )
-        
-        # Clean up
-        del context.user_data[questions_key]
-        
-    except Exception as e:
-        import traceback
-        logger.error(f"Error in handle_pdf_import_callback: {str(e)}")
-        logger.error(traceback.format_exc())
-        if query:
-            query.edit_message_text(f"Error processing PDF questions: {str(e)}")
+def pdf_progress_text(job):
+    """Status message text of a running PDF import"""
+    total = f" of {job.total_pages}" if job.total_pages else ""
+    return (
+        f"Processing PDF file: {job.pages_read()}{total} pages read, "
+        f"{job.questions_found()} questions found so far.\n"
+        "Stop the import to use the questions found so far."
+    )
 
-def parse_questions_from_text(text):
-    """Parse questions, options, and correct answers from text."""
-    from models.quiz import Question
-    import re
-    
-    # Normalize line endings
-    text = text.replace('\r\n', '\n')
+def send_pdf_import_preview(bot, chat_id, user_data, job, digest, file_unique_id, status_message_id):
+    """
+    Cache the questions of a finished PDF import and send them for confirmation
     
-    # Define patterns for different question formats
-    patterns = [
-        # Format: "Question: text\nA) option1\nB) option2\nC) option3\nD) option4\nCorrect: A"
-        r'(?:Question:|Q:|Q\.|^\d+[\.\)]) (.*?)\s*\n(?:[Aa]\)|[Aa]\.) (.*?)\s*\n(?:[Bb]\)|[Bb]\.) (.*?)\s*\n(?:[Cc]\)|[Cc]\.) (.*?)\s*\n(?:[Dd]\)|[Dd]\.) (.*?)\s*\n(?:Correct:?|Answer:?|Ans:?)\s*([ABCDabcd])',
-        
-        # Format: "Question: text\n1. option1\n2. option2\n3. option3\n4. option4\nCorrect: 1"
-        r'(?:Question:|Q:|Q\.|^\d+[\.\)]) (.*?)\s*\n(?:1[\.\)]) (.*?)\s*\n(?:2[\.\)]) (.*?)\s*\n(?:3[\.\)]) (.*?)\s*\n(?:4[\.\)]) (.*?)\s*\n(?:Correct:?|Answer:?|Ans:?)\s*([1234])',
-        
-        # Format: "Question: text\noption1 (*)\noption2\noption3\noption4"
-        r'(?:Question:|Q:|Q\.|^\d+[\.\)]) (.*?)\s*\n(.*?)(?:\s*\(\*\)|\s*\*)\s*\n(.*?)\s*\n(.*?)\s*\n(.*?)\s*(?:\n|$)'
-    ]
+    A stopped import offers the questions found until then, without caching
+    them. Called by the PDF import pool, so all messages go through the
+    outbound queue.
+    """
+    outbound = get_outbound(bot)
     
-    questions = []
+    def show_status(text):
+        # Without reply_markup the Stop button goes away
+        outbound.edit_message_text(chat_id, status_message_id, text)
     
-    for pattern in patterns:
-        matches = re.finditer(pattern, text, re.MULTILINE | re.DOTALL)
-        
-        for match in matches:
-            if len(match.groups()) >= 5:
-                question_text = match.group(1).strip()
-                options = [
-                    match.group(2).strip(),
-                    match.group(3).strip(),
-                    match.group(4).strip(),
-                    match.group(5).strip()
-                ]
-                
-                # Determine correct option
-                correct_option = 0  # Default to first option
-                if len(match.groups()) >= 6 and match.group(6):
-                    answer_mark = match.group(6).upper()
-                    if answer_mark in 'ABCD':
-                        correct_option = 'ABCD'.index(answer_mark)
-                    elif answer_mark in '1234':
-                        correct_option = int(answer_mark) - 1
-                
-                # Create Question object
-                question = Question(
-                    text=question_text,
-                    options=options,
-                    correct_option=correct_option
-                )
-                
-                questions.append(question)
-    
-    return questions
-
-def import_questions_from_pdf(update, context):
-    """
-    Handler function for importing questions from a PDF document
-    """
-    # Check if user is admin
-    user_id = update.effective_user.id
-    if user_id not in ADMIN_USERS:
-        update.message.reply_text("Sorry, only admins can import questions from PDFs.")
+    try:
+        questions, stats = job.result()
+    except ImportError:
+        show_status("PDF support is not installed. Please install PyMuPDF or PyPDF2.")
         return
-    
-    # Check if a document was provided
-    if not update.message.document or update.message.document.mime_type != 'application/pdf':
-        update.message.reply_text("Please forward a PDF file.")
+    except BrokenExecutor:
+        show_status("The PDF reader crashed while reading this file. Please try again, or try another file.")
+        return
+    except Exception as e:
+        show_status(f"Could not read the PDF: {str(e)}")
         return
     
-    # Get the document file
-    document = update.message.document
-    file_id = document.file_id
-    
-    update.message.reply_text("Downloading PDF file...")
-    
-    # Download the file
-    file = context.bot.get_file(file_id)
-    file_bytes = io.BytesIO()
-    file.download(out=file_bytes)
-    file_bytes.seek(0)
-    
-    update.message.reply_text("Processing PDF file. This may take a moment...")
+    if job.cancelled():
+        if not questions:
+            show_status("PDF import cancelled.")
+            return
+        total = f" of {job.total_pages}" if job.total_pages else ""
+        show_status(f"⏹ PDF import stopped after {stats.pages}{total} pages.")
+        send_pdf_questions(bot, chat_id, user_data, questions, stats.pages)
+        return
     
-    # Use our simplified approach
-    questions = extract_and_parse_questions(file_bytes)
+    show_status(f"✅ Read {stats.pages} pages of the PDF.")
+    get_pdf_cache().put(digest, file_unique_id, questions, stats.pages)
+    send_pdf_questions(bot, chat_id, user_data, questions, stats.pages)
+
+def send_pdf_questions(bot, chat_id, user_data, questions, pages):
+    """Preview imported questions and ask what to do with them"""
+    outbound = get_outbound(bot)
     
     if not questions:
-        update.message.reply_text("No questions could be extracted from the PDF. "
-                                 "Make sure the format is correct.")
+        outbound.send_message(chat_id, "No questions could be extracted from the PDF. "
+                              "Make sure the format is correct, or send /diagnose_pdf_import "
+                              "and the PDF again to see what was recognized.")
         return
     
     # Store questions temporarily in user data
-    context.user_data['pdf_questions'] = questions
+    user_data['pdf_questions'] = questions
     
     # Create a confirmation message with question preview
-    preview_text = "Extracted the following questions:\n\n"
+    preview_text = f"Extracted {len(questions)} questions from {pages} pages:\n\n"
     for i, question in enumerate(questions[:3], 1):  # Preview first 3 questions
         preview_text += f"{i}. {question['question'][:50]}...\n"
         for j, option in enumerate(question['options'][:4], 1):
@@ -2356,217 +1465,60 @@ def import_questions_from_pdf(update, context):
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    update.message.reply_text(
+    outbound.send_message(
+        chat_id,
         f"{preview_text}What would you like to do with these questions?",
         reply_markup=reply_markup
     )
 
-def extract_text_from_pdf(file_bytes):
-    """
-    Enhanced text extraction from PDF with better encoding handling
-    and fallback methods.
-    """
-    text = ""
-    try:
-        # Save the bytes to a temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_file.write(file_bytes.getvalue())
-            temp_file_path = temp_file.name
-        
-        logger.info(f"Saved PDF to temporary file: {temp_file_path}")
-        
-        # First attempt: Try PyMuPDF if available
-        try:
-            import fitz
-            doc = fitz.open(temp_file_path)
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text("text") + "\n"  # Use 'text' mode for cleaner extraction
-            doc.close()
-            logger.info("Successfully extracted text using PyMuPDF")
-        except ImportError:
-            logger.info("PyMuPDF not available, trying alternative method")
-            
-            # Second attempt: Try PyPDF2 if available
-            try:
-                import PyPDF2
-                with open(temp_file_path, 'rb') as f:
-                    pdf_reader = PyPDF2.PdfReader(f)
-                    text = ""
-                    for page_num in range(len(pdf_reader.pages)):
-                        page = pdf_reader.pages[page_num]
-                        text += page.extract_text() + "\n"
-                logger.info("Successfully extracted text using PyPDF2")
-            except ImportError:
-                logger.info("PyPDF2 not available, using basic binary extraction")
-                
-                # Third attempt: Basic binary extraction as fallback
-                with open(temp_file_path, 'rb') as f:
-                    binary_content = f.read()
-                
-                # Try different encodings
-                encodings = ['utf-8', 'utf-16', 'latin-1', 'cp1252']
-                for encoding in encodings:
-                    try:
-                        decoded_text = binary_content.decode(encoding, errors='ignore')
-                        # If we got something useful
-                        if len(decoded_text) > 100:
-                            text = decoded_text
-                            logger.info(f"Extracted text using {encoding} encoding")
-                            break
-                    except:
-                        continue
-        
-        # Clean up the temporary file
-        try:
-            os.unlink(temp_file_path)
-        except:
-            pass
-        
-        # Post-processing: remove garbage and clean up text
-        # Remove binary junk often found in PDF text extraction
-        cleaned_lines = []
-        for line in text.split('\n'):
-            # Skip lines with too many non-printable characters
-            printable_chars = sum(1 for c in line if c.isprintable())
-            if len(line) > 0 and printable_chars / len(line) > 0.7:  # At least 70% printable
-                # Replace sequences of weird chars with spaces
-                cleaned_line = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\xff]+', ' ', line)
-                # Remove excessive spaces
-                cleaned_line = re.sub(r'\s+', ' ', cleaned_line).strip()
-                if cleaned_line:
-                    cleaned_lines.append(cleaned_line)
-        
-        text = '\n'.join(cleaned_lines)
-        
-        # Add some debugging to see what was extracted
-        logger.info(f"Extracted {len(cleaned_lines)} cleaned lines from PDF")
-        if cleaned_lines:
-            preview = '\n'.join(cleaned_lines[:10])
-            logger.info(f"First 10 lines preview: {preview}")
-        
-    except Exception as e:
-        logger.error(f"Error in PDF extraction: {str(e)}")
-        # Still return whatever text we managed to extract
+def cancel_pdf_import(update, context):
+    """Stop the admin's PDF imports that are queued or running"""
+    user_id = update.effective_user.id
+    if user_id not in ADMIN_USERS:
+        update.message.reply_text("Sorry, only admins can use this command.")
+        return
     
-    return text
+    if not get_pdf_import_pool().cancel(user_id):
+        update.message.reply_text("You have no PDF import in progress.")
 
-def parse_questions_from_pdf_text(text):
-    """
-    Parse questions from the extracted PDF text
-    
-    Supports multiple formats including:
-    - Standard format with "Correct:" label
-    - Format with checkmark (✓) to indicate correct answer
-    - Hindi and other non-English text support
-    """
-    questions = []
-    lines = text.split('\n')
-    
-    # Print the extracted text for debugging
-    logger.info(f"Extracted text lines: {len(lines)}")
-    if len(lines) > 0:
-        logger.info(f"First 10 lines preview: {lines[:10]}")
-    
-    current_question = None
-    current_options = []
-    correct_answer = None
-    
-    # Patterns for different formats
-    question_pattern = re.compile(r'^(?:Q)?(\d+)[.)]\s+(.*)')
-    option_pattern1 = re.compile(r'^(?:\()?([A-D])(?:\))?[.)]\s+(.*)')
-    option_pattern2 = re.compile(r'^(?:\()?([a-d])(?:\))?[.)]\s+(.*)')
-    correct_pattern = re.compile(r'^[Cc]orrect:?\s*([A-Da-d])')
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        # Skip empty lines
-        if not line:
-            i += 1
-            continue
-        
-        # Check for question
-        question_match = question_pattern.match(line)
-        if question_match:
-            # Save previous question if exists
-            if current_question and current_options:
-                if correct_answer:
-                    if correct_answer.upper() in "ABCD":
-                        correct_idx = ord(correct_answer.upper()) - ord('A') + 1
-                    else:
-                        correct_idx = int(correct_answer)
-                else:
-                    correct_idx = 1  # Default to first option
-                
-                questions.append({
-                    'question': current_question,
-                    'options': current_options,
-                    'correct_answer': correct_idx
-                })
-            
-            # Start new question
-            current_question = question_match.group(2)
-            current_options = []
-            correct_answer = None
-            
-        # Check for options with checkmark for correct answer
-        checkmark_match = False
-        if "✓" in line or "√" in line or "✔" in line:
-            # This option has a checkmark, indicating it's correct
-            checkmark_match = True
-            # Try to extract the option letter
-            option_match = option_pattern1.match(line.replace("✓", "").replace("√", "").replace("✔", "").strip())
-            if option_match:
-                correct_answer = option_match.group(1)
-        
-        # Check for standard options
-        option_match = option_pattern1.match(line) or option_pattern2.match(line)
-        if option_match:
-            option_letter = option_match.group(1)
-            option_text = option_match.group(2)
-            current_options.append(option_text)
-            
-            # If this option has checkmark in the same line or next line
-            if checkmark_match or (i+1 < len(lines) and ("✓" in lines[i+1] or "√" in lines[i+1] or "✔" in lines[i+1])):
-                correct_answer = option_letter
-        
-        # Check for correct answer standard format
-        correct_match = correct_pattern.match(line)
-        if correct_match:
-            correct_answer = correct_match.group(1)
-        
-        i += 1
-    
-    # Add the last question
-    if current_question and current_options:
-        if correct_answer:
-            if correct_answer.upper() in "ABCD":
-                correct_idx = ord(correct_answer.upper()) - ord('A') + 1
-            else:
-                correct_idx = int(correct_answer)
-        else:
-            correct_idx = 1  # Default to first option
-        
-        questions.append({
-            'question': current_question,
-            'options': current_options,
-            'correct_answer': correct_idx
-        })
+def pdf_import_stats(update, context):
+    """Show the PDF import pool and cache counters (admin only)"""
+    if update.effective_user.id not in ADMIN_USERS:
+        update.message.reply_text("Sorry, only admins can use this command.")
+        return
     
-    logger.info(f"Extracted {len(questions)} questions from PDF")
-    return questions
+    pool = get_pdf_import_pool().stats()
+    cache = get_pdf_cache().stats()
+    lookups = cache['memory_hits'] + cache['disk_hits'] + cache['misses']
+    hit_rate = (cache['memory_hits'] + cache['disk_hits']) / lookups * 100 if lookups else 0
+    update.message.reply_text(
+        "📑 PDF imports\n\n"
+        f"Workers: {pool['workers']}, imports in progress: {pool['jobs']}\n"
+        f"Completed: {pool['completed']}, cancelled: {pool['cancelled']}, failed: {pool['failed']}\n\n"
+        f"Cache hits: {cache['memory_hits']} in memory, {cache['disk_hits']} on disk; "
+        f"misses: {cache['misses']} ({hit_rate:.0f}% hits)\n"
+        f"Cached: {cache['memory_entries']} files in memory ({cache['memory_bytes'] / 1024:.0f} KB), "
+        f"{cache['disk_entries']} on disk ({cache['disk_bytes'] / 1024:.0f} KB)\n"
+        f"Evicted for size: {cache['memory_evictions']} from memory, {cache['disk_evictions']} from disk"
+    )
 
 def handle_pdf_import_callback(update, context):
     """
     Handle callback queries from PDF import buttons
     """
     query = update.callback_query
-    query.answer()
+    action = query.data[len('pdf_'):]
+    
+    # Stop button of a running import; the pool then sends what was found
+    if action.startswith('stop'):
+        job_id = action.partition(':')[2]
+        if job_id.isdigit() and get_pdf_import_pool().cancel(query.from_user.id, int(job_id)):
+            query.answer("Stopping the import...")
+        else:
+            query.answer("This PDF import is no longer running.")
+        return
     
-    action = query.data.split('_')[1]
+    query.answer()
     
     if 'pdf_questions' not in context.user_data:
         query.edit_message_text("Session expired. Please upload your PDF again.")
@@ -2575,6 +1527,8 @@ def handle_pdf_import_callback(update, context):
     questions = context.user_data['pdf_questions']
     
     if action == 'cancel':
+        context.user_data.pop('pdf_questions', None)
+        context.user_data.pop('waiting_for_pdf_quiz_name', None)
         query.edit_message_text("PDF import cancelled.")
         return
     
@@ -2607,29 +1561,48 @@ def handle_pdf_import_callback(update, context):
             )
             marathon_quiz.add_question(question)
         
+        context.user_data.pop('pdf_questions', None)
         query.edit_message_text(f"Added {len(questions)} questions to your marathon quiz. "
                               f"Current question count: {len(marathon_quiz.questions)}")
         return
     
     if action.startswith('name_'):
         # Create a new quiz with the selected name
-        quiz_name = action.split('name_')[1]
-        create_quiz_from_pdf(context, quiz_name, questions)
-        query.edit_message_text(f"Quiz '{quiz_name}' created with {len(questions)} questions!")
+        quiz_name = action[len('name_'):]
+        quiz = create_quiz_from_pdf(context, update.effective_user.id, quiz_name, questions)
+        context.user_data.pop('pdf_questions', None)
+        query.edit_message_text(f"Quiz '{quiz_name}' created with {len(questions)} questions! ID: {quiz.id}")
         return
     
     if action == 'custom_name':
-        # This requires the user to send a text message with the name
-        # We'll need to handle this in a conversation
+        # The name arrives as a text message, see handle_pdf_quiz_name
         context.user_data['waiting_for_pdf_quiz_name'] = True
         query.edit_message_text("Please reply with a name for your quiz:")
         return
 
-def create_quiz_from_pdf(context, quiz_name, questions_data):
+def handle_pdf_quiz_name(update, context):
+    """
+    Create the quiz from an imported PDF once the admin sends a custom name
+    """
+    if not context.user_data.get('waiting_for_pdf_quiz_name'):
+        return
+    
+    questions = context.user_data.get('pdf_questions')
+    context.user_data.pop('waiting_for_pdf_quiz_name', None)
+    if not questions:
+        update.message.reply_text("Session expired. Please upload your PDF again.")
+        return
+    
+    quiz_name = update.message.text.strip()
+    quiz = create_quiz_from_pdf(context, update.effective_user.id, quiz_name, questions)
+    context.user_data.pop('pdf_questions', None)
+    update.message.reply_text(f"Quiz '{quiz_name}' created with {len(questions)} questions! ID: {quiz.id}")
+
+def create_quiz_from_pdf(context, creator_id, quiz_name, questions_data):
     """
     Create a new quiz from PDF-extracted questions
     """
-    new_quiz = Quiz(quiz_name)
+    new_quiz = Quiz(quiz_name, "Imported from PDF", creator_id, time_limit=30)
     
     # Add questions
     for q_data in questions_data:
@@ -2640,246 +1613,11 @@ def create_quiz_from_pdf(context, quiz_name, questions_data):
         )
         new_quiz.add_question(question)
     
-    # Set default time (30 seconds per question)
-    new_quiz.time = len(new_quiz.questions) * 30
-    
     # Save to database
     add_quiz(new_quiz)
     
     return new_quiz
 
-def parse_hindi_questions(file_bytes):
-    """
-    Special parser for Hindi PDFs with checkmarks for correct answers
-    """
-    try:
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_file.write(file_bytes.getvalue())
-            temp_file_path = temp_file.name
-        
-        logger.info(f"Processing Hindi PDF at {temp_file_path}")
-        
-        # Try to use PyMuPDF as it handles Hindi better
-        questions = []
-        
-        try:
-            import fitz
-            doc = fitz.open(temp_file_path)
-            
-            # Process each page
-            current_question = None
-            current_options = []
-            correct_option = None
-            question_number = 0
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                
-                # Get text blocks
-                blocks = page.get_text("blocks")
-                
-                for block in blocks:
-                    text = block[4]  # The text is in the 5th element
-                    
-                    # Debug
-                    logger.info(f"Block: {text[:50]}...")
-                    
-                    # Check if this is a question (starts with Q followed by number)
-                    if text.strip().startswith("Q ") or text.strip().startswith("Q.") or re.match(r'^Q\d+\.', text.strip()):
-                        # If we have a previous question, save it
-                        if current_question and current_options:
-                            questions.append({
-                                'question': current_question,
-                                'options': current_options,
-                                'correct_answer': correct_option or 1
-                            })
-                            logger.info(f"Added question: {current_question[:30]}... with {len(current_options)} options")
-                        
-                        # Start a new question
-                        current_question = text.strip()
-                        current_options = []
-                        correct_option = None
-                        question_number += 1
-                    
-                    # Check if this block contains option markers (A), (B), etc.
-                    elif re.search(r'\([A-D]\)', text):
-                        current_options.append(text.strip())
-                        
-                        # Check if this option has a checkmark or is highlighted in blue/green
-                        if "✓" in text or "√" in text or re.search(r'\([A-D]\).*?(✓|√)', text):
-                            # Extract the option letter
-                            option_match = re.search(r'\(([A-D])\)', text)
-                            if option_match:
-                                option_letter = option_match.group(1)
-                                correct_option = ord(option_letter) - ord('A') + 1
-                                logger.info(f"Found correct option {option_letter} (index {correct_option})")
-            
-            # Add the last question
-            if current_question and current_options:
-                questions.append({
-                    'question': current_question,
-                    'options': current_options,
-                    'correct_answer': correct_option or 1
-                })
-            
-            # Clean up
-            doc.close()
-            
-        except Exception as e:
-            logger.error(f"Error processing Hindi PDF: {str(e)}")
-        
-        # Clean up the temporary file
-        try:
-            os.unlink(temp_file_path)
-        except:
-            pass
-        
-        logger.info(f"Extracted {len(questions)} questions from Hindi PDF")
-        return questions
-        
-    except Exception as e:
-        logger.error(f"Critical error in Hindi PDF processing: {str(e)}")
-        return []
-
-def extract_and_parse_questions(file_bytes):
-    """
-    Simplified approach to extract and parse questions from PDF
-    """
-    try:
-        # Save to temporary file
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_file.write(file_bytes.getvalue())
-            temp_file_path = temp_file.name
-        
-        logger.info(f"Processing PDF at {temp_file_path}")
-        
-        questions = []
-        extracted_text = ""
-        
-        # Try PyMuPDF first
-        try:
-            import fitz
-            doc = fitz.open(temp_file_path)
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                extracted_text += page.get_text() + "\n"
-            doc.close()
-        except Exception as e:
-            logger.error(f"PyMuPDF extraction failed: {str(e)}")
-            
-            # Try PyPDF2 as fallback
-            try:
-                import PyPDF2
-                with open(temp_file_path, 'rb') as f:
-                    pdf_reader = PyPDF2.PdfReader(f)
-                    for page_num in range(len(pdf_reader.pages)):
-                        page = pdf_reader.pages[page_num]
-                        extracted_text += page.extract_text() + "\n"
-            except Exception as e:
-                logger.error(f"PyPDF2 extraction failed: {str(e)}")
-                extracted_text = ""
-        
-        # Clean up temp file
-        try:
-            os.unlink(temp_file_path)
-        except:
-            pass
-        
-        if not extracted_text:
-            logger.error("Failed to extract text from PDF")
-            return []
-        
-        # Simple approach: Look for patterns that look like questions and options
-        lines = extracted_text.split('\n')
-        
-        # Initialize variables
-        current_question = None
-        current_question_text = None
-        current_options = []
-        correct_option = None
-        
-        logger.info(f"Extracted {len(lines)} lines from PDF")
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check if line looks like a question (Q1, 1., etc.)
-            question_match = re.search(r'(?:Q|q)?\.?\s*(\d+)\.?\s+(.+)', line)
-            if question_match:
-                # If we already have a question, save it before starting a new one
-                if current_question_text and current_options:
-                    correct_idx = 1  # Default to first option
-                    if correct_option:
-                        if correct_option.upper() in "ABCD":
-                            correct_idx = ord(correct_option.upper()) - ord('A') + 1
-                        else:
-                            try:
-                                correct_idx = int(correct_option)
-                            except:
-                                pass
-                    
-                    questions.append({
-                        'question': current_question_text,
-                        'options': current_options,
-                        'correct_answer': correct_idx
-                    })
-                
-                # Start a new question
-                current_question = int(question_match.group(1))
-                current_question_text = question_match.group(2)
-                current_options = []
-                correct_option = None
-                logger.info(f"Found question {current_question}: {current_question_text[:30]}...")
-            
-            # Check if line looks like an option (A., B., (A), etc.)
-            option_match = re.search(r'(?:\()?([A-Da-d])(?:\))?\.?\s+(.+)', line)
-            if option_match and current_question_text:
-                option_letter = option_match.group(1).upper()
-                option_text = option_match.group(2)
-                
-                # Add this option
-                current_options.append(option_text)
-                logger.info(f"Found option {option_letter}: {option_text[:30]}...")
-                
-                # If this line or the next few lines contain a checkmark, it's the correct answer
-                if "✓" in line or "✔" in line or "√" in line:
-                    correct_option = option_letter
-                    logger.info(f"Option {option_letter} marked as correct")
-            
-            # Check if line indicates the correct answer
-            correct_match = re.search(r'(?:Correct|Answer|Ans):\s*([A-Da-d])', line, re.IGNORECASE)
-            if correct_match and current_question_text:
-                correct_option = correct_match.group(1)
-                logger.info(f"Found correct answer: {correct_option}")
-        
-        # Add the last question
-        if current_question_text and current_options:
-            correct_idx = 1  # Default to first option
-            if correct_option:
-                if correct_option.upper() in "ABCD":
-                    correct_idx = ord(correct_option.upper()) - ord('A') + 1
-                else:
-                    try:
-                        correct_idx = int(correct_option)
-                    except:
-                        pass
-            
-            questions.append({
-                'question': current_question_text,
-                'options': current_options,
-                'correct_answer': correct_idx
-            })
-        
-        logger.info(f"Extracted {len(questions)} questions total")
-        return questions
-    
-    except Exception as e:
-        logger.error(f"Error in extract_and_parse_questions: {str(e)}")
-        return []
-
 def diagnose_pdf_import(update, context):
     """
     Diagnostic command to identify issues with PDF import
@@ -2894,263 +1632,86 @@ def diagnose_pdf_import(update, context):
     context.user_data['pdf_diagnostic_mode'] = True
     update.message.reply_text("PDF diagnostic mode activated. Please forward a PDF file to analyze.")
 
-def import_questions_from_pdf(update, context):
+def run_pdf_diagnostics(update, context):
     """
-    Handler function for importing questions from a PDF document
-    Now handles both regular imports and diagnostic mode
+    Run diagnostics on a PDF file to identify parsing issues
     """
-    # Check if user is admin
-    user_id = update.effective_user.id
-    if user_id not in ADMIN_USERS:
-        update.message.reply_text("Sorry, only admins can import questions from PDFs.")
-        return
-    
-    # Check if a document was provided
-    if not update.message.document or update.message.document.mime_type != 'application/pdf':
-        update.message.reply_text("Please forward a PDF file.")
-        return
-    
-    # Check if we're in diagnostic mode
-    diagnostic_mode = context.user_data.get('pdf_diagnostic_mode', False)
-    if diagnostic_mode:
-        # Clear the diagnostic mode flag
-        context.user_data['pdf_diagnostic_mode'] = False
-        # Run diagnostic process
-        run_pdf_diagnostics(update, context)
-        return
-    
-    # Normal PDF import process continues below
-    # Get the document file
     document = update.message.document
-    file_id = document.file_id
-    
-    update.message.reply_text("Downloading PDF file...")
-    
-    # Download the file
-    file = context.bot.get_file(file_id)
-    file_bytes = io.BytesIO()
-    file.download(out=file_bytes)
-    file_bytes.seek(0)
-    
-    update.message.reply_text("Processing PDF file. This may take a moment...")
-    
-    # Extract and parse questions
-    questions = extract_and_parse_questions(file_bytes)
+    file_name = document.file_name if document.file_name else "unknown.pdf"
+    update.message.reply_text(f"📄 PDF Information:\n- Name: {file_name}\n- Size: {document.file_size} bytes")
     
-    if not questions:
-        update.message.reply_text("No questions could be extracted from the PDF. "
-                                 "Make sure the format is correct.")
+    try:
+        source = _download_document(update, context)
+    except Exception as e:
+        update.message.reply_text(f"❌ Download failed: {str(e)}")
         return
     
-    # Store questions temporarily in user data
-    context.user_data['pdf_questions'] = questions
+    # Run the import pipeline with a parse trace, which keeps a few examples
+    # of each kind of line and of each problem the parser ran into. It runs
+    # in the PDF import pool like an import; the report is sent from there
+    bot = context.bot
+    chat_id = update.effective_chat.id
     
-    # Create a confirmation message with question preview
-    preview_text = "Extracted the following questions:\n\n"
-    for i, question in enumerate(questions[:3], 1):  # Preview first 3 questions
-        preview_text += f"{i}. {question['question'][:50]}...\n"
-        for j, option in enumerate(question['options'][:4], 1):
-            preview_text += f"   {j}. {option[:30]}...\n"
-        preview_text += f"   Correct: Option {question['correct_answer']}\n\n"
-    
-    if len(questions) > 3:
-        preview_text += f"... and {len(questions) - 3} more questions\n\n"
-    
-    # Ask user to confirm import and provide a quiz name
-    keyboard = [
-        [InlineKeyboardButton("Create New Quiz", callback_data="pdf_create")],
-        [InlineKeyboardButton("Add to Marathon Quiz", callback_data="pdf_marathon")],
-        [InlineKeyboardButton("Cancel", callback_data="pdf_cancel")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    def on_done(job):
+        _release_download(source)
+        send_pdf_diagnostics(bot, chat_id, job)
     
-    update.message.reply_text(
-        f"{preview_text}What would you like to do with these questions?",
-        reply_markup=reply_markup
+    job, reason = get_pdf_import_pool().diagnose(
+        update.effective_user.id, source, on_done, max(PDF_TRACE_SAMPLES, 1)
     )
+    if job is None:
+        _release_download(source)
+        update.message.reply_text(reason)
 
-def run_pdf_diagnostics(update, context):
+def send_pdf_diagnostics(bot, chat_id, job):
     """
-    Run diagnostics on a PDF file to identify parsing issues
+    Report what a /diagnose_pdf_import run recognized
+    
+    Called by the PDF import pool, so all messages go through the outbound
+    queue, which keeps them in order.
     """
-    # Get the document file
-    document = update.message.document
-    file_id = document.file_id
-    file_name = document.file_name if document.file_name else "unknown.pdf"
-    file_size = document.file_size
+    outbound = get_outbound(bot)
     
-    update.message.reply_text(f"📄 PDF Information:\n- Name: {file_name}\n- Size: {file_size} bytes")
+    def reply(text):
+        outbound.send_message(chat_id, text)
     
-    # Download the file
     try:
-        update.message.reply_text("⬇️ Downloading PDF file...")
-        file = context.bot.get_file(file_id)
-        file_bytes = io.BytesIO()
-        file.download(out=file_bytes)
-        file_bytes.seek(0)
-        update.message.reply_text("✅ Download successful")
-    except Exception as e:
-        update.message.reply_text(f"❌ Download failed: {str(e)}")
+        result = job.future.result()
+    except ImportError:
+        reply("❌ No PDF extraction library is installed. Please install PyMuPDF "
+              "(pip install pymupdf) or PyPDF2 (pip install PyPDF2)")
         return
-    
-    # Save to temporary file
-    try:
-        update.message.reply_text("💾 Saving to temporary file...")
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-            temp_file.write(file_bytes.getvalue())
-            temp_file_path = temp_file.name
-        update.message.reply_text(f"✅ Saved to {temp_file_path}")
-    except Exception as e:
-        update.message.reply_text(f"❌ Failed to save: {str(e)}")
+    except BrokenExecutor:
+        reply("❌ The PDF reader crashed while reading this file. Please try again, or try another file.")
         return
-    
-    # Check for required PDF libraries
-    pymupdf_available = False
-    pypdf2_available = False
-    
-    # Test PyMuPDF extraction
-    update.message.reply_text("🔍 Testing extraction with PyMuPDF...")
-    try:
-        import fitz
-        pymupdf_available = True
-        doc = fitz.open(temp_file_path)
-        page_count = len(doc)
-        update.message.reply_text(f"📄 PDF has {page_count} pages")
-        
-        # Extract text from first page as sample
-        if page_count > 0:
-            page = doc.load_page(0)
-            text = page.get_text()
-            text_preview = text[:200] + "..." if len(text) > 200 else text
-            update.message.reply_text(f"📝 First page text sample:\n{text_preview}")
-        
-        doc.close()
-        update.message.reply_text("✅ PyMuPDF extraction successful")
-    except ImportError:
-        update.message.reply_text("❌ PyMuPDF is not installed. Please install it using: pip install pymupdf")
     except Exception as e:
-        update.message.reply_text(f"❌ PyMuPDF extraction failed: {str(e)}")
+        reply(f"❌ Text extraction failed: {str(e)}")
+        return
+    if job.cancelled():
+        reply("PDF diagnostics cancelled.")
+        return
+    questions, stats, _, trace, first_page = result
     
-    # Try PyPDF2 as fallback
-    update.message.reply_text("🔍 Testing extraction with PyPDF2...")
-    try:
-        import PyPDF2
-        pypdf2_available = True
-        with open(temp_file_path, 'rb') as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            page_count = len(pdf_reader.pages)
-            update.message.reply_text(f"📄 PDF has {page_count} pages")
-            
-            # Extract text from first page as sample
-            if page_count > 0:
-                text = pdf_reader.pages[0].extract_text()
-                text_preview = text[:200] + "..." if len(text) > 200 else text
-                update.message.reply_text(f"📝 First page text sample:\n{text_preview}")
-        update.message.reply_text("✅ PyPDF2 extraction successful")
-    except ImportError:
-        update.message.reply_text("❌ PyPDF2 is not installed. Please install it using: pip install PyPDF2")
-    except Exception as e:
-        update.message.reply_text(f"❌ PyPDF2 extraction failed: {str(e)}")
+    mode = "layout-aware" if PDF_LAYOUT_EXTRACTION else "plain text"
+    reply(f"📄 PDF has {stats.pages} pages with {stats.lines} lines of text ({mode} extraction)")
+    if first_page:
+        reply(f"📝 First page text sample:\n{first_page}")
     
-    # Show summary if neither library is available
-    if not pymupdf_available and not pypdf2_available:
-        update.message.reply_text("⚠️ No PDF extraction libraries are installed. Please install one of the following:")
-        update.message.reply_text("1️⃣ PyMuPDF (recommended): pip install pymupdf")
-        update.message.reply_text("2️⃣ PyPDF2 (alternative): pip install PyPDF2")
-        
-        # Clean up temp file
-        try:
-            os.unlink(temp_file_path)
-        except:
-            pass
-            
-        update.message.reply_text("🔍 Diagnosis complete - PDF libraries need to be installed")
-        return
+    counts = trace.counts
+    reply(
+        f"🔍 Found {counts.get(TOKEN_QUESTION, 0)} question lines, {counts.get(TOKEN_OPTION, 0)} options, "
+        f"{counts.get(TOKEN_ANSWER, 0)} answer lines and {counts.get(TOKEN_TEXT, 0)} other lines"
+    )
+    for kind in (TOKEN_QUESTION, TOKEN_OPTION):
+        if kind not in counts:
+            reply(f"❌ No lines matched the {kind} pattern")
     
-    # Try to parse text from the extracted PDF
-    # Only run this if at least one library is available
-    if pymupdf_available or pypdf2_available:
-        update.message.reply_text("🔍 Attempting to extract all text for question parsing...")
-        
-        # Get all text from PDF
-        all_text = ""
-        
-        if pymupdf_available:
-            try:
-                # Use PyMuPDF
-                import fitz
-                doc = fitz.open(temp_file_path)
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    all_text += page.get_text() + "\n"
-                doc.close()
-            except Exception as e:
-                update.message.reply_text(f"❌ PyMuPDF text extraction failed: {str(e)}")
-                all_text = ""
-        
-        if not all_text and pypdf2_available:
-            try:
-                # Fall back to PyPDF2
-                import PyPDF2
-                with open(temp_file_path, 'rb') as f:
-                    pdf_reader = PyPDF2.PdfReader(f)
-                    for page_num in range(len(pdf_reader.pages)):
-                        all_text += pdf_reader.pages[page_num].extract_text() + "\n"
-            except Exception as e:
-                update.message.reply_text(f"❌ PyPDF2 text extraction failed: {str(e)}")
-                all_text = ""
-        
-        # Clean up temp file
-        try:
-            os.unlink(temp_file_path)
-        except:
-            pass
-        
-        if not all_text:
-            update.message.reply_text("❌ Failed to extract any text for parsing")
-        else:
-            update.message.reply_text(f"✅ Extracted {len(all_text)} characters of text")
-            
-            # Look for potential questions and options
-            lines = all_text.split('\n')
-            question_pattern = re.compile(r'(\d+)[\.)\s]+(.+)')
-            option_pattern = re.compile(r'([A-Da-d])[\.)\s]+(.+)')
-            
-            # Count potential questions and options
-            question_lines = []
-            option_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Check for question pattern
-                question_match = question_pattern.search(line)
-                if question_match:
-                    question_lines.append(line)
-                
-                # Check for option pattern
-                option_match = option_pattern.search(line)
-                if option_match:
-                    option_lines.append(line)
-            
-            update.message.reply_text(f"🔍 Found {len(question_lines)} potential question lines and {len(option_lines)} potential option lines")
-            
-            # Show examples of what was found
-            if question_lines:
-                examples = "\n".join(question_lines[:3])
-                update.message.reply_text(f"📝 Question examples:\n{examples}")
-            else:
-                update.message.reply_text("❌ No lines matched question pattern")
-            
-            if option_lines:
-                examples = "\n".join(option_lines[:3])
-                update.message.reply_text(f"📝 Option examples:\n{examples}")
-            else:
-                update.message.reply_text("❌ No lines matched option pattern")
+    # One message per category, so a long trace stays under Telegram's message size limit
+    for category, count, samples in trace.categories():
+        reply(f"📝 {category.capitalize()} ({count}), first {len(samples)}:\n" + "\n".join(samples))
     
-    update.message.reply_text("🔍 Diagnosis complete")
+    reply(f"✅ {len(questions)} complete questions would be imported")
+    reply("🔍 Diagnosis complete")
 
 def diagnose_pdf(update, context):
     """
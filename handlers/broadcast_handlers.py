@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Handlers for live quizzes broadcast to a group or channel
+"""
+
+import functools
+import logging
+
+from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
+from telegram.ext import CallbackContext
+
+from utils.database import get_quiz, get_user, record_quiz_result
+from utils.broadcast import BroadcastSession
+from utils.outbound import get_outbound
+from utils.timer_wheel import get_timer_wheel
+from config import ADMIN_USERS
+
+logger = logging.getLogger(__name__)
+
+# Running broadcasts by chat_id
+broadcast_sessions = {}
+
+# Participants shown on the scoreboard after each question
+SCOREBOARD_SIZE = 10
+
+def may_broadcast(bot: Bot, update: Update) -> bool:
+    """Whether the sender of a command may run live quizzes in its chat.
+
+    Channel posts and anonymous group admins send as the chat itself, with
+    no user to check. Only the chat's admins can do that, so the command is
+    allowed when one of the bot's admins administers the chat.
+    """
+    chat_id = update.effective_chat.id
+    sender_chat = update.effective_message.sender_chat
+    if sender_chat is None or sender_chat.id != chat_id:
+        user = update.effective_user
+        return user is not None and user.id in ADMIN_USERS
+
+    try:
+        administrators = bot.get_chat_administrators(chat_id)
+    except TelegramError as e:
+        logger.warning(f"Could not get the administrators of chat {chat_id}: {e}")
+        return False
+    return any(member.user.id in ADMIN_USERS for member in administrators)
+
+def start_broadcast(update: Update, context: CallbackContext) -> None:
+    """Start a live quiz for everyone in the current chat or channel."""
+    message = update.effective_message
+    chat_id = update.effective_chat.id
+
+    if not may_broadcast(context.bot, update):
+        message.reply_text("Sorry, only admins can start a broadcast quiz.")
+        return
+
+    # Channel posts reach this through a MessageHandler, which doesn't split arguments
+    args = context.args if context.args is not None else message.text.split()[1:]
+    if not args:
+        message.reply_text("Please provide a quiz ID: /broadcast (quiz_id)")
+        return
+
+    quiz_id = args[0]
+    quiz = get_quiz(quiz_id)
+    if not quiz or not quiz.questions:
+        message.reply_text(
+            f"Quiz with ID {quiz_id} not found. Use /list to see available quizzes."
+        )
+        return
+
+    if chat_id in broadcast_sessions:
+        message.reply_text("A quiz is already running in this chat. Use /stopbroadcast to stop it.")
+        return
+
+    # Sent as the chat itself, the chat hosts the quiz
+    host_id = update.effective_user.id if update.effective_user else chat_id
+    session = BroadcastSession(chat_id, quiz, host_id)
+    broadcast_sessions[chat_id] = session
+
+    message.reply_text(
+        f"📣 Live quiz: {quiz.title}\n\n"
+        f"{quiz.description}\n"
+        f"Questions: {len(quiz.questions)}\n"
+        f"Negative marking: {quiz.negative_marking_factor} points\n\n"
+        "Everyone in this chat can answer. The first answer to each question counts."
+    )
+
+    send_broadcast_question(context.bot, session, 0)
+
+def send_broadcast_question(bot: Bot, session: BroadcastSession, question_index: int) -> None:
+    """Send a question to the broadcast chat and arm its shared deadline."""
+    quiz = session.quiz
+    question = quiz.questions[question_index]
+    time_limit = question.time_limit if question.time_limit is not None else quiz.time_limit
+
+    keyboard = [
+        [InlineKeyboardButton(option, callback_data=f"bcast_{question_index}_{i}")]
+        for i, option in enumerate(question.options)
+    ]
+    # Called from close_broadcast_question on the timer wheel, so the
+    # question is opened once it is sent instead of waiting for it here
+    get_outbound(bot).send_message(
+        session.chat_id,
+        f"Question {question_index + 1}/{len(quiz.questions)}:\n\n"
+        f"{question.text}\n\n"
+        f"⏱️ {time_limit} seconds to answer",
+        InlineKeyboardMarkup(keyboard)
+    ).add_done_callback(functools.partial(
+        _broadcast_question_sent, bot, session, question_index, time_limit
+    ))
+
+def _broadcast_question_sent(bot: Bot, session: BroadcastSession, question_index: int, time_limit: int, future) -> None:
+    """Open a sent question for answers and arm its shared deadline."""
+    try:
+        message = future.result()
+    except Exception as e:
+        logger.error(f"Could not send broadcast question {question_index + 1} to chat {session.chat_id}: {e}")
+        return
+    if message is None or broadcast_sessions.get(session.chat_id) is not session:
+        return
+
+    session.open_question(question_index, message.message_id, time_limit)
+    get_timer_wheel().schedule(
+        time_limit, close_broadcast_question, bot, session.chat_id, question_index,
+        key=f"bcast_{session.chat_id}"
+    )
+
+def broadcast_answer_callback(update: Update, context: CallbackContext) -> None:
+    """Collect a participant's answer to the open broadcast question."""
+    query = update.callback_query
+    session = broadcast_sessions.get(query.message.chat_id)
+    if session is None:
+        query.answer("This quiz has ended.")
+        return
+
+    _, question_index, selected_option = query.data.split('_')
+    user = query.from_user
+    if session.record_answer(user.id, int(question_index), int(selected_option)):
+        # Registers the participant's name for the scoreboard
+        get_user(user.id, user.username, user.first_name, user.last_name)
+        query.answer("Answer recorded!")
+    else:
+        query.answer("You already answered, or this question is closed.")
+
+def close_broadcast_question(bot: Bot, chat_id: int, question_index: int) -> None:
+    """Close a question at its deadline, then move on to the next one."""
+    session = broadcast_sessions.get(chat_id)
+    if session is None:
+        return
+
+    option_counts = session.close_question(question_index)
+    if option_counts is None:
+        return
+
+    question = session.quiz.questions[question_index]
+    outbound = get_outbound(bot)
+
+    # Reveal the answer and how the chat voted, in the question message itself
+    lines = [
+        f"Question {question_index + 1}/{len(session.quiz.questions)}:\n",
+        f"{question.text}\n"
+    ]
+    for i, option in enumerate(question.options):
+        mark = "✅" if i == question.correct_option else "▫️"
+        lines.append(f"{mark} {chr(65 + i)}. {option} — {option_counts[i]}")
+    lines.append(f"\n{sum(option_counts)} answers")
+    outbound.edit_message_text(chat_id, session.message_id, '\n'.join(lines))
+
+    # One scoreboard message for the whole quiz, edited once per question
+    scoreboard = format_standings(session, f"📊 Scores after question {question_index + 1}")
+    if session.scoreboard_message_id is None:
+        outbound.send_message(chat_id, scoreboard).add_done_callback(
+            functools.partial(_scoreboard_sent, session)
+        )
+    else:
+        outbound.edit_message_text(chat_id, session.scoreboard_message_id, scoreboard)
+
+    if question_index + 1 < len(session.quiz.questions):
+        send_broadcast_question(bot, session, question_index + 1)
+    else:
+        finish_broadcast(bot, session)
+
+def _scoreboard_sent(session: BroadcastSession, future) -> None:
+    """Remember the scoreboard message so that later questions edit it."""
+    try:
+        message = future.result()
+    except Exception as e:
+        logger.error(f"Could not send the broadcast scoreboard to chat {session.chat_id}: {e}")
+        return
+    if message is not None:
+        session.scoreboard_message_id = message.message_id
+
+def format_standings(session: BroadcastSession, title: str) -> str:
+    """Format the top participants of a broadcast."""
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    lines = [f"{title} ({len(session)} participants)\n"]
+    for rank, (user_id, score, correct) in enumerate(session.standings(SCOREBOARD_SIZE), 1):
+        user = get_user(user_id)
+        name = user.username or user.first_name or str(user.id)
+        lines.append(f"{medals.get(rank, f'{rank}.')} {name} - {score} ({correct} correct)")
+    return '\n'.join(lines)
+
+def finish_broadcast(bot: Bot, session: BroadcastSession) -> None:
+    """Post the final standings and store every participant's result."""
+    broadcast_sessions.pop(session.chat_id, None)
+
+    get_outbound(bot).send_message(
+        session.chat_id,
+        format_standings(session, f"🏁 Final results: {session.quiz.title}")
+    )
+
+    max_score = len(session.quiz.questions)
+    for user_id, score, answers in session.results():
+        record_quiz_result(user_id, session.quiz.id, score, max_score, answers)
+    logger.info(f"Broadcast of quiz {session.quiz.id} in chat {session.chat_id} finished with {len(session)} participants")
+
+def stop_broadcast(update: Update, context: CallbackContext) -> None:
+    """Stop the live quiz running in the current chat or channel."""
+    if not may_broadcast(context.bot, update):
+        update.effective_message.reply_text("Sorry, only admins can stop a broadcast quiz.")
+        return
+
+    chat_id = update.effective_chat.id
+    session = broadcast_sessions.pop(chat_id, None)
+    if session is None:
+        update.effective_message.reply_text("No quiz is running in this chat.")
+        return
+
+    get_timer_wheel().cancel(f"bcast_{chat_id}")
+    update.effective_message.reply_text(f"Live quiz {session.quiz.title} stopped.")
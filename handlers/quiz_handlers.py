@@ -5,24 +5,37 @@
 Handlers for user-facing quiz functionality
 """
 
+import atexit
+import functools
 import json
 import logging
 import time
 import os
 from datetime import datetime
 from io import BytesIO
+from types import SimpleNamespace
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Bot, Poll, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import CallbackContext
 
 from models.user import User
+from models.quiz import DELIVERY_POLL
 from utils.database import (
     get_quiz, get_quizzes, get_user, record_quiz_result,
-    get_user_quiz_results
+    get_user_quiz_results, get_leaderboard, iter_quiz_results_by_score
 )
 from utils.quiz_manager import QuizSession, import_quiz_from_file
+from utils.question_cache import get_question_payload
+from utils.timer_wheel import get_timer_wheel
+from utils.outbound import get_outbound
+from utils.countdown import get_countdown_editor
+from utils.session_store import SessionSnapshotter
+from utils.session_manager import SessionManager
 from utils.pdf_generator import generate_result_pdf
-from config import ADMIN_USERS
+from config import (
+    ADMIN_USERS, SESSION_SNAPSHOT_PATH, SESSION_SNAPSHOT_INTERVAL,
+    SESSION_IDLE_TTL, SESSION_REAP_INTERVAL, MAX_ACTIVE_SESSIONS
+)
 
 # Enable logging
 logging.basicConfig(
@@ -31,8 +44,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Store active sessions by user_id
-active_sessions = {}
+# Store active sessions by user_id; abandoned ones are closed by reap_sessions()
+active_sessions = SessionManager(MAX_ACTIVE_SESSIONS, SESSION_IDLE_TTL)
+
+# Writes active_sessions to SESSION_SNAPSHOT_PATH, see restore_sessions()
+_snapshotter = None
+
+# Open quiz polls: poll_id -> (user_id, chat_id, question_index)
+poll_sessions = {}
+
+# Seconds after a quiz poll closes before it counts as unanswered; answers
+# given just before the poll closed may still be on their way
+POLL_GRACE_PERIOD = 2
+
+def locked_per_user(handler):
+    """Run a handler while holding the session lock of the user who sent the update."""
+    @functools.wraps(handler)
+    def wrapper(update: Update, context: CallbackContext):
+        with active_sessions.lock(update.effective_user.id):
+            return handler(update, context)
+    return wrapper
 
 def start(update: Update, context: CallbackContext) -> None:
     """Send a welcome message when the command /start is issued."""
@@ -55,7 +86,8 @@ def start(update: Update, context: CallbackContext) -> None:
             "• /list - List available quizzes\n"
             "• /take [quiz_id] - Start a quiz\n"
             "• /cancel - Cancel operation\n"
-            "• /results - Get quiz results as PDF\n\n"
+            "• /results - Get quiz results as PDF\n"
+            "• /leaderboard [quiz_id] - Show top scores\n\n"
             "👨‍💻 Created by: @JaatCoderX\n\n"
             "Use /list to see available quizzes!"
         )
@@ -74,6 +106,7 @@ def help_command(update: Update, context: CallbackContext) -> None:
         "/list - List all available quizzes",
         "/take (quiz_id) - Take a specific quiz",
         "/results - Get your quiz results",
+        "/leaderboard (quiz_id) - Show the top scores for a quiz",
         "/admin - Show admin commands (admin only)",
     ]
     
@@ -104,6 +137,44 @@ def list_quizzes(update: Update, context: CallbackContext) -> None:
         '\nUse /take (quiz_id) to take a quiz.'
     )
 
+def restore_sessions(bot: Bot) -> None:
+    """Restore quizzes that were in progress before a restart and start snapshotting them."""
+    global _snapshotter
+    if not SESSION_SNAPSHOT_PATH or _snapshotter is not None:
+        return
+    
+    _snapshotter = SessionSnapshotter(
+        SESSION_SNAPSHOT_PATH, active_sessions, SESSION_SNAPSHOT_INTERVAL, active_sessions.lock
+    )
+    restored = 0
+    for state in _snapshotter.load().values():
+        quiz = get_quiz(state.quiz_id)
+        if not quiz or len(quiz.questions) != len(state.selected_options):
+            continue
+        
+        session = QuizSession(state.user_id, quiz)
+        session.current_question_index = state.current_question_index
+        session.selected_options = state.selected_options
+        session.correct_bits = state.correct_bits
+        session.set_current_message(state.chat_id, state.message_id, state.deadline, state.poll_id)
+        _snapshotter.adopt(session, state)
+        for evicted in active_sessions.add(session.user_id, session):
+            close_session(bot, evicted, "evicted")
+        restored += 1
+        
+        # Re-arm the current question's timers for the time it had left
+        if session.deadline is None or not session.get_current_question():
+            continue
+        if session.current_poll_id:
+            arm_poll_timer(bot, session)
+        else:
+            arm_question_timers(bot, session, get_question_payload(quiz, session.current_question_index))
+    
+    logger.info(f"Restored {restored} quiz sessions from {SESSION_SNAPSHOT_PATH}")
+    _snapshotter.start()
+    atexit.register(_snapshotter.close)
+
+@locked_per_user
 def take_quiz(update: Update, context: CallbackContext) -> str:
     """Start a quiz for a user."""
     user_id = update.effective_user.id
@@ -133,7 +204,10 @@ def take_quiz(update: Update, context: CallbackContext) -> str:
     
     # Create a new session
     session = QuizSession(user_id, quiz)
-    active_sessions[user_id] = session
+    # Closing takes the evicted user's lock, so it is left to the timer
+    # wheel: two users evicting each other here would deadlock
+    for evicted in active_sessions.add(user_id, session):
+        get_timer_wheel().schedule(0, close_session, context.bot, evicted, "evicted")
     
     # Start the quiz
     update.message.reply_text(
@@ -145,33 +219,9 @@ def take_quiz(update: Update, context: CallbackContext) -> str:
         "Use /cancel to cancel the quiz."
     )
     
-    # Get the first question
-    question = session.get_current_question()
-    
-    # Create options keyboard
-    keyboard = []
-    for i, option in enumerate(question.options):
-        callback_data = f"answer_{i}"
-        keyboard.append([InlineKeyboardButton(option, callback_data=callback_data)])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    # Send question
-    question_num = session.current_question_index + 1
-    total_questions = len(session.quiz.questions)
-    
-    # Determine which time limit to use for this question
-    question_time_limit = question.time_limit if hasattr(question, 'time_limit') and question.time_limit is not None else session.quiz.time_limit
-    
-    message = update.message.reply_text(
-        f"Question {question_num}/{total_questions}:\n\n"
-        f"{question.text}\n\n"
-        f"⏱️ Time remaining: {question_time_limit} seconds",
-        reply_markup=reply_markup
-    )
-    
-    # Store the message ID for later updates
-    session.current_message_id = message.message_id
+    # Send the first question; its message ID is stored and its deadline
+    # armed once the message is out, without holding this user's lock
+    send_quiz_question(update, context, session)
     
     return "ANSWERING"
     
@@ -185,131 +235,239 @@ def send_quiz_question(update: Update, context: CallbackContext, session: QuizSe
             end_quiz(update, context, session)
             return
         
-        # Create options keyboard
-        keyboard = []
-        for i, option in enumerate(question.options):
-            callback_data = f"answer_{i}"
-            keyboard.append([InlineKeyboardButton(option, callback_data=callback_data)])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Send question
-        question_num = session.current_question_index + 1
-        total_questions = len(session.quiz.questions)
-        
-        # Determine which time limit to use for this question
-        question_time_limit = question.time_limit if hasattr(question, 'time_limit') and question.time_limit is not None else session.quiz.time_limit
+        # Get the pre-rendered question text and keyboard
+        payload = get_question_payload(session.quiz, session.current_question_index)
         
-        # Check if we're using update.message or a fake message
-        if hasattr(update, 'message') and update.message:
-            message = update.message.reply_text(
-                f"Question {question_num}/{total_questions}:\n\n"
-                f"{question.text}\n\n"
-                f"⏱️ Time remaining: {question_time_limit} seconds",
-                reply_markup=reply_markup
-            )
-        else:
-            # This is probably a callback context, use the bot to send
-            message = context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=f"Question {question_num}/{total_questions}:\n\n"
-                     f"{question.text}\n\n"
-                     f"⏱️ Time remaining: {question_time_limit} seconds",
-                reply_markup=reply_markup
-            )
-        
-        # Store the message ID for later updates
-        session.current_message_id = message.message_id
-        
-        # Clear any existing timer jobs for this user
-        for job in context.job_queue.get_jobs_by_name(f"timer_{session.user_id}"):
-            job.schedule_removal()
-        
-        # Set up timer for this question
-        context.job_queue.run_once(
-            time_up,
-            question_time_limit,
-            data={
-                "user_id": session.user_id,
-                "chat_id": update.effective_chat.id,
-                "question_index": session.current_question_index
-            },
-            name=f"time_up_{session.user_id}_{session.current_question_index}"
-        )
+        # Questions that fit Telegram's limits can go out as quiz polls
+        if session.quiz.delivery_mode == DELIVERY_POLL and payload.poll_question is not None:
+            send_poll_question(context.bot, update.effective_chat.id, session, payload)
+            return
         
-        # Set up timer update job with unique name
-        timer_data = {
-            "user_id": session.user_id,
-            "chat_id": update.effective_chat.id,
-            "message_id": message.message_id,
-            "question_text": question.text,
-            "question_index": session.current_question_index,
-            "end_time": time.time() + question_time_limit,
-            "total_time": question_time_limit,
-            "reply_markup": reply_markup
-        }
-        
-        # First update in 3 seconds with unique job name
-        context.job_queue.run_once(
-            update_timer,
-            3,
-            data=timer_data,
-            name=f"timer_{session.user_id}"
-        )
+        # The countdown edits need the message ID; waiting for it here would
+        # hold up the timer wheel when called from poll_closed
+        get_outbound(context.bot).send_message(
+            update.effective_chat.id, payload.text, payload.reply_markup
+        ).add_done_callback(functools.partial(
+            _question_sent, context.bot, update.effective_chat.id, session,
+            session.current_question_index, payload
+        ))
     except Exception as e:
         # If something goes wrong, fall back to original behavior
         logging.error(f"Error in send_quiz_question: {str(e)}")
         # Attempt to send a basic question without the timer updates
-        question = session.get_current_question()
-        question_time_limit = question.time_limit if hasattr(question, 'time_limit') and question.time_limit is not None else session.quiz.time_limit
+        payload = get_question_payload(session.quiz, session.current_question_index)
         
-        # Create options keyboard
-        keyboard = []
-        for i, option in enumerate(question.options):
-            callback_data = f"answer_{i}"
-            keyboard.append([InlineKeyboardButton(option, callback_data=callback_data)])
+        get_outbound(context.bot).send_message(
+            update.effective_chat.id, payload.text, payload.reply_markup
+        )
+
+def _question_sent(bot: Bot, chat_id: int, session: QuizSession, question_index: int, payload, future) -> None:
+    """Start the deadline of a question once its message is sent.
+    
+    Runs on the outbound thread that sent the message, which must not wait
+    for session locks, so the session is updated from the timer wheel.
+    """
+    try:
+        message = future.result()
+    except Exception as e:
+        logger.error(f"Could not send question {question_index + 1} to chat {chat_id}: {e}")
+        return
+    if message is None:
+        return
+    get_timer_wheel().schedule(
+        0, _question_started, bot, chat_id, session, question_index,
+        message.message_id, time.time() + payload.time_limit, payload
+    )
+
+def _question_started(bot: Bot, chat_id: int, session: QuizSession, question_index: int,
+                      message_id: int, deadline: float, payload) -> None:
+    """Store a sent question's message and arm its timers, unless it was answered or closed meanwhile."""
+    with active_sessions.lock(session.user_id):
+        if active_sessions.get(session.user_id) is not session or session.current_question_index != question_index:
+            return
+        # time_up already closed it; a new deadline would reopen it to answers
+        if session.deadline is not None:
+            return
+        session.set_current_message(chat_id, message_id, deadline)
+        arm_question_timers(bot, session, payload)
+
+def arm_question_timers(bot: Bot, session: QuizSession, payload) -> None:
+    """Set up the deadline and countdown updates of the current question."""
+    remaining = max(0, session.deadline - time.time())
+    
+    # Set up the deadline for this question, replacing the previous one
+    wheel = get_timer_wheel()
+    wheel.schedule(
+        remaining,
+        time_up,
+        bot,
+        {
+            "user_id": session.user_id,
+            "chat_id": session.chat_id,
+            "question_index": session.current_question_index
+        },
+        key=f"time_up_{session.user_id}"
+    )
+    
+    # Set up the countdown updates
+    timer_data = {
+        "user_id": session.user_id,
+        "chat_id": session.chat_id,
+        "message_id": session.current_message_id,
+        "question_header": payload.header,
+        "question_index": session.current_question_index,
+        "end_time": session.deadline,
+        "total_time": payload.time_limit,
+        "reply_markup": payload.reply_markup
+    }
+    
+    # First update in 3 seconds
+    wheel.schedule(min(3, remaining), update_timer, bot, timer_data, key=f"timer_{session.user_id}")
+
+def arm_poll_timer(bot: Bot, session: QuizSession) -> None:
+    """Count the current quiz poll as unanswered if no answer arrives."""
+    poll_sessions[session.current_poll_id] = (session.user_id, session.chat_id, session.current_question_index)
+    get_timer_wheel().schedule(
+        max(0, session.deadline - time.time()) + POLL_GRACE_PERIOD,
+        poll_closed,
+        bot,
+        session.current_poll_id,
+        key=f"time_up_{session.user_id}"
+    )
+
+def send_poll_question(bot: Bot, chat_id: int, session: QuizSession, payload) -> None:
+    """Send the current question as a Telegram quiz poll.
+    
+    Telegram shows the countdown and closes the poll itself, so the bot
+    makes a single API call per question instead of editing a countdown.
+    """
+    question = session.get_current_question()
+    get_outbound(bot).submit(
+        "send_poll",
+        chat_id,
+        question=payload.poll_question,
+        options=payload.poll_options,
+        type=Poll.QUIZ,
+        correct_option_id=question.correct_option,
+        open_period=payload.open_period,
+        is_anonymous=False
+    ).add_done_callback(functools.partial(
+        _poll_sent, bot, chat_id, session, session.current_question_index, payload.open_period
+    ))
+
+def _poll_sent(bot: Bot, chat_id: int, session: QuizSession, question_index: int, open_period: int, future) -> None:
+    """Register a quiz poll once it is sent and start its deadline.
+    
+    Runs on the outbound thread that sent the poll, which must not wait
+    for session locks, so the session is updated from the timer wheel.
+    """
+    try:
+        message = future.result()
+    except Exception as e:
+        logger.error(f"Could not send quiz poll {question_index + 1} to chat {chat_id}: {e}")
+        return
+    if message is None:
+        return
+    
+    # Registered right away so that an answer arriving before the wheel
+    # gets to _poll_started is still matched to the question
+    poll_sessions[message.poll.id] = (session.user_id, chat_id, question_index)
+    get_timer_wheel().schedule(
+        0, _poll_started, bot, chat_id, session, question_index, message, time.time() + open_period
+    )
+
+def _poll_started(bot: Bot, chat_id: int, session: QuizSession, question_index: int, message, deadline: float) -> None:
+    """Store a sent quiz poll and arm its deadline, unless it was answered meanwhile."""
+    with active_sessions.lock(session.user_id):
+        if active_sessions.get(session.user_id) is not session:
+            # The quiz ended while the poll was being sent
+            poll_sessions.pop(message.poll.id, None)
+            return
+        if session.current_question_index != question_index:
+            # Already answered; poll_answer unregistered the poll
+            return
+        session.set_current_message(chat_id, message.message_id, deadline, message.poll.id)
+        arm_poll_timer(bot, session)
+
+def continue_poll_quiz(bot: Bot, chat_id: int, session: QuizSession) -> None:
+    """Move a quiz taken through polls on to its next question or its results."""
+    session.move_to_next_question()
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), callback_query=None, message=None)
+    send_quiz_question(update, SimpleNamespace(bot=bot), session)
+
+@locked_per_user
+def poll_answer(update: Update, context: CallbackContext) -> None:
+    """Process a user's answer to a quiz poll."""
+    answer = update.poll_answer
+    entry = poll_sessions.get(answer.poll_id)
+    if entry is None or entry[0] != answer.user.id:
+        return
+    
+    # Whoever removes the entry first, this handler or poll_closed, handles the question
+    if poll_sessions.pop(answer.poll_id, None) is None:
+        return
+    
+    user_id, chat_id, question_index = entry
+    session = active_sessions.touch(user_id)
+    if session is None or session.current_question_index != question_index:
+        return
+    
+    get_timer_wheel().cancel(f"time_up_{user_id}")
+    
+    selected_option = answer.option_ids[0] if answer.option_ids else -1
+    question = session.get_current_question()
+    session.record_answer(selected_option, selected_option == question.correct_option)
+    
+    continue_poll_quiz(context.bot, chat_id, session)
+
+def poll_closed(bot: Bot, poll_id: str) -> None:
+    """Handle a quiz poll that closed without an answer."""
+    entry = poll_sessions.pop(poll_id, None)
+    if entry is None:
+        return
+    
+    user_id, chat_id, question_index = entry
+    with active_sessions.lock(user_id):
+        session = active_sessions.get(user_id)
+        if session is None or session.current_question_index != question_index:
+            return
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        # Record no answer (-1)
+        session.record_answer(-1, False)
         
-        # Check if we're using update.message or a fake message
-        if hasattr(update, 'message') and update.message:
-            update.message.reply_text(
-                f"Question {session.current_question_index + 1}/{len(session.quiz.questions)}:\n\n"
-                f"{question.text}\n\n"
-                f"Time remaining: {question_time_limit} seconds",
-                reply_markup=reply_markup
-            )
-        else:
-            context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=f"Question {session.current_question_index + 1}/{len(session.quiz.questions)}:\n\n"
-                     f"{question.text}\n\n"
-                     f"Time remaining: {question_time_limit} seconds",
-                reply_markup=reply_markup
-            )
+        continue_poll_quiz(bot, chat_id, session)
 
+@locked_per_user
 def answer_callback(update: Update, context: CallbackContext) -> str:
     """Process user's answer to a quiz question."""
     query = update.callback_query
     user_id = query.from_user.id
     
     # Check if the user is in an active quiz session
-    if user_id not in active_sessions:
+    session = active_sessions.touch(user_id)
+    if session is None:
         query.answer("You are not currently taking a quiz.")
         query.edit_message_text("This quiz has expired. Use /take to start a new quiz.")
         return
     
-    session = active_sessions[user_id]
-    
-    # Extract the selected option from callback data
-    selected_option = int(query.data.split('_')[1])
+    # Callback data is answer_{question_index}_{option}; keyboards sent
+    # before questions were tagged only carry the option
+    parts = query.data.split('_')
+    selected_option = int(parts[-1])
+    question_index = int(parts[1]) if len(parts) == 3 else session.current_question_index
     
-    # Get the current question
+    # Get the current question; a second tap or a tap on an old message
+    # must not be counted against it
     question = session.get_current_question()
-    if not question:
+    if not question or question_index != session.current_question_index:
         query.answer("This question is no longer active.")
         return "ANSWERING"
     
+    # Answers that lost the race against time_up are too late
+    if session.deadline is not None and time.time() >= session.deadline:
+        query.answer("Time's up for this question.")
+        return "ANSWERING"
+    
     # Check if the answer is correct
     is_correct = selected_option == question.correct_option
     
@@ -325,7 +483,11 @@ def answer_callback(update: Update, context: CallbackContext) -> str:
         feedback = f"❌ Incorrect! The correct answer was: {chr(65 + question.correct_option)}. {question.options[question.correct_option]}"
     
     # Update the message to show the correct answer
-    query.edit_message_text(
+    get_countdown_editor(context.bot).finish(query.message.chat_id, query.message.message_id)
+    outbound = get_outbound(context.bot)
+    outbound.edit_message_text(
+        query.message.chat_id,
+        query.message.message_id,
         f"{query.message.text}\n\n{feedback}"
     )
     
@@ -333,33 +495,13 @@ def answer_callback(update: Update, context: CallbackContext) -> str:
     session.move_to_next_question()
     
     # Check if there are more questions
-    if session.get_current_question():
-        # Get the next question
-        question = session.get_current_question()
-        
-        # Create options keyboard
-        keyboard = []
-        for i, option in enumerate(question.options):
-            callback_data = f"answer_{i}"
-            keyboard.append([InlineKeyboardButton(option, callback_data=callback_data)])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Send question
-        question_num = session.current_question_index + 1
-        total_questions = len(session.quiz.questions)
-        
-        # Determine which time limit to use for this question
-        question_time_limit = question.time_limit if hasattr(question, 'time_limit') and question.time_limit is not None else session.quiz.time_limit
-        
+    if session.get_current_question() and session.quiz.delivery_mode == DELIVERY_POLL:
+        # The question didn't fit a poll, but the next one may
+        send_next_question(update, context, user_id)
+    elif session.get_current_question():
         # Send the next question as a new message
-        context.bot.send_message(
-            chat_id=query.message.chat_id,
-            text=f"Question {question_num}/{total_questions}:\n\n"
-                 f"{question.text}\n\n"
-                 f"⏱️ Time remaining: {question_time_limit} seconds",
-            reply_markup=reply_markup
-        )
+        payload = get_question_payload(session.quiz, session.current_question_index)
+        outbound.send_message(query.message.chat_id, payload.text, payload.reply_markup)
     else:
         # End the quiz
         end_quiz(update, context, session)
@@ -368,11 +510,10 @@ def answer_callback(update: Update, context: CallbackContext) -> str:
 
 def send_next_question(update: Update, context: CallbackContext, user_id: int) -> None:
     """Helper function to send the next question after an answer."""
-    if user_id not in active_sessions:
+    session = active_sessions.get(user_id)
+    if session is None:
         return
     
-    session = active_sessions[user_id]
-    
     # Create a fake chat object
     class FakeChat:
         def __init__(self, chat_id):
@@ -394,25 +535,27 @@ def send_next_question(update: Update, context: CallbackContext, user_id: int) -
     # Send the next question
     send_quiz_question(fake_update, context, session)
 
-def update_timer(context: CallbackContext) -> None:
+def cancel_question_timers(user_id: int) -> None:
+    """Cancel the pending deadline and countdown of a user's question."""
+    wheel = get_timer_wheel()
+    wheel.cancel(f"time_up_{user_id}")
+    wheel.cancel(f"timer_{user_id}")
+
+def update_timer(bot: Bot, data: dict) -> None:
     """Update the timer display for a quiz question."""
-    job = context.job
-    data = job.data
-    
     chat_id = data["chat_id"]
     message_id = data["message_id"]
     user_id = data["user_id"]
-    question_text = data["question_text"]
+    question_header = data["question_header"]
     current_question_index = data["question_index"]
     end_time = data["end_time"]
     options_markup = data["reply_markup"]
     
     # Skip if user isn't in active session anymore
-    if user_id not in active_sessions:
+    session = active_sessions.get(user_id)
+    if session is None:
         return
     
-    session = active_sessions[user_id]
-    
     # Skip if user has moved on to another question
     if session.current_question_index != current_question_index:
         return
@@ -437,137 +580,74 @@ def update_timer(context: CallbackContext) -> None:
         time_text = f"⏱️ Time remaining: {remaining_seconds} seconds"
     
     # Format the updated message
-    question_num = current_question_index + 1
-    total_questions = len(session.quiz.questions)
-    
-    updated_text = (
-        f"Question {question_num}/{total_questions}:\n\n"
-        f"{question_text}\n\n"
-        f"{time_text}"
-    )
-    
-    try:
-        # Update the message with the new timer
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=updated_text,
-            reply_markup=options_markup
-        )
-        
-        # Schedule next update if more than 0 seconds remain
-        if remaining_seconds > 0:
-            # Update more frequently in the last 10 seconds
-            next_update = 1 if remaining_seconds <= 10 else 3
-            context.job_queue.run_once(
-                update_timer,
-                next_update,
-                data=data
-            )
-    except Exception as e:
-        # If updating fails, don't break the quiz - just log the error
-        logging.error(f"Error updating timer: {str(e)}")
-        # Don't schedule more updates if there was an error
+    updated_text = question_header + time_text
+    
+    # Update the message with the new timer; a newer countdown replaces
+    # an edit that is still waiting in the outbound queue
+    editor = get_countdown_editor(bot)
+    editor.update(chat_id, message_id, updated_text, options_markup)
+    
+    # Schedule next update if more than 0 seconds remain
+    if remaining_seconds > 0:
+        # Update more frequently in the last 10 seconds, less often under load
+        next_update = editor.interval(1 if remaining_seconds <= 10 else 3)
+        get_timer_wheel().schedule(next_update, update_timer, bot, data, key=f"timer_{user_id}")
 
-def time_up(context: CallbackContext) -> None:
+def time_up(bot: Bot, data: dict) -> None:
     """Handle time's up for a quiz question."""
-    job = context.job
-    data = job.data
-    
     user_id = data["user_id"]
     chat_id = data["chat_id"]
     question_index = data["question_index"]
     
-    # Skip if user isn't in active session anymore
-    if user_id not in active_sessions:
-        return
-    
-    session = active_sessions[user_id]
-    
-    # Skip if user has moved on to another question
-    if session.current_question_index != question_index:
-        return
-    
-    # Create a fake update to handle the time up event
-    class FakeUser:
-        def __init__(self, user_id):
-            self.id = user_id
-    
-    class FakeMessage:
-        def __init__(self, chat_id):
-            self.chat_id = chat_id
-            self.text = f"Time's up! You didn't answer in time."
-            
-        def reply_text(self, text, reply_markup=None):
-            return context.bot.send_message(
-                chat_id=self.chat_id,
-                text=text,
-                reply_markup=reply_markup
-            )
-    
-    class FakeChat:
-        def __init__(self, chat_id):
-            self.id = chat_id
-    
-    class FakeCallbackQuery:
-        def __init__(self, from_user, message):
-            self.from_user = from_user
-            self.message = message
-            self.data = f"time_up_{question_index}"
-            
-        def answer(self, text):
-            pass
-            
-        def edit_message_text(self, text, reply_markup=None):
-            return context.bot.edit_message_text(
-                chat_id=self.message.chat_id,
-                message_id=session.current_message_id,
-                text=text,
-                reply_markup=reply_markup
+    with active_sessions.lock(user_id):
+        # Skip if user isn't in active session anymore
+        session = active_sessions.get(user_id)
+        if session is None:
+            return
+        
+        # Skip if user has moved on to another question
+        if session.current_question_index != question_index:
+            return
+        
+        # Stop the countdown so it doesn't overwrite the message below
+        get_timer_wheel().cancel(f"timer_{user_id}")
+        get_countdown_editor(bot).finish(chat_id, session.current_message_id)
+        
+        # Add time up button
+        keyboard = [[InlineKeyboardButton("Continue", callback_data=f"time_up_{question_index}")]]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        # Update the message
+        question = session.get_current_question()
+        if question:
+            get_outbound(bot).edit_message_text(
+                chat_id,
+                session.current_message_id,
+                f"Time's up! You didn't answer in time.\n\nThe correct answer was: {chr(65 + question.correct_option)}. {question.options[question.correct_option]}",
+                reply_markup
             )
-    
-    class FakeUpdate:
-        def __init__(self, callback_query, effective_user, message, effective_chat):
-            self.callback_query = callback_query
-            self.effective_user = effective_user
-            self.message = message
-            self.effective_chat = effective_chat
-    
-    fake_user = FakeUser(user_id)
-    fake_message = FakeMessage(chat_id)
-    fake_chat = FakeChat(chat_id)
-    fake_callback_query = FakeCallbackQuery(fake_user, fake_message)
-    fake_update = FakeUpdate(fake_callback_query, fake_user, fake_message, fake_chat)
-    
-    # Add time up button
-    keyboard = [[InlineKeyboardButton("Continue", callback_data=f"time_up_{question_index}")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    # Update the message
-    question = session.get_current_question()
-    if question:
-        context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=session.current_message_id,
-            text=f"Time's up! You didn't answer in time.\n\nThe correct answer was: {chr(65 + question.correct_option)}. {question.options[question.correct_option]}",
-            reply_markup=reply_markup
-        )
-    
-    # Record no answer (-1)
-    session.record_answer(-1, False)
+        
+        # Record no answer (-1) and close the question to late answers
+        session.deadline = min(session.deadline or time.time(), time.time())
+        session.record_answer(-1, False)
 
+@locked_per_user
 def time_up_callback(update: Update, context: CallbackContext) -> str:
     """Handle time up callback query."""
     query = update.callback_query
     user_id = query.from_user.id
     
     # Check if the user is in an active quiz session
-    if user_id not in active_sessions:
+    session = active_sessions.touch(user_id)
+    if session is None:
         query.answer("You are not currently taking a quiz.")
         query.edit_message_text("This quiz has expired. Use /take to start a new quiz.")
         return
     
-    session = active_sessions[user_id]
+    # Only the first tap on Continue moves on
+    if int(query.data.split('_')[2]) != session.current_question_index:
+        query.answer("This question is no longer active.")
+        return "ANSWERING"
     
     # Move to the next question
     session.move_to_next_question()
@@ -615,6 +695,12 @@ def end_quiz(update: Update, context: CallbackContext, session: QuizSession) ->
     """End the quiz and show results."""
     user_id = session.user_id
     
+    # Remove the active session; if it is already gone it was closed as
+    # idle and its result recorded there
+    cancel_question_timers(user_id)
+    if not active_sessions.discard(user_id, session):
+        return
+    
     # Calculate final score
     score = session.calculate_score()
     max_score = len(session.quiz.questions)
@@ -629,11 +715,11 @@ def end_quiz(update: Update, context: CallbackContext, session: QuizSession) ->
     
     # Add a summary of answers
     result_message += "Summary of your answers:\n"
-    for i, (question, answer) in enumerate(zip(session.quiz.questions, session.answers)):
+    for i, selected_option in enumerate(session.selected_options):
         result_message += f"{i+1}. "
-        if answer['selected_option'] == -1:
+        if selected_option == -1:
             result_message += "❌ No answer\n"
-        elif answer['is_correct']:
+        elif session.is_answer_correct(i):
             result_message += "✅ Correct\n"
         else:
             result_message += "❌ Incorrect\n"
@@ -649,27 +735,90 @@ def end_quiz(update: Update, context: CallbackContext, session: QuizSession) ->
     record_quiz_result(user_id, session.quiz.id, score, max_score, session.answers)
     
     # Send the results
-    if update.callback_query:
-        update.callback_query.edit_message_text(result_message, reply_markup=reply_markup)
+    outbound = get_outbound(context.bot)
+    query = update.callback_query
+    if query:
+        outbound.edit_message_text(query.message.chat_id, query.message.message_id, result_message, reply_markup)
     else:
-        context.bot.send_message(chat_id=user_id, text=result_message, reply_markup=reply_markup)
-    
-    # Remove the active session
-    if user_id in active_sessions:
-        del active_sessions[user_id]
+        outbound.send_message(user_id, result_message, reply_markup)
 
+@locked_per_user
 def cancel_quiz(update: Update, context: CallbackContext) -> int:
     """Cancel the current quiz."""
     user_id = update.effective_user.id
     
-    if user_id in active_sessions:
-        del active_sessions[user_id]
+    session = active_sessions.pop(user_id)
+    if session is not None:
+        release_session(context.bot, session)
         update.message.reply_text("Quiz canceled. Use /list to see available quizzes.")
     else:
         update.message.reply_text("You are not currently taking a quiz.")
     
     return -1  # End the conversation
 
+def release_session(bot: Bot, session: QuizSession) -> None:
+    """Stop the timers, poll and countdown of a session that was removed."""
+    cancel_question_timers(session.user_id)
+    poll_sessions.pop(session.current_poll_id, None)
+    if session.current_message_id is not None:
+        get_countdown_editor(bot).finish(session.chat_id, session.current_message_id)
+
+def close_session(bot: Bot, session: QuizSession, reason: str) -> None:
+    """
+    Close a quiz the user abandoned.
+    
+    A quiz with answers is finalized: the answers given so far are scored
+    and recorded like a finished quiz, and the user is told. A quiz
+    without any answers is discarded.
+    """
+    with active_sessions.lock(session.user_id):
+        release_session(bot, session)
+        
+        answered = len(session.selected_options) - session.selected_options.count(-1)
+        if not answered:
+            return
+        
+        score = session.calculate_score()
+        max_score = len(session.quiz.questions)
+        record_quiz_result(session.user_id, session.quiz.id, score, max_score, session.answers)
+        
+        why = "after a long time without answers" if reason == "expired" else "to make room for new quizzes"
+        get_outbound(bot).send_message(
+            session.chat_id or session.user_id,
+            f"⌛ Your quiz {session.quiz.title} was closed {why}.\n\n"
+            f"Score for the {answered} questions you answered: {score}/{max_score}\n\n"
+            "Use /results to get your results or /take to start again."
+        )
+
+def reap_sessions(bot: Bot) -> None:
+    """Close sessions idle for longer than SESSION_IDLE_TTL, then check again later."""
+    try:
+        expired = active_sessions.reap()
+        for session in expired:
+            close_session(bot, session, "expired")
+        if expired:
+            logger.info(f"Closed {len(expired)} idle quiz sessions, {len(active_sessions)} still active")
+    except Exception as e:
+        logger.error(f"Error closing idle quiz sessions: {str(e)}")
+    get_timer_wheel().schedule(SESSION_REAP_INTERVAL, reap_sessions, bot, key="session_reaper")
+
+def session_stats(update: Update, context: CallbackContext) -> None:
+    """Show how many quiz sessions are held in memory (admin only)."""
+    if update.effective_user.id not in ADMIN_USERS:
+        update.message.reply_text("Sorry, you don't have admin privileges.")
+        return
+    
+    stats = active_sessions.stats()
+    update.message.reply_text(
+        "📈 Quiz sessions\n\n"
+        f"Active: {stats['sessions']} (limit {stats['max_sessions']})\n"
+        f"Idle for {stats['idle_ttl'] / 120:.0f}+ minutes: {stats['idle']}\n"
+        f"Closed as idle: {stats['expired']}\n"
+        f"Evicted at the limit: {stats['evicted']}\n"
+        f"Approximate memory: {stats['approx_bytes'] / 1024:.0f} KB\n"
+        f"Open quiz polls: {len(poll_sessions)}"
+    )
+
 def get_results(update: Update, context: CallbackContext) -> None:
     """Send quiz results to user in PDF format."""
     user_id = update.effective_user.id
@@ -692,6 +841,43 @@ def get_results(update: Update, context: CallbackContext) -> None:
         caption="Here are your quiz results."
     )
 
+def leaderboard(update: Update, context: CallbackContext) -> None:
+    """Show the top scores for a quiz and the user's own rank."""
+    if not context.args:
+        update.message.reply_text(
+            "Please provide a quiz ID. Use /list to see available quizzes."
+        )
+        return
+    
+    quiz_id = context.args[0]
+    quiz = get_quiz(quiz_id)
+    board = get_leaderboard(quiz_id)
+    quiz_title = quiz.title if quiz else f"Quiz {quiz_id}"
+    
+    if not board:
+        update.message.reply_text(f"Nobody has completed {quiz_title} yet.")
+        return
+    
+    # Format the top 10
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    lines = [f"🏆 Leaderboard: {quiz_title}\n"]
+    for entry in iter_quiz_results_by_score(quiz_id, 0, 10):
+        user = get_user(entry['user_id'])
+        name = user.username or user.first_name or str(user.id)
+        result = entry['result']
+        rank = medals.get(entry['rank'], f"{entry['rank']}.")
+        lines.append(f"{rank} {name} - {result['score']}/{result['max_score']}")
+    
+    # Add the requesting user's own rank
+    user_id = update.effective_user.id
+    my_rank = board.rank(user_id)
+    if my_rank:
+        lines.append(f"\nYour rank: #{my_rank} of {len(board)}")
+    else:
+        lines.append(f"\nYou haven't completed this quiz yet. Use /take {quiz_id} to try it!")
+    
+    update.message.reply_text('\n'.join(lines))
+
 def quiz_callback(update: Update, context: CallbackContext) -> None:
     """Handle quiz-related callback queries."""
     query = update.callback_query
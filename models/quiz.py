@@ -5,14 +5,30 @@
 Model classes for quizzes and questions
 """
 
+import sys
 import uuid
 from datetime import datetime
 
+# How questions are delivered to quiz takers
+DELIVERY_BUTTONS = "buttons"  # Text message with an inline keyboard and a countdown
+DELIVERY_POLL = "poll"  # Native Telegram quiz poll; Telegram runs the countdown
+DELIVERY_MODES = (DELIVERY_BUTTONS, DELIVERY_POLL)
+
+def _intern(value):
+    """Intern strings so identical texts and options share one object"""
+    return sys.intern(value) if type(value) is str else value
+
 class Question:
     """
     Class to represent a quiz question
+    
+    Options are stored as a tuple of interned strings; imported question
+    banks repeat the same option texts ("All of the above", "True", ...)
+    many times.
     """
     
+    __slots__ = ('text', 'options', 'correct_option', 'time_limit')
+    
     def __init__(self, text, options, correct_option, time_limit=None):
         """
         Initialize a question
@@ -24,8 +40,8 @@ class Question:
             time_limit (int, optional): Time limit for this specific question in seconds.
                                       If None, the quiz's default time limit will be used.
         """
-        self.text = text
-        self.options = options
+        self.text = _intern(text)
+        self.options = tuple(_intern(option) for option in options)
         self.correct_option = correct_option
         self.time_limit = time_limit
     
@@ -33,7 +49,7 @@ class Question:
         """Convert question to dictionary for serialization"""
         return {
             'text': self.text,
-            'options': self.options,
+            'options': list(self.options),
             'correct_option': self.correct_option,
             'time_limit': self.time_limit
         }
@@ -53,7 +69,13 @@ class Quiz:
     Class to represent a quiz with multiple questions
     """
     
-    def __init__(self, title, description, creator_id, time_limit=60, negative_marking_factor=0.25):
+    __slots__ = (
+        'id', 'title', 'description', 'creator_id', 'time_limit',
+        'negative_marking_factor', 'questions', 'created_at', 'delivery_mode'
+    )
+    
+    def __init__(self, title, description, creator_id, time_limit=60, negative_marking_factor=0.25,
+                 delivery_mode=DELIVERY_BUTTONS):
         """
         Initialize a quiz
         
@@ -63,6 +85,7 @@ class Quiz:
             creator_id (int): Telegram ID of the creator
             time_limit (int): Time limit for each question in seconds
             negative_marking_factor (float): Factor for negative marking
+            delivery_mode (str): DELIVERY_BUTTONS or DELIVERY_POLL
         """
         self.id = str(uuid.uuid4())[:8]  # Generate a short unique ID
         self.title = title
@@ -72,6 +95,7 @@ class Quiz:
         self.negative_marking_factor = negative_marking_factor
         self.questions = []
         self.created_at = datetime.now().timestamp()
+        self.delivery_mode = delivery_mode
     
     def add_question(self, question):
         """
@@ -122,7 +146,8 @@ class Quiz:
             'time_limit': self.time_limit,
             'negative_marking_factor': self.negative_marking_factor,
             'questions': [q.to_dict() for q in self.questions],
-            'created_at': self.created_at
+            'created_at': self.created_at,
+            'delivery_mode': self.delivery_mode
         }
     
     @classmethod
@@ -133,7 +158,8 @@ class Quiz:
             data['description'],
             data['creator_id'],
             data['time_limit'],
-            data['negative_marking_factor']
+            data['negative_marking_factor'],
+            data.get('delivery_mode', DELIVERY_BUTTONS)
         )
         quiz.id = data['id']
         quiz.created_at = data.get('created_at', datetime.now().timestamp())
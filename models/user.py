@@ -10,6 +10,8 @@ class User:
     Class to represent a user
     """
     
+    __slots__ = ('id', 'username', 'first_name', 'last_name')
+    
     def __init__(self, user_id, username=None, first_name=None, last_name=None):
         """
         Initialize a user
@@ -8,41 +8,44 @@ This file combines both polling and webhook modes for flexibility
 
 import os
 import sys
+import atexit
 import logging
 from threading import Thread
 from flask import Flask, request, jsonify
 
 from telegram import Update
-from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, MessageHandler, Filters
+from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, MessageHandler, Filters, PollAnswerHandler
 from telegram.ext import ConversationHandler, Dispatcher
 
 # Import handlers
 from handlers.quiz_handlers import (
     start, help_command, quiz_callback, answer_callback, 
     time_up_callback, list_quizzes, take_quiz, import_quiz,
-    get_results, cancel_quiz
+    get_results, cancel_quiz, leaderboard, poll_answer, restore_sessions,
+    reap_sessions, session_stats
+)
+from handlers.broadcast_handlers import (
+    start_broadcast, stop_broadcast, broadcast_answer_callback
 )
 from handlers.admin_handlers import (
     create_quiz, add_question, set_quiz_time, set_negative_marking, 
-    finalize_quiz, admin_help, admin_command, edit_quiz_time, edit_question_time
+    finalize_quiz, admin_help, admin_command, edit_quiz_time, edit_question_time,
+    set_delivery_mode, import_questions_from_pdf, handle_pdf_import_callback,
+    handle_pdf_quiz_name, diagnose_pdf_import, diagnose_pdf, cancel_pdf_import,
+    pdf_import_stats
 )
 
+from utils.database import init_database, close_database
+from utils.pdf_jobs import get_pdf_import_pool
+
 # Import config settings
 from config import (
     TELEGRAM_BOT_TOKEN, API_ID, API_HASH, OWNER_ID,
-    WEBHOOK_URL, PORT
-)
-
-# Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO,
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("bot.log")
-    ]
+    WEBHOOK_URL, PORT, DISPATCHER_WORKERS, BOT_API_BASE_URL, OUTBOUND_WORKERS
 )
 
+# The PDF import processes re-import this module, so nothing here may
+# open files or load data; main() does that in the bot process only
 logger = logging.getLogger(__name__)
 
 # Flask app for webhook mode
@@ -72,6 +75,7 @@ def setup_handlers(dispatcher):
     dispatcher.add_handler(CommandHandler("help", help_command))
     dispatcher.add_handler(CommandHandler("list", list_quizzes))
     dispatcher.add_handler(CommandHandler("results", get_results))
+    dispatcher.add_handler(CommandHandler("leaderboard", leaderboard))
     dispatcher.add_handler(CommandHandler("admin", admin_command))
     dispatcher.add_handler(CommandHandler("adminhelp", admin_help))
     
@@ -88,6 +92,9 @@ def setup_handlers(dispatcher):
     )
     dispatcher.add_handler(quiz_conv_handler)
     
+    # Answers for quizzes restored after a restart, whose conversation state was lost
+    dispatcher.add_handler(CallbackQueryHandler(answer_callback, pattern=r"^answer_"))
+    
     # Quiz creation conversation handler
     create_quiz_conv_handler = ConversationHandler(
         entry_points=[CommandHandler("create", create_quiz)],
@@ -138,11 +145,38 @@ def setup_handlers(dispatcher):
     
     # Edit question time handler (direct command, no conversation)
     dispatcher.add_handler(CommandHandler("editquestiontime", edit_question_time))
+    dispatcher.add_handler(CommandHandler("setdelivery", set_delivery_mode))
+    dispatcher.add_handler(CommandHandler("sessionstats", session_stats))
+    
+    # Question import from PDF files; the custom quiz name is read in a
+    # separate group so it doesn't compete with the conversations above
+    dispatcher.add_handler(CommandHandler("diagnose_pdf", diagnose_pdf))
+    dispatcher.add_handler(CommandHandler("diagnose_pdf_import", diagnose_pdf_import))
+    dispatcher.add_handler(CommandHandler("cancel_pdf", cancel_pdf_import))
+    dispatcher.add_handler(CommandHandler("pdfstats", pdf_import_stats))
+    dispatcher.add_handler(MessageHandler(Filters.document.mime_type("application/pdf"), import_questions_from_pdf))
+    dispatcher.add_handler(CallbackQueryHandler(handle_pdf_import_callback, pattern=r"^pdf_"))
+    dispatcher.add_handler(MessageHandler(Filters.text & ~Filters.command, handle_pdf_quiz_name), group=1)
+    
+    # Live quizzes broadcast to a whole group or channel
+    dispatcher.add_handler(CommandHandler("broadcast", start_broadcast))
+    dispatcher.add_handler(CommandHandler("stopbroadcast", stop_broadcast))
+    # CommandHandler ignores channel posts, so commands posted in a channel are matched by text
+    dispatcher.add_handler(MessageHandler(
+        Filters.update.channel_posts & Filters.regex(r"^/broadcast(@\w+)?(\s|$)"), start_broadcast
+    ))
+    dispatcher.add_handler(MessageHandler(
+        Filters.update.channel_posts & Filters.regex(r"^/stopbroadcast(@\w+)?\s*$"), stop_broadcast
+    ))
+    dispatcher.add_handler(CallbackQueryHandler(broadcast_answer_callback, pattern=r"^bcast_"))
     
     # Other callback handlers
     dispatcher.add_handler(CallbackQueryHandler(quiz_callback, pattern=r"^quiz_"))
     dispatcher.add_handler(CallbackQueryHandler(time_up_callback, pattern=r"^time_up_"))
     
+    # Answers to questions delivered as quiz polls
+    dispatcher.add_handler(PollAnswerHandler(poll_answer))
+    
     # Register error handler
     dispatcher.add_error_handler(error_handler)
 
@@ -160,12 +194,26 @@ def start_polling():
         exit(1)
     
     # Create the Updater and dispatcher
-    updater = Updater(token=token, use_context=True)
+    # Handlers and outbound senders share the bot's HTTP connection pool
+    updater = Updater(
+        token=token, use_context=True, workers=DISPATCHER_WORKERS,
+        base_url=BOT_API_BASE_URL or None,
+        request_kwargs={'con_pool_size': DISPATCHER_WORKERS + OUTBOUND_WORKERS + 4}
+    )
     dispatcher = updater.dispatcher
     
     # Set up all handlers
     setup_handlers(dispatcher)
     
+    # Bring back quizzes that were in progress before the restart
+    restore_sessions(updater.bot)
+    
+    # Close quizzes abandoned without /cancel
+    reap_sessions(updater.bot)
+    
+    # Spawn the PDF import processes now rather than on the first upload
+    get_pdf_import_pool().start()
+    
     # Start the Bot with clean updates
     logger.info("Starting in polling mode with drop_pending_updates=True")
     updater.start_polling(drop_pending_updates=True)
@@ -184,12 +232,26 @@ def start_webhook():
         exit(1)
     
     # Create the Updater and dispatcher
-    updater = Updater(token=token, use_context=True)
+    # Handlers and outbound senders share the bot's HTTP connection pool
+    updater = Updater(
+        token=token, use_context=True, workers=DISPATCHER_WORKERS,
+        base_url=BOT_API_BASE_URL or None,
+        request_kwargs={'con_pool_size': DISPATCHER_WORKERS + OUTBOUND_WORKERS + 4}
+    )
     dispatcher = updater.dispatcher
     
     # Set up all handlers
     setup_handlers(dispatcher)
     
+    # Bring back quizzes that were in progress before the restart
+    restore_sessions(updater.bot)
+    
+    # Close quizzes abandoned without /cancel
+    reap_sessions(updater.bot)
+    
+    # Spawn the PDF import processes now rather than on the first upload
+    get_pdf_import_pool().start()
+    
     # Set up webhook
     webhook_url = os.getenv("WEBHOOK_URL", WEBHOOK_URL)
     if not webhook_url:
@@ -221,7 +283,25 @@ def index():
         'message': 'Telegram Quiz Bot is running!'
     })
 
-if __name__ == '__main__':
+def main():
+    """Configure logging, load the database and run the bot"""
+    # The handler modules already set up console logging
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO,
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler("bot.log")
+        ],
+        force=True
+    )
+    
+    init_database()
+    atexit.register(close_database)
+    
     # Always use polling mode (no webhook) for simplicity
     logger.info("Starting bot in polling mode")
     start_polling()
+
+if __name__ == '__main__':
+    main()
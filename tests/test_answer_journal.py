@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the write-behind answer journal
+"""
+
+import utils.answer_journal as answer_journal
+from utils.answer_journal import AnswerJournal
+
+def records(count, quiz_id="quiz", start=0):
+    return [(1, quiz_id, i, i % 4, i % 2 == 0, 1700000000.0 + i) for i in range(start, start + count)]
+
+def test_replay_returns_the_written_records(tmp_path):
+    path = str(tmp_path / "answers.log")
+    applied = []
+    journal = AnswerJournal(applied.extend, path)
+    for record in records(3):
+        journal.append(record)
+    journal.close()
+
+    assert applied == records(3)
+    assert AnswerJournal(applied.extend, path).replay() == records(3)
+
+def test_replay_skips_a_torn_last_line(tmp_path):
+    path = tmp_path / "answers.log"
+    journal = AnswerJournal(lambda batch: None, str(path))
+    for record in records(2):
+        journal.append(record)
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('[1, "quiz", 2, ')
+
+    assert AnswerJournal(lambda batch: None, str(path)).replay() == records(2)
+
+def test_failed_batches_are_retried(tmp_path):
+    applied = []
+    failures = [RuntimeError("database down")]
+
+    def apply_batch(batch):
+        if failures:
+            raise failures.pop()
+        applied.extend(batch)
+
+    journal = AnswerJournal(apply_batch, str(tmp_path / "answers.log"))
+    journal.append(records(1)[0])
+    journal.flush()
+    assert applied == []
+
+    journal.append(records(1, start=1)[0])
+    journal.flush()
+    assert applied == records(2)
+    journal.close()
+
+def test_applied_journal_is_truncated_past_the_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(answer_journal, "CHECKPOINT_BYTES", 200)
+    path = str(tmp_path / "answers.log")
+    journal = AnswerJournal(lambda batch: None, path, truncate_after_apply=True)
+    for record in records(10):
+        journal.append(record)
+    journal.flush()
+
+    assert journal.replay() == []
+    journal.append(records(1, start=10)[0])
+    journal.close()
+    assert journal.replay() == records(1, start=10)
+
+def test_compaction_keeps_what_keep_wants(tmp_path, monkeypatch):
+    monkeypatch.setattr(answer_journal, "CHECKPOINT_BYTES", 200)
+    path = str(tmp_path / "answers.log")
+    finished = records(5, quiz_id="finished")
+    in_progress = records(5, quiz_id="open")
+    journal = AnswerJournal(lambda batch: None, path, keep=lambda record: record[1] == "open")
+    for record in finished + in_progress:
+        journal.append(record)
+    journal.flush()
+
+    assert journal.replay() == in_progress
+    # Appends go on after the compacted records
+    journal.append(records(1, quiz_id="open", start=5)[0])
+    journal.close()
+    assert journal.replay() == records(6, quiz_id="open")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for restoring quiz results and in-progress answers from storage
+"""
+
+import pytest
+
+from models.quiz import Quiz, Question
+from utils import database
+
+def reset():
+    for table in (database.quizzes, database.users, database.quiz_results,
+                  database.quiz_results_by_quiz, database.leaderboards):
+        table.clear()
+
+@pytest.fixture
+def open_database(tmp_path, monkeypatch):
+    """Opens the database on a SQLite file and journal in tmp_path; call again to restart"""
+    monkeypatch.setattr(database, "ANSWER_JOURNAL_PATH", str(tmp_path / "answers.log"))
+    url = f"sqlite:///{tmp_path / 'quiz.db'}"
+
+    def open_database():
+        database.close_database()
+        reset()
+        database.init_database(url)
+
+    yield open_database
+    database.close_database()
+    database._journal = database._backend = None
+    reset()
+
+def make_quiz():
+    quiz = Quiz("Retake", "Answered twice", 0)
+    for i in range(3):
+        quiz.add_question(Question(f"Question {i}?", ["A", "B"], 0))
+    database.add_quiz(quiz)
+    return quiz
+
+def stored_answer_count():
+    return len(database._backend.load_answers())
+
+def test_finished_attempt_leaves_no_answers_behind(open_database):
+    open_database()
+    quiz = make_quiz()
+    for i in range(3):
+        database.record_user_answer(1, quiz.id, i, 0, True)
+    database.record_quiz_result(1, quiz.id, 3, 3, [])
+    assert stored_answer_count() == 0
+
+    open_database()
+    result = database.quiz_results[1][quiz.id]
+    assert result['score'] == 3
+    assert database.get_leaderboard(quiz.id).rank(1) == 1
+
+def test_retake_answers_start_a_new_attempt(open_database):
+    open_database()
+    quiz = make_quiz()
+    database.record_user_answer(1, quiz.id, 0, 0, True)
+    database.record_quiz_result(1, quiz.id, 1, 3, [])
+    database.record_user_answer(1, quiz.id, 0, 1, False)
+    database.flush_answers()
+
+    result = database.quiz_results[1][quiz.id]
+    assert 'score' not in result
+    assert [answer['selected_option'] for answer in result['answers']] == [1]
+    assert database.get_leaderboard(quiz.id).rank(1) is None
+
+    # Restored the same way after a restart
+    open_database()
+    result = database.quiz_results[1][quiz.id]
+    assert 'score' not in result
+    assert [answer['selected_option'] for answer in result['answers']] == [1]
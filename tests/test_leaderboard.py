@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the skip-list leaderboard
+"""
+
+import random
+
+from utils.leaderboard import IndexableSkipList, Leaderboard
+
+def test_skip_list_matches_a_sorted_list():
+    rng = random.Random(3)
+    skip_list = IndexableSkipList()
+    expected = []
+    for _ in range(2000):
+        key = rng.randrange(500)
+        if key in expected and rng.random() < 0.5:
+            skip_list.remove(key)
+            expected.remove(key)
+        elif key not in expected:
+            skip_list.insert(key)
+            expected.append(key)
+    expected.sort()
+
+    assert len(skip_list) == len(expected)
+    assert [skip_list.index(key) for key in expected] == list(range(len(expected)))
+    assert list(skip_list.iter_from(10)) == expected[10:]
+
+def test_rank_orders_by_score_then_completion_time():
+    board = Leaderboard()
+    board.update(1, 5, 100.0)
+    board.update(2, 8, 200.0)
+    board.update(3, 5, 50.0)
+
+    assert [board.rank(user_id) for user_id in (1, 2, 3)] == [3, 1, 2]
+    assert board.rank(4) is None
+
+def test_update_replaces_a_users_result():
+    board = Leaderboard()
+    board.update(1, 5, 100.0)
+    board.update(2, 3, 100.0)
+    board.update(2, 9, 300.0)
+
+    assert len(board) == 2
+    assert board.top() == [(1, 2, 9, 300.0), (2, 1, 5, 100.0)]
+
+def test_top_pages_through_the_ranking():
+    board = Leaderboard()
+    for user_id in range(1, 51):
+        board.update(user_id, user_id % 10, float(user_id))
+
+    ranking = board.top(limit=None)
+    assert [rank for rank, _, _, _ in ranking] == list(range(1, 51))
+    assert board.top(limit=10, offset=20) == ranking[20:30]
+    assert board.top(limit=10, offset=45) == ranking[45:]
+    assert all(
+        (-a[2], a[3]) <= (-b[2], b[3]) for a, b in zip(ranking, ranking[1:])
+    )
+
+def test_remove_closes_the_gap():
+    board = Leaderboard()
+    for user_id, score in ((1, 9), (2, 7), (3, 5)):
+        board.update(user_id, score, 0.0)
+    board.remove(2)
+    board.remove(4)
+
+    assert board.rank(3) == 2
+    assert [user_id for _, user_id, _, _ in board.top()] == [1, 3]
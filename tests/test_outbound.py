@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the rate-limited outbound queue
+"""
+
+import threading
+
+from utils.outbound import OutboundDispatcher, TokenBucket, PRIORITY_COUNTDOWN
+
+class FakeBot:
+    """Records calls in the order they are made; fails where told to"""
+
+    def __init__(self, failures=None):
+        self.calls = []
+        self.failures = failures or {}
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, reply_markup=None):
+        with self.lock:
+            error = self.failures.pop(text, None)
+            if error is not None:
+                raise error
+            self.calls.append((chat_id, text))
+        return text
+
+class RetryAfter(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Retry in {retry_after}")
+        self.retry_after = retry_after
+
+def run(dispatcher, futures):
+    """Start the dispatcher on everything queued so far and wait for it"""
+    dispatcher.start()
+    try:
+        return [future.result(timeout=10) for future in futures]
+    finally:
+        dispatcher.stop()
+
+def test_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate=2.0, capacity=3, now=0.0)
+    for _ in range(3):
+        assert bucket.delay(0.0) == 0.0
+        bucket.consume()
+    assert bucket.delay(0.0) == 0.5
+    assert bucket.delay(0.25) == 0.25
+    assert bucket.delay(100.0) == 0.0
+    assert bucket.tokens == 3
+
+def test_bucket_reserve_holds_tokens_back():
+    bucket = TokenBucket(rate=1.0, capacity=3, now=0.0)
+    bucket.consume()
+    bucket.consume()
+    # The last token is left for an interactive call
+    assert bucket.delay(0.0, reserve=1) == 1.0
+    assert bucket.delay(0.0) == 0.0
+    # A reserve can't exceed what the bucket holds
+    assert TokenBucket(rate=1.0, capacity=1, now=0.0).delay(0.0, reserve=5) == 0.0
+
+def test_bucket_block_refuses_tokens_until_then():
+    bucket = TokenBucket(rate=10.0, capacity=3, now=0.0)
+    bucket.block(2.0)
+    bucket.block(1.0)
+    assert bucket.delay(0.5) == 1.5
+    # One call when the block ends, then back to the refill rate
+    assert bucket.delay(2.0) == 0.0
+    bucket.consume()
+    assert bucket.delay(2.0) == 0.1
+
+def test_interactive_calls_go_before_countdown_edits():
+    bot = FakeBot()
+    dispatcher = OutboundDispatcher(bot, global_rate=100, chat_rate=100, chat_burst=10, workers=1)
+    futures = [
+        dispatcher.send_message(1, "countdown 1", priority=PRIORITY_COUNTDOWN),
+        dispatcher.send_message(2, "countdown 2", priority=PRIORITY_COUNTDOWN),
+        dispatcher.send_message(3, "question"),
+        dispatcher.send_message(4, "result"),
+    ]
+    assert dispatcher.pending() == 4
+
+    assert run(dispatcher, futures) == ["countdown 1", "countdown 2", "question", "result"]
+    assert [text for _, text in bot.calls] == ["question", "result", "countdown 1", "countdown 2"]
+    assert dispatcher.pending() == 0
+
+def test_calls_to_a_chat_keep_their_order():
+    bot = FakeBot()
+    dispatcher = OutboundDispatcher(bot, global_rate=100, chat_rate=100, chat_burst=10, workers=4)
+    futures = [dispatcher.send_message(chat_id, f"{chat_id}-{i}") for i in range(5) for chat_id in (1, 2)]
+
+    run(dispatcher, futures)
+    for chat_id in (1, 2):
+        assert [text for chat, text in bot.calls if chat == chat_id] == [f"{chat_id}-{i}" for i in range(5)]
+
+def test_rate_limited_call_is_retried_ahead_of_the_chats_next_call():
+    bot = FakeBot(failures={"first": RetryAfter(0.05)})
+    dispatcher = OutboundDispatcher(bot, global_rate=100, chat_rate=100, chat_burst=10, workers=4)
+    futures = [dispatcher.send_message(1, "first"), dispatcher.send_message(1, "second")]
+
+    assert run(dispatcher, futures) == ["first", "second"]
+    assert bot.calls == [(1, "first"), (1, "second")]
+
+def test_prepare_can_drop_a_call():
+    bot = FakeBot()
+    dispatcher = OutboundDispatcher(bot, global_rate=100, chat_rate=100, chat_burst=10, workers=1)
+    futures = [
+        dispatcher.submit("send_message", 1, prepare=lambda: None, text="stale"),
+        dispatcher.submit("send_message", 1, prepare=lambda: {'text': "fresh"}, text="queued"),
+    ]
+
+    assert run(dispatcher, futures) == [None, "fresh"]
+    assert bot.calls == [(1, "fresh")]
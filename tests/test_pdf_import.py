@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the PDF question tokenizer and parser
+"""
+
+import pytest
+
+from utils.pdf_import import TOKEN_ANSWER, TOKEN_TEXT, iter_pages, iter_questions, page_count, tokenize
+
+def parse(text):
+    """Questions parsed from one page of text"""
+    return list(iter_questions(tokenize([text])))
+
+def make_pdf(fitz, pages):
+    """The bytes of a PDF with one line of text per page"""
+    document = fitz.open()
+    for text in pages:
+        document.new_page().insert_text((72, 72), text)
+    return document.tobytes()
+
+def test_statement_numerals_are_question_text():
+    questions = parse(
+        "1. Consider the following statements:\n"
+        "I. The Earth revolves around the Sun.\n"
+        "II. The Moon has its own light.\n"
+        "III. Venus is the hottest planet.\n"
+        "Which of the statements given above are correct?\n"
+        "(a) I only\n"
+        "(b) I and II only\n"
+        "(c) I and III only\n"
+        "(d) I, II and III\n"
+        "Answer: c\n"
+    )
+    assert len(questions) == 1
+    question = questions[0]
+    assert question['options'] == ["I only", "I and II only", "I and III only", "I, II and III"]
+    assert question['correct_answer'] == 3
+    assert "I. The Earth revolves around the Sun." in question['question']
+
+def test_options_past_d_continue_the_run():
+    questions = parse(
+        "1. Pick a letter\n"
+        "A) one\nB) two\nC) three\nD) four\nE) five\n"
+    )
+    assert questions[0]['options'] == ["one", "two", "three", "four", "five"]
+
+def test_stems_starting_with_answer_are_question_text():
+    questions = parse(
+        "1. Answer a question about plants: which one makes food?\n"
+        "(a) Root\n(b) Leaf\n(c) Stem\n(d) Flower\n"
+        "Ans a tricky one: the leaf\n"
+        "Answer: b\n"
+    )
+    assert len(questions) == 1
+    question = questions[0]
+    assert question['question'].startswith("Answer a question about plants")
+    assert "Ans a tricky one" in question['options'][3]
+    assert question['correct_answer'] == 2
+
+def test_answer_keys_need_a_separator_or_parentheses():
+    tokens = [(token.kind, token.key) for token in tokenize([
+        "Answer a question\nAns a\nAnswer: a\nAns. (b)\nAnswer (c)\nCorrect answer - d\nAnswer 3"
+    ])]
+    assert tokens == [
+        (TOKEN_TEXT, None), (TOKEN_TEXT, None), (TOKEN_ANSWER, 'A'), (TOKEN_ANSWER, 'B'),
+        (TOKEN_ANSWER, 'C'), (TOKEN_ANSWER, 'D'), (TOKEN_ANSWER, '3')
+    ]
+
+def test_documents_pymupdf_cannot_open_are_read_with_pypdf2(monkeypatch):
+    fitz = pytest.importorskip("fitz")
+    pytest.importorskip("PyPDF2")
+    data = make_pdf(fitz, ["Page one", "Page two"])
+
+    def refuse(*args, **kwargs):
+        raise fitz.FileDataError("cannot open broken document")
+
+    monkeypatch.setattr(fitz, "open", refuse)
+    assert page_count(data) == 2
+    assert [text.strip() for text in iter_pages(data)] == ["Page one", "Page two"]
+
+def test_pages_pymupdf_cannot_read_are_read_with_pypdf2(monkeypatch):
+    fitz = pytest.importorskip("fitz")
+    pytest.importorskip("PyPDF2")
+    data = make_pdf(fitz, ["Page one", "Page two", "Page three"])
+    load_page = fitz.Document.load_page
+
+    def fail_second(document, number):
+        if number == 1:
+            raise RuntimeError("damaged page")
+        return load_page(document, number)
+
+    monkeypatch.setattr(fitz.Document, "load_page", fail_second)
+    assert [text.strip() for text in iter_pages(data)] == ["Page one", "Page two", "Page three"]
+    assert [text.strip() for text in iter_pages(data, 1, 2)] == ["Page two"]
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for layout-aware extraction of question-bank pages
+"""
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+
+from utils.pdf_layout import page_text
+
+def make_document(lines):
+    """
+    A one-page PDF of lines, each a list of (text, bold) runs
+
+    Returns:
+        fitz.Document: The document
+    """
+    document = fitz.open()
+    page = document.new_page()
+    y = 72
+    for runs in lines:
+        x = 72
+        for text, bold in runs:
+            fontname = "hebo" if bold else "helv"
+            page.insert_text((x, y), text, fontname=fontname, fontsize=11)
+            x += fitz.get_text_length(text, fontname=fontname, fontsize=11)
+        y += 18
+    return document
+
+def marked_options(text):
+    """Lines followed by a check mark line"""
+    lines = text.splitlines()
+    return [line for line, following in zip(lines, lines[1:]) if following == "✓"]
+
+def test_bold_option_is_marked():
+    document = make_document([
+        [("1. Which planet is known as the Red Planet?", False)],
+        [("(a) Venus", False)],
+        [("(b) ", False), ("Mars", True)],
+        [("(c) Jupiter", False)],
+        [("(d) Saturn", False)],
+    ])
+    assert marked_options(page_text(document[0])) == ["(b) Mars"]
+
+def test_emphasized_word_in_wrong_option_is_not_marked():
+    document = make_document([
+        [("1. Which of the following statements about Newton's laws is correct?", False)],
+        [("(a) The first law ", False), ("only", True), (" applies to bodies at rest", False)],
+        [("(b) Force equals mass times acceleration", True)],
+        [("(c) Action and reaction act on the ", False), ("same", True), (" body", False)],
+        [("(d) Momentum is not conserved in collisions", False)],
+    ])
+    assert marked_options(page_text(document[0])) == ["(b) Force equals mass times acceleration"]
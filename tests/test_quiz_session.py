@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the compact answer storage of quiz sessions
+"""
+
+import pytest
+
+import utils.quiz_manager as quiz_manager
+from models.quiz import Quiz, Question
+from utils.quiz_manager import QuizSession
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Answers handed to the database, without touching it"""
+    records = []
+    monkeypatch.setattr(quiz_manager, "record_user_answer", lambda *record: records.append(record))
+    return records
+
+def make_session(question_count, negative_marking=0.25):
+    quiz = Quiz("Bits", "Answer bitset", 1, negative_marking_factor=negative_marking)
+    for i in range(question_count):
+        quiz.add_question(Question(f"Question {i}?", ["A", "B", "C", "D"], i % 4))
+    return QuizSession(7, quiz)
+
+def answer(session, options):
+    """Answer every question in turn; None leaves one unanswered"""
+    for option in options:
+        if option is not None:
+            question = session.get_current_question()
+            session.record_answer(option, option == question.correct_option)
+        session.move_to_next_question()
+
+def test_answers_across_byte_boundaries(recorded):
+    session = make_session(11)
+    # Correct answers to questions 0, 7, 8 and 10
+    options = [0, 0, 0, 0, 1, 2, None, 3, 0, 0, 2]
+    answer(session, options)
+
+    assert [session.is_answer_correct(i) for i in range(11)] == [
+        i in (0, 7, 8, 10) for i in range(11)
+    ]
+    assert list(session.selected_options) == [-1 if option is None else option for option in options]
+    assert len(session.correct_bits) == 2
+    assert len(recorded) == 10
+
+def test_reanswering_clears_the_correct_bit(recorded):
+    session = make_session(9)
+    session.current_question_index = 8
+    session.record_answer(0, True)
+    session.record_answer(1, False)
+
+    assert not session.is_answer_correct(8)
+    assert session.correct_bits == bytearray(2)
+    assert session.selected_options[8] == 1
+
+def test_score_counts_wrong_answers_but_not_skipped_ones(recorded):
+    session = make_session(8, negative_marking=0.5)
+    # 3 correct, 2 wrong, 3 unanswered
+    answer(session, [0, 1, 2, 0, 1, None, None, None])
+
+    assert session.calculate_score() == 3 - 2 * 0.5
+
+def test_score_does_not_go_below_zero(recorded):
+    session = make_session(4, negative_marking=1)
+    answer(session, [1, 2, 3, 0])
+
+    assert session.calculate_score() == 0
+
+def test_answers_are_built_from_the_quiz(recorded):
+    session = make_session(3)
+    answer(session, [0, 3, None])
+
+    answers = session.answers
+    assert [entry['selected_option'] for entry in answers] == [0, 3, -1]
+    assert [entry['is_correct'] for entry in answers] == [True, False, False]
+    assert answers[1]['question_text'] == "Question 1?"
+    assert list(answers[1]['options']) == ["A", "B", "C", "D"]
+    assert answers[1]['correct_option'] == 1
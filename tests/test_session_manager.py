@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the bounded session registry
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import utils.session_manager as session_manager
+from utils.session_manager import SessionManager
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock the manager reads; set clock.now to move it"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(session_manager, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+def make_session(user_id, deadline=None):
+    """Stand-in with the fields the manager reads"""
+    return SimpleNamespace(
+        user_id=user_id, deadline=deadline,
+        selected_options=bytearray(10), correct_bits=bytearray(2)
+    )
+
+def test_idle_sessions_expire_after_the_ttl(clock):
+    manager = SessionManager(idle_ttl=60)
+    sessions = {user_id: make_session(user_id) for user_id in (1, 2, 3)}
+    for user_id in (1, 2, 3):
+        manager.add(user_id, sessions[user_id])
+        clock.now += 10
+
+    # User 1 answers, so only user 2 has been idle for over a minute
+    manager.touch(1)
+    clock.now = 1075.0
+    assert manager.reap() == [sessions[2]]
+    assert 2 not in manager and len(manager) == 2
+
+    assert manager.reap(now=clock.now + 60) == [sessions[3], sessions[1]]
+    assert len(manager) == 0
+    assert manager.stats()['expired'] == 3
+
+def test_running_question_keeps_a_session_alive(clock):
+    manager = SessionManager(idle_ttl=60)
+    waiting = make_session(1, deadline=clock.now + 90)
+    idle = make_session(2)
+    manager.add(1, waiting)
+    manager.add(2, idle)
+
+    assert manager.reap(now=clock.now + 61) == [idle]
+    assert manager.get(1) is waiting
+    assert manager.reap(now=clock.now + 151) == [waiting]
+
+def test_least_recently_used_sessions_are_evicted(clock):
+    manager = SessionManager(max_sessions=2)
+    sessions = {user_id: make_session(user_id) for user_id in (1, 2, 3, 4)}
+    assert manager.add(1, sessions[1]) == []
+    assert manager.add(2, sessions[2]) == []
+    # Reading a session doesn't count as use; touching it does
+    manager.get(1)
+    assert manager.add(3, sessions[3]) == [sessions[1]]
+    manager.touch(2)
+    assert manager.add(4, sessions[4]) == [sessions[3]]
+
+    assert sorted(user_id for user_id, _ in manager.items()) == [2, 4]
+    assert manager.stats()['evicted'] == 2
+
+def test_discard_leaves_a_replaced_session_alone(clock):
+    manager = SessionManager()
+    old = make_session(1)
+    new = make_session(1)
+    manager.add(1, old)
+    manager.add(1, new)
+
+    assert len(manager) == 1
+    assert not manager.discard(1, old)
+    assert manager[1] is new
+    assert manager.discard(1, new)
+    assert not manager.discard(1, new)
+    with pytest.raises(KeyError):
+        del manager[1]
+
+def test_each_user_always_gets_the_same_lock():
+    manager = SessionManager()
+    assert manager.lock(42) is manager.lock(42)
+    # Reentrant, since handlers take it again when they call each other
+    with manager.lock(42):
+        with manager.lock(42):
+            pass
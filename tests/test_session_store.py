@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the quiz session snapshots
+"""
+
+import os
+
+import pytest
+
+import utils.quiz_manager as quiz_manager
+import utils.session_store as session_store
+from models.quiz import Quiz, Question
+from utils.quiz_manager import QuizSession
+from utils.session_store import SessionSnapshotter, decode_records, encode_session
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    monkeypatch.setattr(quiz_manager, "record_user_answer", lambda *record: None)
+
+QUIZ = Quiz("Snapshots", "Round trip", 1)
+for i in range(10):
+    QUIZ.add_question(Question(f"Question {i}?", ["A", "B", "C"], i % 3))
+
+def make_session(user_id, answered=3, poll_id=None):
+    session = QuizSession(user_id, QUIZ)
+    for _ in range(answered):
+        question = session.get_current_question()
+        session.record_answer(1, question.correct_option == 1)
+        session.move_to_next_question()
+    session.set_current_message(-100 - user_id, 500 + user_id, 1700000000.5, poll_id)
+    return session
+
+def assert_restores(state, session):
+    assert state.user_id == session.user_id
+    assert state.chat_id == session.chat_id
+    assert state.message_id == session.current_message_id
+    assert state.deadline == session.deadline
+    assert state.current_question_index == session.current_question_index
+    assert state.quiz_id == session.quiz.id
+    assert state.poll_id == session.current_poll_id
+    assert state.selected_options == session.selected_options
+    assert state.correct_bits == session.correct_bits
+
+def test_session_record_round_trip():
+    sessions = [make_session(1), make_session(2, answered=9, poll_id="5012345678901234567")]
+    fresh = QuizSession(3, QUIZ)
+    data = b''.join(encode_session(session) for session in sessions + [fresh])
+
+    states, length = decode_records(data)
+    assert length == len(data)
+    for session in sessions:
+        assert_restores(states[session.user_id], session)
+    # Unset message fields come back as None
+    assert states[3].chat_id is None and states[3].deadline is None and states[3].poll_id is None
+    assert list(states[3].selected_options) == [-1] * 10
+
+def test_snapshots_keep_the_latest_state_per_user(tmp_path):
+    path = str(tmp_path / "sessions.snapshot")
+    sessions = {user_id: make_session(user_id) for user_id in (1, 2, 3)}
+    snapshotter = SessionSnapshotter(path, sessions)
+    snapshotter.snapshot()
+    size = os.path.getsize(path)
+
+    # Nothing changed, nothing written
+    snapshotter.snapshot()
+    assert os.path.getsize(path) == size
+
+    sessions[1].record_answer(2, False)
+    sessions[1].move_to_next_question()
+    del sessions[3]
+    snapshotter.close()
+
+    states = SessionSnapshotter(path, {}).load()
+    assert sorted(states) == [1, 2]
+    for user_id, session in sessions.items():
+        assert_restores(states[user_id], session)
+
+def test_torn_record_is_cut_off_on_load(tmp_path):
+    path = str(tmp_path / "sessions.snapshot")
+    sessions = {1: make_session(1)}
+    SessionSnapshotter(path, sessions).close()
+    with open(path, 'ab') as f:
+        f.write(encode_session(make_session(2))[:-5])
+
+    snapshotter = SessionSnapshotter(path, {2: make_session(2, answered=4)})
+    assert sorted(snapshotter.load()) == [1]
+    # Records appended after the torn one can be read back
+    snapshotter.close()
+    states = SessionSnapshotter(path, {}).load()
+    assert sorted(states) == [1, 2]
+    assert states[2].current_question_index == 4
+
+def test_adopted_sessions_are_not_written_again(tmp_path):
+    path = str(tmp_path / "sessions.snapshot")
+    SessionSnapshotter(path, {user_id: make_session(user_id) for user_id in (1, 2)}).close()
+    size = os.path.getsize(path)
+
+    sessions = {}
+    snapshotter = SessionSnapshotter(path, sessions)
+    for state in snapshotter.load().values():
+        session = QuizSession(state.user_id, QUIZ)
+        session.current_question_index = state.current_question_index
+        session.selected_options = state.selected_options
+        session.correct_bits = state.correct_bits
+        session.set_current_message(state.chat_id, state.message_id, state.deadline, state.poll_id)
+        snapshotter.adopt(session, state)
+        sessions[state.user_id] = session
+    snapshotter.snapshot()
+    assert os.path.getsize(path) == size
+    snapshotter.close()
+
+def test_compaction_keeps_only_live_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_store, "COMPACT_MIN_BYTES", 0)
+    path = str(tmp_path / "sessions.snapshot")
+    sessions = {user_id: make_session(user_id) for user_id in range(1, 6)}
+    snapshotter = SessionSnapshotter(path, sessions)
+    snapshotter.snapshot()
+    live_size = os.path.getsize(path)
+
+    # Each change appends one more record for the same session
+    session = sessions[1]
+    record_size = len(encode_session(session))
+    for i in range(20):
+        session.record_answer(i % 3, False)
+        snapshotter.snapshot()
+    snapshotter.close()
+
+    assert os.path.getsize(path) < live_size + 20 * record_size
+    assert os.path.getsize(path) <= live_size * session_store.COMPACT_RATIO
+    states = SessionSnapshotter(path, {}).load()
+    assert sorted(states) == [1, 2, 3, 4, 5]
+    assert_restores(states[1], session)
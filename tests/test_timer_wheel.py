@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the hierarchical timer wheel
+
+Most tests drive the wheel by hand: with a one-second tick and no thread
+running, a timer scheduled half a tick short of n seconds expires on the
+n-th call of _advance().
+"""
+
+import threading
+
+from utils.timer_wheel import TimerWheel
+
+def expiry_ticks(wheel, ticks):
+    """Advance the wheel tick by tick; returns {timer key: tick it expired on}"""
+    expired_at = {}
+    for tick in range(1, ticks + 1):
+        expired = []
+        wheel._advance(expired)
+        for timer in expired:
+            expired_at[timer.key] = tick
+    return expired_at
+
+def test_timers_cascade_down_to_their_tick():
+    # Level 0 spans 4 ticks, level 1 16; later timers wait in the overflow
+    wheel = TimerWheel(tick=1.0, wheel_size=4, levels=2)
+    for ticks in (1, 3, 7, 14, 16, 17, 41):
+        wheel.schedule(ticks - 0.5, None, key=ticks)
+    assert len(wheel) == 7
+
+    assert expiry_ticks(wheel, 50) == {ticks: ticks for ticks in (1, 3, 7, 14, 16, 17, 41)}
+    assert len(wheel) == 0
+
+def test_cancel_by_key_and_by_timer():
+    wheel = TimerWheel(tick=1.0, wheel_size=4, levels=2)
+    wheel.schedule(2.5, None, key="deadline")
+    near = wheel.schedule(5.5, None)
+    far = wheel.schedule(30.5, None)
+
+    assert wheel.cancel("deadline")
+    assert not wheel.cancel("deadline")
+    assert wheel.cancel(far)
+    assert not wheel.cancel(far)
+
+    expired = []
+    for _ in range(40):
+        wheel._advance(expired)
+    assert expired == [near]
+
+def test_rescheduling_a_key_replaces_its_timer():
+    wheel = TimerWheel(tick=1.0, wheel_size=4, levels=2)
+    first = wheel.schedule(2.5, None, key="countdown")
+    wheel.schedule(9.5, None, key="countdown")
+
+    # The first timer's handle no longer cancels the key
+    assert not wheel.cancel(first)
+    assert len(wheel) == 1
+    assert expiry_ticks(wheel, 20) == {"countdown": 10}
+
+def test_running_wheel_fires_callbacks():
+    wheel = TimerWheel(tick=0.01, workers=2)
+    wheel.start()
+    fired = threading.Event()
+    results = []
+    try:
+        wheel.schedule(0.05, lambda value: (results.append(value), fired.set()), "done")
+        wheel.schedule(0.02, results.append, "cancelled", key="cancelled")
+        wheel.cancel("cancelled")
+        assert fired.wait(5)
+    finally:
+        wheel.stop()
+    assert results == ["done"]
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Write-behind journal for quiz answers
+
+Answers are appended to an in-memory buffer on the callback path and a
+background thread writes them out in batches: first to an append-only
+journal file (when one is configured), then to the database. An answer is
+acknowledged once it is in the journal file, which is replayed on startup.
+
+Once the file has grown past a checkpoint size, it is truncated when the
+database stores answers durably. Otherwise it is compacted: rewritten with
+only the records a keep predicate still wants, e.g. the answers of quizzes
+that are still in progress.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Journal size at which a fully applied journal file is truncated or compacted
+CHECKPOINT_BYTES = 1024 * 1024
+
+class AnswerJournal:
+    """
+    Buffered, batched answer log with a background flusher thread
+    """
+
+    def __init__(self, apply_batch, path=None, flush_interval=0.5, fsync_interval=1.0, batch_size=500,
+                 truncate_after_apply=False, keep=None):
+        """
+        Initialize the journal
+
+        Args:
+            apply_batch (callable): Called from the flusher thread with a list of
+                answer records; should raise if the records could not be stored
+            path (str, optional): Journal file path. Without one, answers are
+                only batched and nothing is replayed after a restart.
+            flush_interval (float): Seconds between flushes
+            fsync_interval (float): Minimum seconds between fsyncs of the journal file
+            batch_size (int): Buffered records that trigger an early flush
+            truncate_after_apply (bool): Whether apply_batch stores records durably,
+                so the journal file can be truncated once they are applied
+            keep (callable, optional): Without truncate_after_apply, called from
+                the flusher thread with each applied record when the file is
+                compacted; records it returns False for are dropped from the file
+        """
+        self.apply_batch = apply_batch
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.truncate_after_apply = truncate_after_apply
+        self.keep = keep
+
+        self._buffer = deque()
+        self._unapplied = []
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+        # Size the file must reach before the next compaction; compacting
+        # again right away would be wasted if most records are still kept
+        self._compact_at = CHECKPOINT_BYTES
+        self._thread = None
+
+    def start(self):
+        """Start the background flusher thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="answer-journal", daemon=True)
+            self._thread.start()
+
+    def append(self, record):
+        """
+        Queue an answer record without blocking
+
+        Args:
+            record (tuple): (user_id, quiz_id, question_index, selected_option, is_correct, timestamp)
+        """
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def replay(self):
+        """
+        Read every record from the journal file
+
+        Returns:
+            list: Answer records in the order they were written
+        """
+        if not self.path or not os.path.exists(self.path):
+            return []
+
+        records = []
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(tuple(json.loads(line)))
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    logger.warning("Skipping unreadable answer journal line")
+        return records
+
+    def truncate(self):
+        """Discard the journal file contents once its records are stored elsewhere"""
+        with self._flush_lock:
+            self._truncate()
+
+    def _truncate(self):
+        """Truncate the journal file; the caller holds the flush lock"""
+        if self._file:
+            self._file.seek(0)
+            self._file.truncate(0)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    def _compact(self):
+        """Rewrite the journal file with the records keep() wants; the caller holds the flush lock"""
+        self._file.close()
+        kept = [record for record in self.replay() if self.keep(record)]
+        with open(self.path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in kept))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.path + ".tmp", self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._dirty = False
+        self._compact_at = max(CHECKPOINT_BYTES, 2 * self._file.tell())
+        logger.info(f"Compacted the answer journal to {len(kept)} records")
+
+    def flush(self):
+        """Write out and apply everything buffered so far"""
+        with self._flush_lock:
+            batch = []
+            while self._buffer:
+                batch.append(self._buffer.popleft())
+
+            if batch and self._file:
+                self._file.write(''.join(json.dumps(record) + '\n' for record in batch))
+                self._file.flush()
+                self._dirty = True
+
+            now = time.monotonic()
+            if self._dirty and now - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+                self._dirty = False
+
+            pending = self._unapplied + batch
+            if not pending:
+                return
+
+            try:
+                self.apply_batch(pending)
+            except Exception as e:
+                # Keep the records and retry them with the next batch
+                logger.error(f"Error applying {len(pending)} journaled answers: {e}")
+                self._unapplied = pending
+                return
+
+            self._unapplied = []
+            if not self._file:
+                return
+            if self.truncate_after_apply:
+                if self._file.tell() >= CHECKPOINT_BYTES:
+                    self._truncate()
+            elif self.keep is not None and self._file.tell() >= self._compact_at:
+                try:
+                    self._compact()
+                except OSError as e:
+                    logger.error(f"Could not compact the answer journal: {e}")
+                    if self._file.closed:
+                        self._file = open(self.path, 'a', encoding='utf-8')
+                    self._compact_at = 2 * self._file.tell()
+
+    def _run(self):
+        """Flusher thread main loop"""
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flusher thread after a final flush"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+        if self._file:
+            if self._dirty:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Broadcast quiz sessions for groups and channels
+
+One question message is shown to a whole chat and every participant answers
+against it before a shared deadline. Participants are kept in a columnar
+table (one slot per user, counters and selections in flat arrays), so a
+quiz with thousands of participants costs a few bytes per answer and a
+constant number of messages per question.
+"""
+
+import heapq
+import threading
+import time
+from array import array
+
+class BroadcastSession:
+    """
+    A live quiz running in one chat for many participants
+    """
+
+    def __init__(self, chat_id, quiz, host_id):
+        """
+        Initialize a broadcast session
+
+        Args:
+            chat_id (int): Chat the quiz runs in
+            quiz (Quiz): The quiz being broadcast
+            host_id (int): Telegram ID of the admin who started it
+        """
+        self.chat_id = chat_id
+        self.quiz = quiz
+        self.host_id = host_id
+        self.current_question_index = -1
+        self.message_id = None
+        self.scoreboard_message_id = None
+        self.deadline = 0.0
+
+        self._lock = threading.Lock()
+        self._open = False
+        # user_id -> slot in the columns below
+        self._slots = {}
+        self._user_ids = array('q')
+        self._correct = array('H')
+        self._wrong = array('H')
+        # Selected option per slot and question, -1 for no answer
+        self._selected = array('b')
+        self._option_counts = []
+
+    def __len__(self):
+        return len(self._user_ids)
+
+    def open_question(self, question_index, message_id, time_limit):
+        """
+        Start accepting answers to a question
+
+        Args:
+            question_index (int): 0-based question index
+            message_id (int): Message the question was sent in
+            time_limit (int): Seconds until the shared deadline
+        """
+        with self._lock:
+            self.current_question_index = question_index
+            self.message_id = message_id
+            self.deadline = time.time() + time_limit
+            self._option_counts = [0] * len(self.quiz.questions[question_index].options)
+            self._open = True
+
+    def record_answer(self, user_id, question_index, selected_option):
+        """
+        Record a participant's answer to the open question
+
+        Returns:
+            bool: False if the question is closed or the user already answered it
+        """
+        with self._lock:
+            if not self._open or question_index != self.current_question_index or time.time() > self.deadline:
+                return False
+
+            question = self.quiz.questions[question_index]
+            if not 0 <= selected_option < len(question.options):
+                return False
+
+            slot = self._slots.get(user_id)
+            if slot is None:
+                slot = self._slots[user_id] = len(self._user_ids)
+                self._user_ids.append(user_id)
+                self._correct.append(0)
+                self._wrong.append(0)
+                self._selected.extend(array('b', [-1]) * len(self.quiz.questions))
+
+            position = slot * len(self.quiz.questions) + question_index
+            if self._selected[position] != -1:
+                return False
+
+            self._selected[position] = selected_option
+            self._option_counts[selected_option] += 1
+            if selected_option == question.correct_option:
+                self._correct[slot] += 1
+            else:
+                self._wrong[slot] += 1
+            return True
+
+    def close_question(self, question_index):
+        """
+        Stop accepting answers to a question
+
+        Returns:
+            list: Answer count per option, or None if the question was not open
+        """
+        with self._lock:
+            if not self._open or question_index != self.current_question_index:
+                return None
+            self._open = False
+            return list(self._option_counts)
+
+    def _score(self, slot):
+        correct = self._correct[slot]
+        wrong = self._wrong[slot]
+        score = correct - wrong * self.quiz.negative_marking_factor if wrong else correct
+        return max(0, score)
+
+    def standings(self, limit=10):
+        """
+        Get the best participants so far
+
+        Returns:
+            list: (user_id, score, correct) tuples, highest score first
+        """
+        with self._lock:
+            best = heapq.nlargest(
+                limit, range(len(self._user_ids)),
+                key=lambda slot: (self._score(slot), self._correct[slot], -slot)
+            )
+            return [(self._user_ids[slot], self._score(slot), self._correct[slot]) for slot in best]
+
+    def results(self):
+        """
+        Final result of every participant
+
+        Yields:
+            tuple: (user_id, score, answers) with answers in the format of QuizSession.answers
+        """
+        questions = self.quiz.questions
+        count = len(questions)
+        for slot, user_id in enumerate(self._user_ids):
+            selected = self._selected[slot * count:(slot + 1) * count]
+            answers = [{
+                'selected_option': selected[i],
+                'is_correct': selected[i] == question.correct_option,
+                'question_text': question.text,
+                'options': question.options,
+                'correct_option': question.correct_option
+            } for i, question in enumerate(questions)]
+            yield user_id, self._score(slot), answers
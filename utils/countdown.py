@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Coalescing editor for question countdown messages
+
+Only the latest countdown text of a message is kept. If an edit for that
+message is still queued when a newer one arrives, the queued call picks up
+the newer text when it is released. Unchanged text is never re-sent, and
+once a question is answered or timed out its message takes no further
+countdown edits.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from utils.outbound import get_outbound, PRIORITY_COUNTDOWN
+
+# Finished messages remembered to reject late countdown edits
+MAX_FINISHED = 10000
+
+# Countdown ticks are never slowed beyond this many seconds
+MAX_TICK_INTERVAL = 10
+
+class CountdownEditor:
+    """
+    Latest-value countdown edits on top of the outbound queue
+    """
+
+    def __init__(self, outbound, max_interval=MAX_TICK_INTERVAL):
+        """
+        Initialize the editor
+
+        Args:
+            outbound (OutboundDispatcher): Queue the edits go through
+            max_interval (float): Upper bound for interval()
+        """
+        self.outbound = outbound
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        # (chat_id, message_id) -> (text, reply_markup) waiting for its queued call
+        self._pending = {}
+        # (chat_id, message_id) -> last text handed to the queue
+        self._last_text = {}
+        self._finished = OrderedDict()
+
+    def update(self, chat_id, message_id, text, reply_markup=None):
+        """
+        Show a new countdown text on a message
+
+        Returns:
+            bool: False if the edit was skipped as unchanged or finished
+        """
+        key = (chat_id, message_id)
+        with self._lock:
+            if key in self._finished or self._last_text.get(key) == text:
+                return False
+            self._last_text[key] = text
+            queued = key in self._pending
+            self._pending[key] = (text, reply_markup)
+
+        if not queued:
+            self.outbound.submit(
+                "edit_message_text", chat_id, PRIORITY_COUNTDOWN,
+                prepare=partial(self._take, key), message_id=message_id
+            )
+        return True
+
+    def finish(self, chat_id, message_id):
+        """Drop pending countdown edits of a message and refuse new ones"""
+        key = (chat_id, message_id)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._last_text.pop(key, None)
+            self._finished[key] = True
+            if len(self._finished) > MAX_FINISHED:
+                self._finished.popitem(last=False)
+
+    def interval(self, base):
+        """
+        Seconds until the next countdown tick
+
+        Stretches the base interval by the outbound backlog, so countdowns
+        tick slower while the bot is near Telegram's rate limits.
+        """
+        return min(self.max_interval, base * (1 + self.outbound.load()))
+
+    def _take(self, key):
+        """Hand the latest text of a message to its queued call"""
+        with self._lock:
+            pending = self._pending.pop(key, None)
+        if pending is None:
+            return None
+        text, reply_markup = pending
+        return {'text': text, 'reply_markup': reply_markup}
+
+_editor = None
+_editor_lock = threading.Lock()
+
+def get_countdown_editor(bot):
+    """Get the shared countdown editor for the bot"""
+    global _editor
+    if _editor is None:
+        with _editor_lock:
+            if _editor is None:
+                _editor = CountdownEditor(get_outbound(bot))
+    return _editor
@@ -2,19 +2,119 @@
 # -*- coding: utf-8 -*-
 
 """
-In-memory database for quiz data
+Database for quiz data
+
+Everything is served from in-memory dictionaries. When DATABASE_URL points
+at a persistent store, every write also goes through to that backend and
+the dictionaries are loaded from it by init_database(), which the bot
+calls at startup.
 """
 
 import json
+import logging
+import threading
+import time
 from datetime import datetime
 from models.quiz import Quiz, Question
 from models.user import User
+from config import (
+    DATABASE_URL, DISPATCHER_WORKERS, ANSWER_JOURNAL_PATH,
+    ANSWER_JOURNAL_FLUSH_INTERVAL, ANSWER_JOURNAL_FSYNC_INTERVAL
+)
+from utils.answer_journal import AnswerJournal
+from utils.leaderboard import Leaderboard
+from utils.question_cache import warm_quiz, invalidate_quiz
+
+logger = logging.getLogger(__name__)
 
 # In-memory database
 quizzes = {}
 users = {}
 quiz_results = {}
 
+# Secondary index over quiz_results: quiz_id -> {user_id -> result}
+# Entries are the same dictionaries stored in quiz_results
+quiz_results_by_quiz = {}
+
+# Guards quiz_results and quiz_results_by_quiz, which the journal's flusher
+# thread updates while handlers read and write them; reentrant because
+# applying an answer stores a new result entry
+_results_lock = threading.RLock()
+
+# Ranked finished results per quiz: quiz_id -> Leaderboard
+leaderboards = {}
+# Serializes creating a quiz's Leaderboard; each board locks its own updates
+_leaderboards_lock = threading.Lock()
+
+# Persistent storage backend, None when running purely in memory
+_backend = None
+
+# Write-behind journal for in-progress answers
+_journal = None
+
+def _create_backend(database_url):
+    """Create the storage backend selected by a database URL"""
+    if database_url.startswith("sqlite:///"):
+        path = database_url[len("sqlite:///"):]
+        if not path or path == ":memory:":
+            return None
+        from utils.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(path)
+    
+    if database_url.startswith(("postgres://", "postgresql://")):
+        from utils.postgres_backend import PostgresBackend
+        # One connection per dispatcher worker: every handler that touches
+        # the database runs on one of those threads
+        return PostgresBackend(database_url, DISPATCHER_WORKERS)
+    
+    logger.warning(f"Unsupported DATABASE_URL scheme '{database_url.split(':', 1)[0]}', keeping data in memory")
+    return None
+
+def init_database(database_url=DATABASE_URL):
+    """Open the storage backend, load persisted data into memory and replay the answer journal"""
+    global _backend, _journal
+    if _journal:
+        _journal.close()
+    
+    _backend = _create_backend(database_url)
+    _journal = AnswerJournal(
+        _store_answers,
+        ANSWER_JOURNAL_PATH or None,
+        flush_interval=ANSWER_JOURNAL_FLUSH_INTERVAL,
+        fsync_interval=ANSWER_JOURNAL_FSYNC_INTERVAL,
+        truncate_after_apply=_backend is not None,
+        keep=_answer_in_progress
+    )
+    replayed = _journal.replay()
+    
+    if _backend:
+        for quiz in _backend.load_quizzes():
+            quizzes[quiz.id] = quiz
+        for user in _backend.load_users():
+            users[user.id] = user
+        for user_id, quiz_id, result in _backend.load_results():
+            _store_result(user_id, quiz_id, result)
+        
+        # Replayed answers may already be stored; the backend ignores
+        # duplicates. Those of a stored result were deleted with it and
+        # must not come back.
+        replayed = [record for record in replayed if not _answer_superseded(record)]
+        if replayed:
+            _backend.save_answers(replayed)
+            _journal.truncate()
+        for record in _backend.load_answers():
+            _apply_user_answer(record)
+        
+        logger.info(f"Loaded {len(quizzes)} quizzes, {len(users)} users and results for {len(quiz_results)} users")
+    else:
+        for record in replayed:
+            _apply_user_answer(record)
+    
+    if replayed:
+        logger.info(f"Replayed {len(replayed)} answers from the answer journal")
+    
+    _journal.start()
+
 def get_quizzes():
     """Get all quizzes"""
     return quizzes
@@ -26,25 +126,48 @@ def get_quiz(quiz_id):
 def add_quiz(quiz):
     """Add a quiz to the database"""
     quizzes[quiz.id] = quiz
+    warm_quiz(quiz)
+    if _backend:
+        _backend.save_quiz(quiz)
     return quiz.id
 
 def update_quiz_time(quiz_id, time_limit):
     """Update the overall time limit for a quiz"""
     if quiz_id in quizzes:
         quizzes[quiz_id].time_limit = time_limit
+        invalidate_quiz(quiz_id)
+        if _backend:
+            _backend.save_quiz(quizzes[quiz_id])
         return True
     return False
 
 def update_question_time_limit(quiz_id, question_index, time_limit):
     """Update the time limit for a specific question in a quiz"""
     if quiz_id in quizzes:
-        return quizzes[quiz_id].set_question_time_limit(question_index, time_limit)
+        updated = quizzes[quiz_id].set_question_time_limit(question_index, time_limit)
+        if updated:
+            invalidate_quiz(quiz_id)
+            if _backend:
+                _backend.save_quiz(quizzes[quiz_id])
+        return updated
+    return False
+
+def update_quiz_delivery_mode(quiz_id, delivery_mode):
+    """Update how a quiz's questions are delivered"""
+    if quiz_id in quizzes:
+        quizzes[quiz_id].delivery_mode = delivery_mode
+        if _backend:
+            _backend.save_quiz(quizzes[quiz_id])
+        return True
     return False
 
 def delete_quiz(quiz_id):
     """Delete a quiz"""
     if quiz_id in quizzes:
         del quizzes[quiz_id]
+        invalidate_quiz(quiz_id)
+        if _backend:
+            _backend.delete_quiz(quiz_id)
         return True
     return False
 
@@ -52,49 +175,112 @@ def get_user(user_id, username=None, first_name=None, last_name=None):
     """Get a user by ID or create one if it doesn't exist"""
     if user_id not in users:
         users[user_id] = User(user_id, username, first_name, last_name)
+        if _backend:
+            _backend.save_user(users[user_id])
     return users[user_id]
 
-def record_user_answer(user_id, quiz_id, question_index, selected_option, is_correct):
-    """Record a user's answer to a specific question"""
-    # Initialize user's quiz results if needed
-    if user_id not in quiz_results:
-        quiz_results[user_id] = {}
-    
-    if quiz_id not in quiz_results[user_id]:
-        quiz_results[user_id][quiz_id] = {
-            'quiz_id': quiz_id,
-            'answers': [],
-            'timestamp': datetime.now().timestamp(),
-        }
-    
-    # Get the question for more detailed recording
-    quiz = get_quiz(quiz_id)
-    question = None
-    if quiz and 0 <= question_index < len(quiz.questions):
-        question = quiz.questions[question_index]
+def _store_result(user_id, quiz_id, result):
+    """Store a result entry in quiz_results and the per-quiz index"""
+    with _results_lock:
+        if user_id not in quiz_results:
+            quiz_results[user_id] = {}
+        quiz_results[user_id][quiz_id] = result
+        quiz_results_by_quiz.setdefault(quiz_id, {})[user_id] = result
+        if 'score' in result:
+            board = leaderboards.get(quiz_id)
+            if board is None:
+                with _leaderboards_lock:
+                    board = leaderboards.get(quiz_id)
+                    if board is None:
+                        board = leaderboards[quiz_id] = Leaderboard()
+            board.update(user_id, result['score'], result['timestamp'])
+        elif quiz_id in leaderboards:
+            # A new attempt replaces the user's finished result, if any
+            leaderboards[quiz_id].remove(user_id)
+
+def _apply_user_answer(record):
+    """Add an in-progress answer record to the in-memory results"""
+    user_id, quiz_id, question_index, selected_option, is_correct, timestamp = record
     
-    # Record answer with all details
     answer_data = {
         'question_index': question_index,
         'selected_option': selected_option,
         'is_correct': is_correct,
     }
     
-    # Add question details if available
-    if question:
+    # Question details come from the quiz, keeping journal records small
+    quiz = quizzes.get(quiz_id)
+    if quiz and 0 <= question_index < len(quiz.questions):
+        question = quiz.questions[question_index]
         answer_data['question_text'] = question.text
         answer_data['options'] = question.options
         answer_data['correct_option'] = question.correct_option
     
-    # Add to answers list
-    quiz_results[user_id][quiz_id]['answers'].append(answer_data)
+    with _results_lock:
+        if _answer_superseded(record):
+            return
+        result = quiz_results.get(user_id, {}).get(quiz_id)
+        if result is None or 'score' in result:
+            # The first answer, or the first of a new attempt after a finished one
+            result = {
+                'quiz_id': quiz_id,
+                'answers': [],
+                'timestamp': timestamp,
+            }
+            _store_result(user_id, quiz_id, result)
+        
+        result['answers'].append(answer_data)
+
+def _answer_superseded(record):
+    """
+    Whether an answer belongs to an attempt whose full result is recorded
+    
+    That is any answer up to the finished result's completion time; later
+    ones are from a new attempt.
+    """
+    with _results_lock:
+        result = quiz_results.get(record[0], {}).get(record[1])
+        return result is not None and 'score' in result and record[5] <= result['timestamp']
+
+def _answer_in_progress(record):
+    """
+    Whether a journaled answer belongs to a quiz attempt its user hasn't finished
+    
+    Without a backend the journal is all there is to restore in-progress
+    quizzes from, so it is compacted down to these answers. Answers given
+    before the current attempt started are from an earlier one.
+    """
+    with _results_lock:
+        result = quiz_results.get(record[0], {}).get(record[1])
+        return result is not None and 'score' not in result and record[5] >= result['timestamp']
+
+def _store_answers(records):
+    """Store a batch of answer records (runs on the journal's flusher thread)"""
+    if _backend:
+        _backend.save_answers(records)
+    # One acquisition for the batch; handlers wait at most for its updates
+    with _results_lock:
+        for record in records:
+            _apply_user_answer(record)
+
+def record_user_answer(user_id, quiz_id, question_index, selected_option, is_correct):
+    """Record a user's answer to a specific question"""
+    # Only queues the answer; the journal writes it out in the background
+    _journal.append((user_id, quiz_id, question_index, selected_option, bool(is_correct), time.time()))
+
+def flush_answers():
+    """Write out all answers recorded so far"""
+    _journal.flush()
+
+def close_database():
+    """Flush buffered answers and close the storage backend"""
+    if _journal:
+        _journal.close()
+    if _backend:
+        _backend.close()
 
 def record_quiz_result(user_id, quiz_id, score, max_score, answers):
     """Record a quiz result for a user"""
-    # Initialize user's quiz results if needed
-    if user_id not in quiz_results:
-        quiz_results[user_id] = {}
-    
     # Get the quiz for title and other details
     quiz = get_quiz(quiz_id)
     quiz_title = quiz.title if quiz else f"Quiz {quiz_id}"
@@ -113,7 +299,7 @@ def record_quiz_result(user_id, quiz_id, score, max_score, answers):
         formatted_answers.append(formatted_answer)
     
     # Create result entry
-    quiz_results[user_id][quiz_id] = {
+    result = {
         'quiz_id': quiz_id,
         'quiz_title': quiz_title,
         'score': score,
@@ -122,15 +308,28 @@ def record_quiz_result(user_id, quiz_id, score, max_score, answers):
         'answers': formatted_answers,
         'negative_marking_factor': quiz.negative_marking_factor if quiz else 0.25
     }
+    _store_result(user_id, quiz_id, result)
+    
+    if _backend:
+        # save_result deletes the stored answers of this attempt; any still
+        # buffered must be stored first, or they would outlive it
+        _journal.flush()
+        _backend.save_result(user_id, quiz_id, result)
 
 def get_user_quiz_results(user_id):
     """Get all quiz results for a user"""
-    if user_id not in quiz_results:
-        return []
+    with _results_lock:
+        if user_id not in quiz_results:
+            return []
+        # In-progress answer lists still grow, so they are copied
+        entries = [
+            (quiz_id, result, list(result.get('answers', [])))
+            for quiz_id, result in quiz_results[user_id].items()
+        ]
     
     # Format results for the user
     results = []
-    for quiz_id, result in quiz_results[user_id].items():
+    for quiz_id, result, answers in entries:
         # Calculate percentage
         max_score = result.get('max_score', 0)
         score = result.get('score', 0)
@@ -144,7 +343,7 @@ def get_user_quiz_results(user_id):
             'percentage': round(percentage, 1),
             'timestamp': result.get('timestamp', 0),
             'date': datetime.fromtimestamp(result.get('timestamp', 0)).strftime('%Y-%m-%d %H:%M'),
-            'answers': result.get('answers', []),
+            'answers': answers,
             'negative_marking_factor': result.get('negative_marking_factor', 0.25)
         }
         results.append(formatted_result)
@@ -154,14 +353,47 @@ def get_user_quiz_results(user_id):
 
 def get_quiz_results(quiz_id):
     """Get all results for a specific quiz"""
-    results = []
-    for user_id, user_results in quiz_results.items():
-        if quiz_id in user_results:
-            results.append({
-                'user_id': user_id,
-                'result': user_results[quiz_id]
-            })
-    return results
+    with _results_lock:
+        return [
+            {'user_id': user_id, 'result': result}
+            for user_id, result in quiz_results_by_quiz.get(quiz_id, {}).items()
+        ]
+
+def get_leaderboard(quiz_id):
+    """Get the leaderboard of a quiz, or None if nobody has finished it"""
+    return leaderboards.get(quiz_id)
+
+def iter_quiz_results_by_score(quiz_id, offset=0, limit=None):
+    """
+    Iterate over the finished results of a quiz, highest score first
+    
+    Ties are broken by completion time, earliest first. In-progress entries
+    (answers recorded but no final score yet) are skipped.
+    
+    Args:
+        quiz_id (str): The quiz ID
+        offset (int): Number of results to skip
+        limit (int, optional): Maximum number of results to yield
+        
+    Yields:
+        dict: {'user_id': ..., 'rank': ..., 'result': ...} with 1-based ranks
+    """
+    board = leaderboards.get(quiz_id)
+    if board is None:
+        return
+    
+    # The page is read under the lock; nothing is held across yields
+    with _results_lock:
+        results = quiz_results_by_quiz[quiz_id]
+        page = [
+            {'user_id': user_id, 'rank': rank, 'result': results[user_id]}
+            for rank, user_id, score, timestamp in board.top(limit, offset)
+        ]
+    yield from page
+
+def get_quiz_results_page(quiz_id, page=0, page_size=20):
+    """Get one page of a quiz's finished results, highest score first"""
+    return list(iter_quiz_results_by_score(quiz_id, page * page_size, page_size))
 
 def export_quiz(quiz_id):
     """Export a quiz to JSON format"""
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Incrementally maintained per-quiz leaderboards
+
+Results are recorded from dispatcher workers, timer threads and the answer
+journal's flusher thread, so each Leaderboard guards its skip list with a
+lock; IndexableSkipList itself is not thread-safe.
+"""
+
+import random
+import threading
+
+# Enough levels for ~16 million entries at p = 1/2
+MAX_LEVEL = 24
+
+class _Node:
+    """Skip list node; width[i] is the number of positions spanned by next[i]"""
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level
+
+class IndexableSkipList:
+    """
+    Sorted collection with O(log n) insert, remove, rank and positional access
+    """
+
+    def __init__(self):
+        self._head = _Node(None, MAX_LEVEL)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _random_level(self):
+        level = 1
+        while level < MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key):
+        """
+        Insert a key
+
+        Args:
+            key: Any comparable value; keys are expected to be unique
+        """
+        update = [None] * MAX_LEVEL
+        positions = [0] * MAX_LEVEL
+        node = self._head
+        position = 0
+        for i in reversed(range(MAX_LEVEL)):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+            update[i] = node
+            positions[i] = position
+
+        level = self._random_level()
+        new_node = _Node(key, level)
+        for i in range(MAX_LEVEL):
+            if i < level:
+                distance = position - positions[i]
+                new_node.next[i] = update[i].next[i]
+                update[i].next[i] = new_node
+                new_node.width[i] = update[i].width[i] - distance
+                update[i].width[i] = distance + 1
+            else:
+                update[i].width[i] += 1
+        self._size += 1
+
+    def remove(self, key):
+        """
+        Remove a key
+
+        Raises:
+            KeyError: If the key is not present
+        """
+        update = [None] * MAX_LEVEL
+        node = self._head
+        for i in reversed(range(MAX_LEVEL)):
+            while node.next[i] is not None and node.next[i].key < key:
+                node = node.next[i]
+            update[i] = node
+
+        target = update[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+
+        for i in range(MAX_LEVEL):
+            if i < len(target.next):
+                update[i].width[i] += target.width[i] - 1
+                update[i].next[i] = target.next[i]
+            else:
+                update[i].width[i] -= 1
+        self._size -= 1
+
+    def index(self, key):
+        """
+        Get the 0-based position of a key
+
+        Raises:
+            KeyError: If the key is not present
+        """
+        node = self._head
+        position = 0
+        for i in reversed(range(MAX_LEVEL)):
+            while node.next[i] is not None and node.next[i].key <= key:
+                position += node.width[i]
+                node = node.next[i]
+            if node.key == key and node is not self._head:
+                return position - 1
+        raise KeyError(key)
+
+    def iter_from(self, start):
+        """Iterate over keys starting at a 0-based position"""
+        if start >= self._size:
+            return
+        node = self._head
+        remaining = start + 1
+        for i in reversed(range(MAX_LEVEL)):
+            while node.next[i] is not None and node.width[i] <= remaining:
+                remaining -= node.width[i]
+                node = node.next[i]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+class Leaderboard:
+    """
+    Ranking of a quiz's results: highest score first, then earliest completion
+    """
+
+    def __init__(self):
+        self._entries = IndexableSkipList()
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def update(self, user_id, score, timestamp):
+        """
+        Insert or replace a user's result
+
+        Args:
+            user_id (int): Telegram user ID
+            score (float): Final score
+            timestamp (float): Completion time
+        """
+        key = (-score, timestamp, user_id)
+        with self._lock:
+            old_key = self._keys.get(user_id)
+            if old_key is not None:
+                self._entries.remove(old_key)
+            self._entries.insert(key)
+            self._keys[user_id] = key
+
+    def remove(self, user_id):
+        """Remove a user's result if present"""
+        with self._lock:
+            key = self._keys.pop(user_id, None)
+            if key is not None:
+                self._entries.remove(key)
+
+    def rank(self, user_id):
+        """
+        Get a user's 1-based rank
+
+        Returns:
+            int: The rank, or None if the user has no result
+        """
+        with self._lock:
+            key = self._keys.get(user_id)
+            if key is None:
+                return None
+            return self._entries.index(key) + 1
+
+    def top(self, limit=10, offset=0):
+        """
+        Get a slice of the ranking
+
+        Returns:
+            list: (rank, user_id, score, timestamp) tuples
+        """
+        entries = []
+        with self._lock:
+            for rank, (negative_score, timestamp, user_id) in enumerate(self._entries.iter_from(offset), offset + 1):
+                if limit is not None and len(entries) >= limit:
+                    break
+                entries.append((rank, user_id, -negative_score, timestamp))
+        return entries
@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Rate-limited outbound queue for Telegram Bot API calls
+
+Telegram allows roughly 30 messages per second overall and about one per
+second per chat, answering anything faster with 429 Too Many Requests.
+Messages and edits are queued here instead of being sent directly. A
+scheduler thread releases them in priority order: questions, answer
+feedback and results before countdown edits. It only releases a message
+when both the global token bucket and the chat's bucket have a token.
+The actual HTTP calls run on a small thread pool. When Telegram still
+answers 429, the chat is paused for the retry_after it asks for and the
+call is queued again.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Lower values are sent first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_COUNTDOWN = 10
+
+# Attempts for a call that keeps getting 429 responses
+MAX_ATTEMPTS = 5
+
+# Idle seconds after which a chat's bucket is forgotten
+CHAT_BUCKET_TTL = 60
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate"""
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def delay(self, now, reserve=0):
+        """Seconds until a token is available while keeping `reserve` tokens back"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = 1 + min(reserve, self.capacity - 1)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def consume(self):
+        """Take a token; delay() must have returned 0"""
+        self.tokens -= 1
+
+    def block(self, until):
+        """Refuse tokens until a point in time, e.g. after a 429 response"""
+        self.blocked_until = max(self.blocked_until, until)
+        # One call may go out when the block ends; refilling starts from there
+        self.tokens = 1
+        self.updated = max(self.updated, self.blocked_until)
+
+class _Request:
+    """A queued Bot API call"""
+    __slots__ = ('method', 'chat_id', 'priority', 'kwargs', 'prepare', 'future', 'attempts')
+
+    def __init__(self, method, chat_id, priority, kwargs, prepare):
+        self.method = method
+        self.chat_id = chat_id
+        self.priority = priority
+        self.kwargs = kwargs
+        self.prepare = prepare
+        self.future = Future()
+        self.attempts = 0
+
+class OutboundDispatcher:
+    """
+    Priority queue of Bot API calls with global and per-chat rate limits
+    """
+
+    def __init__(self, bot, global_rate=30, chat_rate=1.0, chat_burst=3, workers=4):
+        """
+        Initialize the dispatcher
+
+        Args:
+            bot (telegram.Bot): Bot used to make the calls
+            global_rate (float): Messages per second across all chats
+            chat_rate (float): Messages per second to a single chat
+            chat_burst (int): Messages a chat can receive back to back
+            workers (int): Threads making HTTP calls
+        """
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+
+        now = time.monotonic()
+        # A small global burst: calls are counted when released, but network
+        # jitter bunches them up again by the time they reach Telegram
+        self._global = TokenBucket(global_rate, max(1, global_rate // 4), now)
+        self._chats = {}
+        self._last_prune = now
+        # (priority, seq, request), ready to go once buckets allow
+        self._ready = []
+        # (not_before, priority, seq, request), waiting on their chat's bucket
+        self._deferred = []
+        # chat_id -> request being sent, and entries queued behind it
+        self._busy = {}
+        self._parked = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._executor = None
+        self._thread = None
+
+    def start(self):
+        """Start the scheduler thread"""
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="outbound")
+            self._thread = threading.Thread(target=self._run, name="outbound", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the scheduler thread; queued calls are dropped"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+
+    def pending(self):
+        """Number of calls waiting to be sent"""
+        with self._cond:
+            return len(self._ready) + len(self._deferred) + sum(len(entries) for entries in self._parked.values())
+
+    def load(self):
+        """Seconds it would take to send everything queued at the global rate"""
+        with self._cond:
+            return (len(self._ready) + len(self._deferred)) / self._global.rate
+
+    def submit(self, method, chat_id, priority=PRIORITY_INTERACTIVE, prepare=None, **kwargs):
+        """
+        Queue a Bot API call to a chat
+
+        Args:
+            method (str): Bot method name, e.g. "send_message"
+            chat_id (int): Target chat, also passed to the method
+            priority (int): PRIORITY_INTERACTIVE or PRIORITY_COUNTDOWN
+            prepare (callable, optional): Called on the scheduler thread right
+                before the call is released; returns further method arguments,
+                or None to drop the call. Must not block or submit calls.
+            **kwargs: Further method arguments
+
+        Returns:
+            Future: Resolves to the method's return value, or None if dropped
+        """
+        request = _Request(method, chat_id, priority, dict(kwargs, chat_id=chat_id), prepare)
+        with self._cond:
+            heapq.heappush(self._ready, (priority, next(self._seq), request))
+            self._cond.notify()
+        return request.future
+
+    def send_message(self, chat_id, text, reply_markup=None, priority=PRIORITY_INTERACTIVE):
+        """Queue a sendMessage call"""
+        return self.submit("send_message", chat_id, priority, text=text, reply_markup=reply_markup)
+
+    def edit_message_text(self, chat_id, message_id, text, reply_markup=None, priority=PRIORITY_INTERACTIVE):
+        """Queue an editMessageText call"""
+        return self.submit(
+            "edit_message_text", chat_id, priority,
+            message_id=message_id, text=text, reply_markup=reply_markup
+        )
+
+    def _chat_bucket(self, chat_id, now):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _prune(self, now):
+        """Forget chats that have been idle long enough to have a full bucket"""
+        self._last_prune = now
+        idle = [
+            chat_id for chat_id, bucket in self._chats.items()
+            if now - bucket.updated > CHAT_BUCKET_TTL and now >= bucket.blocked_until
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    def _run(self):
+        """Scheduler thread: release queued calls as the rate limits allow"""
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                while self._deferred and self._deferred[0][0] <= now:
+                    _, priority, seq, request = heapq.heappop(self._deferred)
+                    heapq.heappush(self._ready, (priority, seq, request))
+
+                if now - self._last_prune > CHAT_BUCKET_TTL:
+                    self._prune(now)
+
+                if not self._ready:
+                    self._cond.wait(self._deferred[0][0] - now if self._deferred else None)
+                    continue
+
+                global_delay = self._global.delay(now)
+                if global_delay > 0:
+                    self._cond.wait(global_delay)
+                    continue
+
+                entry = heapq.heappop(self._ready)
+                priority, seq, request = entry
+                chat_id = request.chat_id
+
+                # Calls to one chat go out one at a time so they arrive in order
+                owner = self._busy.get(chat_id)
+                if owner is not None and owner is not request:
+                    self._parked.setdefault(chat_id, []).append(entry)
+                    continue
+
+                # Cosmetic calls leave a token in the chat's bucket so the
+                # next interactive message doesn't wait behind them
+                chat_bucket = self._chat_bucket(chat_id, now)
+                chat_delay = chat_bucket.delay(now, reserve=1 if priority >= PRIORITY_COUNTDOWN else 0)
+                if chat_delay > 0:
+                    heapq.heappush(self._deferred, (now + chat_delay, priority, seq, request))
+                    continue
+
+                if request.prepare is not None and owner is None:
+                    extra = request.prepare()
+                    if extra is None:
+                        request.future.set_result(None)
+                        continue
+                    request.kwargs.update(extra)
+
+                self._global.consume()
+                chat_bucket.consume()
+                self._busy[chat_id] = request
+                self._executor.submit(self._send, request, seq)
+
+    def _send(self, request, seq):
+        """Make one queued call on a pool thread"""
+        request.attempts += 1
+        try:
+            result = getattr(self.bot, request.method)(**request.kwargs)
+        except Exception as e:
+            retry_after = getattr(e, 'retry_after', None)
+            if retry_after is not None and request.attempts < MAX_ATTEMPTS:
+                self._retry_later(request, seq, retry_after)
+                return
+            self._finish(request)
+            logger.error(f"{request.method} to chat {request.chat_id} failed: {str(e)}")
+            request.future.set_exception(e)
+        else:
+            self._finish(request)
+            request.future.set_result(result)
+
+    def _finish(self, request):
+        """Let the next call to the request's chat go out"""
+        with self._cond:
+            del self._busy[request.chat_id]
+            for entry in self._parked.pop(request.chat_id, ()):
+                heapq.heappush(self._ready, entry)
+            self._cond.notify()
+
+    def _retry_later(self, request, seq, retry_after):
+        """Pause the chat as Telegram asked and queue the call again"""
+        logger.warning(f"Rate limited on chat {request.chat_id}, retrying in {retry_after}s")
+        with self._cond:
+            # The chat stays busy, so later calls to it keep waiting behind this one
+            now = time.monotonic()
+            not_before = now + retry_after
+            self._chat_bucket(request.chat_id, now).block(not_before)
+            heapq.heappush(self._deferred, (not_before, request.priority, seq, request))
+            self._cond.notify()
+
+_outbound = None
+_outbound_lock = threading.Lock()
+
+def get_outbound(bot):
+    """Get the shared outbound dispatcher for the bot, starting it on first use"""
+    global _outbound
+    if _outbound is None:
+        from config import OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST, OUTBOUND_WORKERS
+        with _outbound_lock:
+            if _outbound is None:
+                outbound = OutboundDispatcher(
+                    bot,
+                    global_rate=OUTBOUND_GLOBAL_RATE,
+                    chat_rate=OUTBOUND_CHAT_RATE,
+                    chat_burst=OUTBOUND_CHAT_BURST,
+                    workers=OUTBOUND_WORKERS
+                )
+                outbound.start()
+                _outbound = outbound
+    return _outbound
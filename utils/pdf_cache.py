@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cache of parsed PDF imports
+
+Admins forward the same question bank to several chats and retry after a
+failed step, and every upload used to be downloaded and parsed again.
+Parsed questions are cached by the SHA-256 of the file, and Telegram's
+file_unique_id of each upload is remembered as an alias of that hash, so
+a known file_unique_id skips the download as well as the parse, and a
+known file under a new file_unique_id only costs the download.
+
+There are two least-recently-used tiers, both bounded by size (the JSON
+encoding of the questions): a small one in memory, and a larger one on
+disk, one JSON file per hash plus index.json holding the hashes in LRU
+order with their file_unique_ids. Without a directory only the memory
+tier is used. CACHE_FORMAT is bumped whenever the parser's output
+changes, which drops entries written by an older parser; entries are
+also dropped when the extraction mode (plain or layout-aware) changes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT = 2
+INDEX_FILE = "index.json"
+HASH_CHUNK_BYTES = 1024 * 1024
+
+def content_digest(source):
+    """
+    SHA-256 of a PDF
+
+    Args:
+        source (bytes or str): The file contents, or a file path
+
+    Returns:
+        str: Hex digest
+    """
+    if not isinstance(source, str):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class PDFQuestionCache:
+    """Two-tier LRU cache of parsed PDF questions"""
+
+    def __init__(self, directory="", max_bytes=64 * 1024 * 1024, memory_bytes=16 * 1024 * 1024, mode="text"):
+        """
+        Initialize the cache, loading the index of the disk tier
+
+        Args:
+            directory (str): Directory of the disk tier; empty for memory only
+            max_bytes (int): Size limit of the disk tier
+            memory_bytes (int): Size limit of the memory tier
+            mode (str): Extraction mode the entries are parsed with
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.mode = mode
+
+        self._lock = threading.Lock()
+        # digest -> (entry, size), least recently used first
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        # digest -> size of the entry file, least recently used first
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        # file_unique_id -> digest
+        self._file_ids = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    def _entry_path(self, digest):
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding='utf-8') as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable PDF cache index: {e}")
+            return
+        if index.get('format') != CACHE_FORMAT or index.get('mode') != self.mode:
+            logger.info("PDF cache was written by another parser version or mode, discarding it")
+            for digest, _, _ in index.get('entries', []):
+                self._remove_file(digest)
+            self._save_index()
+            return
+
+        for digest, size, file_ids in index['entries']:
+            if not os.path.exists(self._entry_path(digest)):
+                continue
+            self._disk[digest] = size
+            self._disk_size += size
+            for file_id in file_ids:
+                self._file_ids[file_id] = digest
+        logger.info(f"PDF cache has {len(self._disk)} entries ({self._disk_size / 2**20:.1f} MB)")
+
+    def _save_index(self):
+        """Write the index atomically; call with the lock held"""
+        aliases = {}
+        for file_id, digest in self._file_ids.items():
+            aliases.setdefault(digest, []).append(file_id)
+        index = {
+            'format': CACHE_FORMAT,
+            'mode': self.mode,
+            'entries': [[digest, size, aliases.get(digest, [])] for digest, size in self._disk.items()]
+        }
+        path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.error(f"Could not write the PDF cache index: {e}")
+
+    def _remove_file(self, digest):
+        try:
+            os.unlink(self._entry_path(digest))
+        except OSError:
+            pass
+
+    def _remember(self, digest, entry, size):
+        """Put an entry in the memory tier; call with the lock held"""
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        if size > self.memory_bytes:
+            return
+        self._memory[digest] = (entry, size)
+        self._memory_size += size
+        while self._memory_size > self.memory_bytes:
+            _, (_, old_size) = self._memory.popitem(last=False)
+            self._memory_size -= old_size
+            self.memory_evictions += 1
+
+    def _get(self, digest, count_miss=True):
+        """Look up a digest in both tiers; call with the lock held"""
+        cached = self._memory.get(digest)
+        if cached is not None:
+            self._memory.move_to_end(digest)
+            if digest in self._disk:
+                self._disk.move_to_end(digest)
+            self.memory_hits += 1
+            return cached[0]
+
+        if digest in self._disk:
+            try:
+                with open(self._entry_path(digest), encoding='utf-8') as f:
+                    encoded = f.read()
+                entry = json.loads(encoded)
+            except (OSError, ValueError) as e:
+                logger.error(f"Dropping unreadable PDF cache entry {digest}: {e}")
+                self._drop_disk(digest)
+            else:
+                self._disk.move_to_end(digest)
+                # Sized in UTF-8 bytes when written, like the memory tier
+                self._remember(digest, entry, self._disk[digest])
+                self.disk_hits += 1
+                return entry
+
+        if count_miss:
+            self.misses += 1
+        return None
+
+    def _drop_disk(self, digest):
+        """Remove an entry from the disk tier and its aliases; call with the lock held"""
+        self._disk_size -= self._disk.pop(digest)
+        self._remove_file(digest)
+        for file_id in [file_id for file_id, target in self._file_ids.items() if target == digest]:
+            del self._file_ids[file_id]
+
+    def get_by_file_id(self, file_unique_id):
+        """
+        Look up an upload by its Telegram file_unique_id, before downloading it
+
+        Misses aren't counted here; an upload that isn't found goes on to
+        get_by_digest(), which counts them.
+
+        Returns:
+            dict: The cached entry ('questions' and 'pages'), or None
+        """
+        with self._lock:
+            digest = self._file_ids.get(file_unique_id)
+            if digest is None:
+                return None
+            return self._get(digest, count_miss=False)
+
+    def get_by_digest(self, digest, file_unique_id=None):
+        """
+        Look up a downloaded file by its content
+
+        Args:
+            digest (str): content_digest() of the file
+            file_unique_id (str, optional): Remembered as an alias on a hit
+
+        Returns:
+            dict: The cached entry ('questions' and 'pages'), or None
+        """
+        with self._lock:
+            entry = self._get(digest)
+            if entry is not None and file_unique_id and self._file_ids.get(file_unique_id) != digest:
+                self._file_ids[file_unique_id] = digest
+                if digest in self._disk:
+                    self._save_index()
+            return entry
+
+    def put(self, digest, file_unique_id, questions, pages):
+        """
+        Cache the questions parsed from a file
+
+        Args:
+            digest (str): content_digest() of the file
+            file_unique_id (str): Telegram's ID of the upload
+            questions (list): Question dicts
+            pages (int): Pages in the file
+        """
+        entry = {'questions': questions, 'pages': pages}
+        encoded = json.dumps(entry, ensure_ascii=False)
+        size = len(encoded.encode('utf-8'))
+
+        with self._lock:
+            self._file_ids[file_unique_id] = digest
+            self._remember(digest, entry, size)
+            if not self.directory:
+                # Aliases of entries no longer in memory are useless
+                live = set(self._memory)
+                for file_id in [file_id for file_id, target in self._file_ids.items() if target not in live]:
+                    del self._file_ids[file_id]
+                return
+            if size > self.max_bytes:
+                return
+
+            if digest not in self._disk:
+                path = self._entry_path(digest)
+                try:
+                    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                        f.write(encoded)
+                    os.replace(path + ".tmp", path)
+                except OSError as e:
+                    logger.error(f"Could not write PDF cache entry {digest}: {e}")
+                    return
+                self._disk[digest] = size
+                self._disk_size += size
+            self._disk.move_to_end(digest)
+
+            while self._disk_size > self.max_bytes:
+                old_digest = next(iter(self._disk))
+                self._drop_disk(old_digest)
+                if old_digest in self._memory:
+                    self._memory_size -= self._memory.pop(old_digest)[1]
+                self.disk_evictions += 1
+            self._save_index()
+
+    def stats(self):
+        """
+        Returns:
+            dict: memory_hits, disk_hits, misses, memory_evictions,
+                  disk_evictions, memory_entries, memory_bytes, disk_entries,
+                  disk_bytes
+        """
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_evictions': self.memory_evictions,
+                'disk_evictions': self.disk_evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_size
+            }
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_pdf_cache():
+    """Get the shared PDF import cache"""
+    global _cache
+    if _cache is None:
+        from config import PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES, PDF_CACHE_MEMORY_BYTES, PDF_LAYOUT_EXTRACTION
+        with _cache_lock:
+            if _cache is None:
+                _cache = PDFQuestionCache(
+                    directory=PDF_CACHE_DIR,
+                    max_bytes=PDF_CACHE_MAX_BYTES,
+                    memory_bytes=PDF_CACHE_MEMORY_BYTES,
+                    mode="layout" if PDF_LAYOUT_EXTRACTION else "text"
+                )
+    return _cache
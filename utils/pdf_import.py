@@ -0,0 +1,744 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Streaming import of quiz questions from PDF files
+
+The import is a chain of three generator stages:
+
+    iter_pages(source) -> tokenize(pages) -> iter_questions(tokens)
+
+Pages are extracted one at a time and each page's lines are classified
+and fed to a small state machine before the next page is read, so a
+500-page question bank is never held in memory as one string; only the
+current page and the question being assembled are.
+
+Recognized layouts (all the ones the admin PDF import has accepted):
+
+    1. Question text            Q1. Question text         Question: text
+    A) Option / (A) Option / a. Option   -- or 1. 2. 3. 4. after a question
+    Correct: B / Answer: B / Ans: 2      -- or a ✓ / √ / ✔ / (*) on the option
+
+Option letters past D count only when they continue the options above
+them, so statements numbered "I.", "II." ... stay part of the question.
+
+With layout=True, pages are read through utils.pdf_layout instead of
+plain text extraction, which also handles two-column pages, option grids
+and answers shown in bold or in color.
+
+Questions are returned in the format stored in context.user_data
+['pdf_questions']: dicts with 'question', 'options' and 'correct_answer'
+(1-based, defaulting to the first option).
+"""
+
+import contextlib
+import io
+import itertools
+import logging
+import mmap
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Token kinds produced by tokenize()
+TOKEN_QUESTION = 'question'
+TOKEN_OPTION = 'option'
+TOKEN_ANSWER = 'answer'
+TOKEN_TEXT = 'text'
+
+# Every line is classified by one match of LINE_RE: an answer key, an
+# option or a question, tried in that order, or continuation text when
+# none match, told apart by which branch's last group is set. An answer
+# letter needs a separator or parentheses, so a stem like "Answer a
+# question about..." stays text; a number may follow a space. Each branch
+# runs to the last non-space character of the line, so with MULTILINE the
+# lines of a whole page are classified by one finditer() over it. Lines
+# only hold ' ' as whitespace by then (see _page_matches()).
+LINE_RE = re.compile(
+    r'^ *(?:'
+    r'(?P<answer_line>(?:Correct(?: +answer)?|Answer|Ans|उत्तर) *(?:[:.-] *\(?|\(|(?=\d))'
+    r'(?P<answer>[A-Ja-j]|\d{1,2})\)?(?!\w)(?:.*\S)?)'
+    r'|\(?(?P<option_key>[A-Ja-j]) *[.)] *(?P<option>\S(?:.*\S)?)'
+    r'|(?:(?:Q(?:uestion)?|प्रश्न) *\.? *(?P<number>\d{1,4})? *[.):-]|(?P<bare_number>\d{1,4}) *[.)])'
+    r' *(?P<question>\S(?:.*\S)?)'
+    r'|(?P<text>\S(?:.*\S)?)'
+    r') *$',
+    re.IGNORECASE | re.MULTILINE
+)
+INLINE_OPTION_RE = re.compile(r'\(([A-J])\)\s*')
+# Check marks anywhere, or a "(*)" / "(correct)" suffix (possibly before a mark).
+# Scanning for non-ASCII characters is slow in re, so tokenize() only
+# applies it to lines ending in ")" or containing one of CHECK_MARKS.
+MARK_RE = re.compile(r'[✓✔√]|\((?:\*|correct)\)[\s✓✔√]*$', re.IGNORECASE)
+CHECK_MARKS = ('✓', '✔', '√')
+CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]+')
+WHITESPACE_RE = re.compile(r'\s+')
+SPACES_RE = re.compile(r' {2,}')
+
+# Lines with fewer printable characters than this are extraction junk
+MIN_PRINTABLE_RATIO = 0.7
+
+class Token:
+    """
+    One classified line of a page
+
+    kind is one of the TOKEN_* constants; key is the question number, the
+    option letter or the answer mark; marked is set on options carrying a
+    check mark.
+    """
+
+    __slots__ = ('kind', 'key', 'text', 'marked')
+
+    def __init__(self, kind, key, text, marked=False):
+        self.kind = kind
+        self.key = key
+        self.text = text
+        self.marked = marked
+
+    def __repr__(self):
+        return f"Token({self.kind!r}, {self.key!r}, {self.text!r}, marked={self.marked})"
+
+class ImportStats:
+    """
+    Counters and per-stage timings of one import
+
+    Time spent pulling from a stage includes the stages before it; the
+    *_seconds properties subtract those, so each is the stage's own cost.
+    For an import split across processes the stages' times are summed over
+    the workers, so they measure CPU time rather than elapsed time.
+    """
+
+    __slots__ = ('pages', 'lines', 'questions', '_extract', '_tokenize', '_total')
+
+    def __init__(self):
+        self.pages = 0
+        self.lines = 0
+        self.questions = 0
+        self._extract = 0.0
+        self._tokenize = 0.0
+        self._total = 0.0
+
+    @property
+    def extract_seconds(self):
+        return self._extract
+
+    @property
+    def tokenize_seconds(self):
+        return self._tokenize - self._extract
+
+    @property
+    def parse_seconds(self):
+        return self._total - self._tokenize
+
+    @property
+    def total_seconds(self):
+        return self._total
+
+    def merge(self, other):
+        """Add the counts and timings of another part of the same import"""
+        self.pages += other.pages
+        self.lines += other.lines
+        self.questions += other.questions
+        self._extract += other._extract
+        self._tokenize += other._tokenize
+        self._total += other._total
+
+    def summary(self):
+        """One-line description for the log"""
+        return (
+            f"{self.questions} questions from {self.pages} PDF pages ({self.lines} lines) "
+            f"in {self.total_seconds:.2f}s: extract {self.extract_seconds:.2f}s, "
+            f"tokenize {self.tokenize_seconds:.2f}s, parse {self.parse_seconds:.2f}s"
+        )
+
+class ParseTrace:
+    """
+    Counters and the first few samples of how an import read its lines
+
+    Off unless one is passed in: the tokenizer never sees it, and the
+    token stream is only wrapped for counting when tracing. Categories:
+
+        question, option, answer, text -- lines by kind
+        marked -- lines carrying a check mark
+        numbered option -- "1." to "10." lines read as options
+        ignored -- lines before the first question
+        dropped -- questions with fewer than two options
+        no answer -- questions without an answer key or mark (first option used)
+        bad answer -- answer keys beyond the options (first option used)
+    """
+
+    __slots__ = ('samples_per_category', 'counts', 'samples')
+
+    # Display order of the categories
+    CATEGORIES = (
+        TOKEN_QUESTION, TOKEN_OPTION, TOKEN_ANSWER, TOKEN_TEXT, 'marked', 'numbered option',
+        'ignored', 'dropped', 'no answer', 'bad answer'
+    )
+    # Samples are cut to this many characters
+    SAMPLE_CHARS = 80
+
+    def __init__(self, samples_per_category=3):
+        self.samples_per_category = samples_per_category
+        self.counts = {}
+        self.samples = {}
+
+    def record(self, category, sample):
+        """Count an event, keeping its text if the category has room for it"""
+        count = self.counts.get(category, 0)
+        self.counts[category] = count + 1
+        if count < self.samples_per_category:
+            if len(sample) > self.SAMPLE_CHARS:
+                sample = sample[:self.SAMPLE_CHARS - 1] + "…"
+            self.samples.setdefault(category, []).append(sample)
+
+    def tokens(self, tokens):
+        """Pass a token stream through, recording each token"""
+        record = self.record
+        for token in tokens:
+            # Only a line holding nothing but a check mark is empty
+            text = token.text or CHECK_MARKS[0]
+            record(token.kind, text)
+            if token.marked:
+                record('marked', text)
+            yield token
+
+    def categories(self):
+        """
+        Returns:
+            list: (category, count, samples) tuples of the recorded categories
+        """
+        return [
+            (category, self.counts[category], self.samples.get(category, []))
+            for category in self.CATEGORIES if category in self.counts
+        ]
+
+    def summary(self):
+        """One-line description of the counts for the log"""
+        return ", ".join(f"{category} {count}" for category, count, _ in self.categories()) or "no lines"
+
+def _timed(iterable, stats, attribute):
+    """Yield from iterable, adding the time spent waiting for items to stats.attribute"""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            setattr(stats, attribute, getattr(stats, attribute) + time.perf_counter() - started)
+            return
+        setattr(stats, attribute, getattr(stats, attribute) + time.perf_counter() - started)
+        yield item
+
+@contextlib.contextmanager
+def open_pdf(source):
+    """
+    Open a PDF with PyMuPDF when it is installed, else with PyPDF2
+
+    Both read the caller's buffer in place: PyMuPDF keeps a reference to
+    the bytes object and PyPDF2 reads it through a BytesIO, which shares
+    an unmodified bytes buffer. A file is opened by path in PyMuPDF and
+    memory-mapped for PyPDF2, which would otherwise read all of it. A
+    document PyMuPDF refuses to open is retried with PyPDF2 from the same
+    buffer.
+
+    Args:
+        source (bytes or str): The PDF file contents, or a file path
+
+    Yields:
+        tuple: (PyMuPDF document, None) or (None, PyPDF2 reader)
+
+    Raises:
+        ImportError: If neither PyMuPDF nor PyPDF2 is installed
+    """
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+    error = None
+    if fitz is not None:
+        try:
+            if isinstance(source, str):
+                doc = fitz.open(source, filetype="pdf")
+            else:
+                doc = fitz.open(stream=source, filetype="pdf")
+        except RuntimeError as e:
+            # fitz.FileDataError for damaged files is one
+            logger.warning(f"PyMuPDF could not open the PDF, trying PyPDF2: {e}")
+            error = e
+        else:
+            try:
+                yield doc, None
+            finally:
+                doc.close()
+            return
+
+    with _open_pypdf(source, error) as reader:
+        yield None, reader
+
+@contextlib.contextmanager
+def _open_pypdf(source, error=None):
+    """
+    Open a PDF with PyPDF2, sharing the caller's buffer (see open_pdf())
+
+    Args:
+        error (Exception, optional): What PyMuPDF failed with, raised
+                                     instead if PyPDF2 is not installed
+    """
+    try:
+        import PyPDF2
+    except ImportError:
+        if error is not None:
+            raise error
+        raise
+    if isinstance(source, str):
+        with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield PyPDF2.PdfReader(mapped)
+    else:
+        yield PyPDF2.PdfReader(io.BytesIO(source))
+
+def page_count(source):
+    """
+    Number of pages of a PDF, without extracting any text
+
+    Args:
+        source (bytes or str): The PDF file contents, or a file path
+
+    Raises:
+        ImportError: If neither PyMuPDF nor PyPDF2 is installed
+    """
+    with open_pdf(source) as (doc, reader):
+        return len(reader.pages) if doc is None else doc.page_count
+
+def iter_pages(source, start=0, stop=None, layout=False):
+    """
+    Extract the text of a PDF one page at a time
+
+    Args:
+        source (bytes or str): The PDF file contents, or a file path
+        start (int): First page, 0-based
+        stop (int, optional): Page to stop before; defaults to the end
+        layout (bool): Rebuild the reading order from span positions and
+                       mark highlighted options (see utils.pdf_layout);
+                       needs PyMuPDF and is ignored with PyPDF2
+
+    Pages PyMuPDF fails to extract are read with PyPDF2, from the first
+    failing one on.
+
+    Yields:
+        str: Text of each page
+
+    Raises:
+        ImportError: If neither PyMuPDF nor PyPDF2 is installed
+    """
+    with open_pdf(source) as (doc, reader):
+        if doc is None:
+            for page in reader.pages[start:stop]:
+                yield page.extract_text() or ""
+            return
+
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        if layout:
+            from utils.pdf_layout import page_text
+        else:
+            page_text = None
+        for number in range(start, stop):
+            try:
+                page = doc.load_page(number)
+                text = page.get_text("text") if page_text is None else page_text(page)
+            except RuntimeError as e:
+                error = e
+                break
+            yield text
+        else:
+            return
+
+    # PyMuPDF failed on a page: read it and the rest with PyPDF2
+    logger.warning(f"PyMuPDF could not read page {number + 1}, trying PyPDF2: {error}")
+    with _open_pypdf(source, error) as reader:
+        for page in reader.pages[number:stop]:
+            yield page.extract_text() or ""
+
+def clean_line(line):
+    """
+    Normalize one extracted line
+
+    Returns:
+        str: The line with control characters and repeated whitespace
+             collapsed, or '' for empty lines and extraction junk
+    """
+    line = line.strip()
+    if not line:
+        return ''
+    if line.isprintable():
+        return SPACES_RE.sub(' ', line) if '  ' in line else line
+    printable = sum(1 for c in line if c.isprintable())
+    if printable / len(line) < MIN_PRINTABLE_RATIO:
+        return ''
+    return WHITESPACE_RE.sub(' ', CONTROL_CHARS_RE.sub(' ', line)).strip()
+
+def _page_matches(page):
+    """
+    LINE_RE matches of the non-empty lines of a page, in order
+
+    Pages holding nothing unprintable but newlines, nearly all of them,
+    are classified in one scan; the others line by line after clean_line().
+    """
+    if page.replace('\n', '').isprintable():
+        # ' ' is then the only other whitespace
+        if '  ' in page:
+            page = SPACES_RE.sub(' ', page)
+        return LINE_RE.finditer(page)
+    match_line = LINE_RE.match
+    return (match_line(line) for line in map(clean_line, page.splitlines()) if line)
+
+def _strip_marks(text):
+    """Remove check marks and correct-answer suffixes; returns (text, marked)"""
+    text = text.strip()
+    if text and (text[-1] == ')' or any(mark in text for mark in CHECK_MARKS)):
+        stripped, count = MARK_RE.subn('', text)
+        if count:
+            return stripped.strip(), True
+    return text, False
+
+def _inline_options(line):
+    """Tokens of a line holding several "(A) ... (B) ..." options, or None"""
+    # ['', 'A', 'first text ', 'B', 'second text', ...] when the line starts with a marker
+    parts = INLINE_OPTION_RE.split(line)
+    if len(parts) < 5 or parts[0]:
+        return None
+    tokens = []
+    for key, text in zip(parts[1::2], parts[2::2]):
+        text, marked = _strip_marks(text)
+        tokens.append(Token(TOKEN_OPTION, key, text, marked))
+    return tokens
+
+def tokenize(pages, stats=None):
+    """
+    Split pages into cleaned lines and classify them
+
+    Each line costs its share of one LINE_RE scan of the page, plus a
+    MARK_RE substitution for the few option and text lines that may carry
+    a mark; this loop is the hot path of large imports, so it is kept
+    inline rather than split into per-line helper calls.
+
+    Args:
+        pages (iterable): Page texts
+        stats (ImportStats, optional): Receives page and line counts
+
+    Yields:
+        Token: Classified lines, in document order
+    """
+    strip_marks = MARK_RE.subn
+    check, heavy_check, root = CHECK_MARKS
+    # Letter of the last option since the last question
+    last_key = None
+    for page in pages:
+        if stats is not None:
+            stats.pages += 1
+        for match in _page_matches(page):
+            if stats is not None:
+                stats.lines += 1
+            answer_line, answer, option_key, option, number, bare_number, question, text = match.groups()
+            if text is not None:
+                token_kind, key = TOKEN_TEXT, None
+            elif option is not None:
+                if '(' in option:
+                    tokens = _inline_options(match.group(0).strip())
+                    if tokens:
+                        last_key = tokens[-1].key
+                        yield from tokens
+                        continue
+                key = option_key.upper()
+                if key > 'D' and (last_key is None or ord(key) - ord(last_key) != 1):
+                    # Letters past D only continue a run of options; otherwise
+                    # they are Roman numerals of statements ("I. ...") or initials
+                    token_kind, key, text = TOKEN_TEXT, None, match.group(0).strip()
+                else:
+                    token_kind, text = TOKEN_OPTION, option
+                    last_key = key
+            elif question is not None:
+                last_key = None
+                number = number or bare_number
+                yield Token(TOKEN_QUESTION, int(number) if number else None, question)
+                continue
+            else:
+                yield Token(TOKEN_ANSWER, answer.upper(), answer_line)
+                continue
+
+            if text[-1] == ')' or check in text or heavy_check in text or root in text:
+                stripped, marked = strip_marks('', text)
+                if marked:
+                    yield Token(token_kind, key, stripped.strip(), True)
+                    continue
+            yield Token(token_kind, key, text)
+
+class QuestionParser:
+    """
+    State machine assembling questions from tokens
+
+    States: no question yet, reading the question text (continuation lines
+    are appended to it), reading options (continuation lines are appended
+    to the last option). A question is complete when the next one starts
+    or the input ends; questions with fewer than two options are dropped.
+    """
+
+    IDLE = 0
+    STEM = 1
+    OPTIONS = 2
+
+    def __init__(self, trace=None):
+        """
+        Args:
+            trace (ParseTrace, optional): Records numbered options, ignored
+                                          lines and incomplete questions
+        """
+        self.trace = trace
+        self.state = self.IDLE
+        self._number = None
+        self._text = None
+        self._options = []
+        self._correct = None
+
+    def feed(self, token):
+        """
+        Process one token
+
+        Returns:
+            dict: The previous question if this token completed it, else None
+        """
+        kind = token.kind
+
+        if kind == TOKEN_QUESTION:
+            # "1." to "4." right after a question stem are numbered options,
+            # unless the number continues the question numbering
+            if (self.state != self.IDLE and token.key == len(self._options) + 1 and token.key <= 10
+                    and (self._number is None or token.key != self._number + 1)):
+                if self.trace is not None:
+                    self.trace.record('numbered option', token.text)
+                self._add_option(token.text, False)
+                return None
+            finished = self._finish()
+            self._number = token.key
+            self._text = token.text
+            self.state = self.STEM
+            return finished
+
+        if self.state == self.IDLE:
+            if self.trace is not None:
+                self.trace.record('ignored', token.text)
+            return None
+
+        if kind == TOKEN_OPTION:
+            self._add_option(token.text, token.marked)
+        elif kind == TOKEN_ANSWER:
+            key = token.key
+            if key.isdigit():
+                self._correct = int(key)
+            else:
+                self._correct = ord(key) - ord('A') + 1
+        elif self.state == self.OPTIONS:
+            # A check mark on its own line marks the option above it
+            if token.marked:
+                self._correct = len(self._options)
+            if token.text:
+                self._options[-1] = f"{self._options[-1]} {token.text}"
+        elif token.text:
+            self._text = f"{self._text} {token.text}"
+        return None
+
+    def _add_option(self, text, marked):
+        self._options.append(text)
+        if marked:
+            self._correct = len(self._options)
+        self.state = self.OPTIONS
+
+    def _finish(self):
+        """Return the question being assembled, if complete, and reset"""
+        question = None
+        if self._text and len(self._options) >= 2:
+            correct = self._correct
+            if correct is None or not 1 <= correct <= len(self._options):
+                if self.trace is not None:
+                    self.trace.record('no answer' if correct is None else 'bad answer', self._text)
+                correct = 1
+            question = {
+                'question': self._text,
+                'options': self._options,
+                'correct_answer': correct
+            }
+        elif self._text and self.trace is not None:
+            self.trace.record('dropped', self._text)
+        self.state = self.IDLE
+        self._number = None
+        self._text = None
+        self._options = []
+        self._correct = None
+        return question
+
+    def finish(self):
+        """
+        Signal the end of input
+
+        Returns:
+            dict: The last question, or None
+        """
+        return self._finish()
+
+def iter_questions(tokens, stats=None, trace=None):
+    """
+    Assemble questions from a token stream
+
+    Args:
+        tokens (iterable): Token objects
+        stats (ImportStats, optional): Receives the question count
+        trace (ParseTrace, optional): Records the tokens and parser events
+
+    Yields:
+        dict: Questions with 'question', 'options' and 'correct_answer'
+    """
+    if trace is not None:
+        tokens = trace.tokens(tokens)
+    parser = QuestionParser(trace)
+    for token in tokens:
+        question = parser.feed(token)
+        if question is not None:
+            if stats is not None:
+                stats.questions += 1
+            yield question
+    question = parser.finish()
+    if question is not None:
+        if stats is not None:
+            stats.questions += 1
+        yield question
+
+def _until_set(pages, event):
+    """Yield pages until the event is set"""
+    for page in pages:
+        if event.is_set():
+            return
+        yield page
+
+def _reporting(pages, stats, progress):
+    """Yield pages, calling progress(stats) once each page has been read through"""
+    for page in pages:
+        yield page
+        progress(stats)
+
+def _counting_questions(tokens, stats):
+    """Pass tokens through, counting the questions they complete into stats"""
+    parser = QuestionParser()
+    for token in tokens:
+        if parser.feed(token) is not None:
+            stats.questions += 1
+        yield token
+
+def _pdf_tokens(source, stats, cancel_event, start=0, stop=None, layout=False, progress=None):
+    """Token stream of a page range, timed into stats when given"""
+    pages = iter_pages(source, start, stop, layout)
+    if cancel_event is not None:
+        pages = _until_set(pages, cancel_event)
+    if stats is None:
+        return tokenize(pages)
+    pages = _timed(pages, stats, '_extract')
+    if progress is not None:
+        pages = _reporting(pages, stats, progress)
+    return _timed(tokenize(pages, stats), stats, '_tokenize')
+
+def iter_pdf_questions(source, stats=None, cancel_event=None, layout=False, trace=None, progress=None):
+    """
+    Stream the questions of a PDF
+
+    Args:
+        source (bytes or str): The PDF file contents, or a file path
+        stats (ImportStats, optional): Receives counts and stage timings
+        cancel_event (Event, optional): Stops extraction before the next
+                                        page once it is set
+        layout (bool): Use layout-aware extraction (see iter_pages())
+        trace (ParseTrace, optional): Records how lines and questions are read
+        progress (callable, optional): Called with stats each time a page
+                                       has been read through; needs stats
+
+    Yields:
+        dict: Questions in document order
+    """
+    tokens = _pdf_tokens(source, stats, cancel_event, layout=layout, progress=progress)
+    if stats is None:
+        yield from iter_questions(tokens, trace=trace)
+        return
+    yield from _timed(iter_questions(tokens, stats, trace), stats, '_total')
+
+def tokenize_page_range(source, start, stop, stats=None, cancel_event=None, layout=False, progress=None):
+    """
+    Extract and classify the lines of some pages, for parallel imports
+
+    Several workers can each take a range of the same document; feeding
+    their token lists to iter_token_ranges() in page order gives the same
+    questions as a serial import, including those crossing a range boundary.
+
+    Args:
+        source (bytes or str): The PDF file contents, or a file path
+        start (int): First page, 0-based
+        stop (int): Page to stop before
+        stats (ImportStats, optional): Receives counts and stage timings
+        cancel_event (Event, optional): Stops extraction before the next
+                                        page once it is set
+        layout (bool): Use layout-aware extraction (see iter_pages())
+        progress (callable, optional): Called with stats each time a page
+                                       has been read through; needs stats,
+                                       whose question count is then an
+                                       estimate for the range alone
+
+    Returns:
+        list: (kind, key, text, marked) tuples of the range's tokens, which
+              cross process boundaries several times faster than Tokens
+    """
+    tokens = _pdf_tokens(source, stats, cancel_event, start, stop, layout, progress)
+    if progress is not None:
+        tokens = _counting_questions(tokens, stats)
+    return [(token.kind, token.key, token.text, token.marked) for token in tokens]
+
+def iter_token_ranges(token_lists, stats=None, trace=None):
+    """
+    Assemble questions from the token lists of consecutive page ranges
+
+    Args:
+        token_lists (iterable): Lists from tokenize_page_range(), in page order
+        stats (ImportStats, optional): The ranges' stats merged together;
+                                       receives the question count and
+                                       parse time
+        trace (ParseTrace, optional): Records how lines and questions are read
+
+    Yields:
+        dict: Questions in document order
+    """
+    tokens = (Token(*fields) for fields in itertools.chain.from_iterable(token_lists))
+    if stats is None:
+        yield from iter_questions(tokens, trace=trace)
+        return
+    # Extraction and tokenizing happened elsewhere; time only the parsing, and
+    # count the questions again across the ranges (see tokenize_page_range())
+    stats._total = stats._tokenize
+    stats.questions = 0
+    yield from _timed(iter_questions(tokens, stats, trace), stats, '_total')
+
+def parse_pdf_questions(source, stats=None, layout=False, trace=None):
+    """
+    Extract all questions of a PDF
+
+    Args:
+        source (bytes or str): The PDF file contents, or a file path
+        stats (ImportStats, optional): Receives counts and stage timings
+        layout (bool): Use layout-aware extraction (see iter_pages())
+        trace (ParseTrace, optional): Records how lines and questions are read
+
+    Returns:
+        list: Question dicts
+    """
+    questions = list(iter_pdf_questions(source, stats, layout=layout, trace=trace))
+    if stats is not None:
+        logger.info(f"Imported {stats.summary()}")
+    if trace is not None:
+        logger.info(f"Parse trace: {trace.summary()}")
+    return questions
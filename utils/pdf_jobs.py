@@ -0,0 +1,681 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Process pool running PDF question imports off the dispatcher threads
+
+Extracting a large PDF keeps a CPU busy for seconds, and doing it in a
+handler held a dispatcher worker (and the GIL) for all of that time while
+quiz takers waited for their answers to register. Imports are submitted
+here instead and run in separate processes; the handler returns at once
+and a callback delivers the questions when the job is done.
+
+The pool is started with the bot and prewarmed: every worker process is
+spawned and imports PyMuPDF/PyPDF2 up front, so no upload pays for that.
+Jobs beyond the pool size wait in the executor's queue, which is bounded
+by max_jobs, and each admin may only run a few imports at once. A job is
+cancelled before it starts by cancelling its future, and while running
+through a manager Event that the worker checks before every page.
+
+Nothing of the document is read on the submitting thread: counting its
+pages means opening it, which takes a while for large files, so that is
+the job's first task in a worker, and the extraction is queued from its
+done callback. /diagnose_pdf_import runs as a job as well, with a parse
+trace.
+
+Documents of parallel_pages pages or more are split into one page range
+per worker. Each worker opens its own copy of the document and returns
+the classified lines of its range; the question state machine then runs
+over the ranges in page order, so a question whose options continue on
+the next range is stitched together just as in a serial import. Large
+uploads are submitted as a file path instead of bytes, so the document
+is not pickled to every worker; each one opens the file itself.
+
+Jobs submitted with an on_progress callback report the pages read and
+questions found so far: each worker puts its counts on a manager queue at
+most every progress_interval seconds, and a relay thread hands them to
+the job's callback. Progress costs a running job one queue message per
+interval, and nothing when no callback was given.
+
+A worker that dies (PyMuPDF crashing on a malformed file, the OOM killer)
+breaks the whole executor: every job on it fails, and the pool replaces
+it with fresh processes, as it does a manager that went away, so later
+uploads are not refused.
+"""
+
+import functools
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.pdf_import import (
+    ImportStats, ParseTrace, iter_pages, iter_pdf_questions, iter_questions, iter_token_ranges,
+    page_count, tokenize, tokenize_page_range
+)
+
+logger = logging.getLogger(__name__)
+
+def _warm_up():
+    """Worker initializer: pay the PDF library import once per process"""
+    try:
+        import fitz
+    except ImportError:
+        try:
+            import PyPDF2
+        except ImportError:
+            pass
+
+def _ping():
+    """No-op task used to spawn every worker at startup"""
+    return True
+
+class _ProgressReporter:
+    """Worker side of progress reports: puts a part's counts on the pool's queue, throttled"""
+
+    __slots__ = ('queue', 'job_id', 'part', 'interval', '_last')
+
+    def __init__(self, queue, job_id, part, interval):
+        self.queue = queue
+        self.job_id = job_id
+        self.part = part
+        self.interval = interval
+        self._last = 0.0
+
+    def __call__(self, stats):
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.queue.put((self.job_id, self.part, stats.pages, stats.questions))
+
+def _run_import(source, cancel_event, layout, trace_samples, progress):
+    """
+    Job body for a whole document, run in a worker process
+
+    Args:
+        trace_samples (int): Samples per category of a ParseTrace, or None
+                             not to trace
+        progress (_ProgressReporter): Progress reports, or None
+
+    Returns:
+        tuple: (questions, ImportStats, cancelled, ParseTrace or None)
+    """
+    stats = ImportStats()
+    trace = ParseTrace(trace_samples) if trace_samples is not None else None
+    questions = list(iter_pdf_questions(source, stats, cancel_event, layout, trace, progress))
+    return questions, stats, cancel_event.is_set(), trace
+
+def _run_range(source, start, stop, cancel_event, layout, progress):
+    """
+    Job body for one page range of a large document, run in a worker process
+
+    Returns:
+        tuple: (tokens, ImportStats)
+    """
+    stats = ImportStats()
+    tokens = tokenize_page_range(source, start, stop, stats, cancel_event, layout, progress)
+    return tokens, stats
+
+def _run_diagnostics(source, cancel_event, layout, trace_samples, sample_chars):
+    """
+    Job body of /diagnose_pdf_import, run in a worker process
+
+    Returns:
+        tuple: (questions, ImportStats, cancelled, ParseTrace, the first
+               page's text, cut to sample_chars, or None)
+    """
+    stats = ImportStats()
+    trace = ParseTrace(trace_samples)
+    first_page = None
+
+    def sampled(pages):
+        nonlocal first_page
+        for page in pages:
+            if cancel_event.is_set():
+                return
+            if first_page is None:
+                first_page = page if len(page) <= sample_chars else page[:sample_chars] + "..."
+            yield page
+
+    pages = sampled(iter_pages(source, layout=layout))
+    questions = list(iter_questions(tokenize(pages, stats), stats, trace))
+    return questions, stats, cancel_event.is_set(), trace, first_page
+
+def split_pages(pages, parts):
+    """
+    Split a page count into consecutive ranges of nearly equal size
+
+    Returns:
+        list: (start, stop) tuples, 0-based with stop exclusive
+    """
+    size, extra = divmod(pages, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        if stop > start:
+            ranges.append((start, stop))
+        start = stop
+    return ranges
+
+class PDFJob:
+    """One submitted import"""
+
+    __slots__ = (
+        'job_id', 'admin_id', 'future', 'executor', 'counting', 'parts', 'ranges', 'cancel_event',
+        'submitted_at', 'total_pages', 'on_progress', 'progress', 'error'
+    )
+
+    def __init__(self, job_id, admin_id, cancel_event, on_progress=None):
+        self.job_id = job_id
+        self.admin_id = admin_id
+        # Resolved by the pool once every part is done; never cancelled itself
+        self.future = Future()
+        self.future.set_running_or_notify_cancel()
+        # The executor its tasks were last submitted to
+        self.executor = None
+        # Executor future counting the document's pages, before the parts are queued
+        self.counting = None
+        # Executor futures: the whole document, or one per page range
+        self.parts = []
+        self.ranges = None
+        self.cancel_event = cancel_event
+        self.submitted_at = time.time()
+        # Pages in the document, once a worker counted them
+        self.total_pages = None
+        self.on_progress = on_progress
+        # Latest (pages, questions) reported by each part
+        self.progress = [(0, 0)]
+        # Why its parts could not be queued, raised as the job's outcome
+        self.error = None
+
+    def pages_read(self):
+        """Pages read so far, as last reported"""
+        return sum(pages for pages, _ in self.progress)
+
+    def questions_found(self):
+        """
+        Questions found so far, as last reported
+
+        For a split document each range counts its own questions, so those
+        crossing a range boundary aren't counted until the job is done.
+        """
+        return sum(questions for _, questions in self.progress)
+
+    def cancelled(self):
+        """Whether the job was cancelled before or while running"""
+        return self.cancel_event.is_set()
+
+    def result(self):
+        """
+        Outcome of a finished job
+
+        Returns:
+            tuple: (questions, ImportStats); questions are those found
+                   before cancellation if the job was cancelled
+
+        Raises:
+            Exception: Whatever the import raised in the worker
+        """
+        questions, stats, _, _ = self.future.result()
+        return questions, stats
+
+class PDFImportPool:
+    """Bounded process pool for PDF imports with per-admin limits"""
+
+    def __init__(self, workers=2, max_jobs=8, per_admin=1, parallel_pages=100, layout=False,
+                 trace_samples=None, progress_interval=3.0):
+        """
+        Initialize the pool; start() launches the processes
+
+        Args:
+            workers (int): Worker processes
+            max_jobs (int): Most jobs running or queued at once
+            per_admin (int): Most jobs running or queued for one admin
+            parallel_pages (int): Documents with at least this many pages
+                                  are split into one page range per worker
+            layout (bool): Use layout-aware extraction (see utils.pdf_layout)
+            trace_samples (int, optional): Trace every import with this many
+                                           samples per category and log the
+                                           counts; None turns tracing off
+            progress_interval (float): Seconds between progress reports
+                                       of a running job
+        """
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.per_admin = per_admin
+        self.parallel_pages = parallel_pages
+        self.layout = layout
+        self.trace_samples = trace_samples
+        self.progress_interval = progress_interval
+
+        self._executor = None
+        self._manager = None
+        self._progress_queue = None
+        self._relay = None
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        # Finished jobs are combined and handed to on_done here rather than
+        # on the process pool's management thread, which also collects the
+        # results of every other job; its thread starts with the first job
+        self._completions = ThreadPoolExecutor(1, thread_name_prefix="pdf-done")
+
+        self.completed_count = 0
+        self.cancelled_count = 0
+        self.failed_count = 0
+
+    def start(self):
+        """Spawn the worker processes and load the PDF libraries in them"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._start_manager()
+            self._start_executor()
+        logger.info(f"PDF import pool started with {self.workers} workers")
+
+    def _start_executor(self):
+        """Create the worker processes; call with the lock held"""
+        # Threads are already running, so don't fork
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_up
+        )
+        # Processes are spawned on demand, one per queued task
+        for _ in range(self.workers):
+            self._executor.submit(_ping)
+
+    def _start_manager(self):
+        """Create the manager process and the progress relay; call with the lock held"""
+        self._manager = multiprocessing.get_context("spawn").Manager()
+        self._progress_queue = self._manager.Queue()
+        self._relay = threading.Thread(
+            target=self._relay_progress, args=(self._progress_queue,), name="pdf-progress", daemon=True
+        )
+        self._relay.start()
+
+    def _replace_executor(self, broken):
+        """
+        Swap a broken executor for new worker processes; call with the lock held
+
+        Every job that saw the executor break calls this; only the first
+        replaces it.
+
+        Returns:
+            ProcessPoolExecutor: The broken executor, to shut down once the
+                                 lock is released, or None
+        """
+        if broken is None or self._executor is not broken:
+            return None
+        logger.warning("A PDF import worker died; restarting the worker processes")
+        self._start_executor()
+        return broken
+
+    def _replace_manager(self):
+        """
+        Swap a manager that went away for a new one; call with the lock held
+
+        Returns:
+            SyncManager: The old manager, to shut down once the lock is released
+        """
+        logger.warning("The PDF import manager process went away; restarting it")
+        manager = self._manager
+        # The old relay returns once its queue is gone
+        self._start_manager()
+        return manager
+
+    @staticmethod
+    def _retire(executor=None, manager=None):
+        """Shut down a replaced executor or manager without waiting for it"""
+        if executor is not None:
+            # May run on the executor's own management thread, so don't wait
+            executor.shutdown(wait=False, cancel_futures=True)
+        if manager is not None:
+            try:
+                manager.shutdown()
+            except Exception:
+                pass
+
+    def stop(self):
+        """Cancel queued jobs and shut the workers down"""
+        with self._lock:
+            executor, manager = self._executor, self._manager
+            queue, relay = self._progress_queue, self._relay
+            self._executor = self._manager = self._progress_queue = self._relay = None
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if relay is not None:
+            queue.put(None)
+            relay.join()
+        if manager is not None:
+            manager.shutdown()
+
+    def _relay_progress(self, queue):
+        """Relay thread: hand the workers' progress reports to the jobs' callbacks"""
+        while True:
+            try:
+                report = queue.get()
+            except (EOFError, OSError):
+                # The manager is gone
+                return
+            if report is None:
+                return
+            job_id, part, pages, questions = report
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job is None or job.cancelled():
+                continue
+            job.progress[part] = (pages, questions)
+            try:
+                job.on_progress(job)
+            except Exception:
+                logger.exception(f"Progress callback of PDF import {job_id} failed")
+
+    def _page_ranges(self, pages):
+        """Page ranges to extract in parallel, or None to import the document in one piece"""
+        if self.workers < 2 or pages is None or pages < self.parallel_pages:
+            return None
+        return split_pages(pages, self.workers)
+
+    def submit(self, admin_id, source, on_done, on_progress=None):
+        """
+        Queue an import
+
+        Args:
+            admin_id (int): Admin who uploaded the file
+            source (bytes or str): The PDF file contents, or the path of a
+                                   file, which each worker opens itself
+            on_done (callable): Called with the PDFJob once it finished,
+                                failed or was cancelled; runs on the
+                                pool's completion thread, one job after
+                                the other, so it must not block
+            on_progress (callable, optional): Called with the PDFJob every
+                                              progress_interval seconds
+                                              while it runs, from the relay
+                                              thread, so it must not block
+                                              either
+
+        Returns:
+            tuple: (PDFJob, None), or (None, reason) if a limit was reached
+        """
+        def count_pages(job):
+            job.counting = self._executor.submit(page_count, source)
+
+        job, reason = self._add_job(admin_id, on_progress, count_pages)
+        if job is not None:
+            job.counting.add_done_callback(functools.partial(self._start_parts, job, source, on_done))
+        return job, reason
+
+    def diagnose(self, admin_id, source, on_done, trace_samples, sample_chars=200):
+        """
+        Queue a traced import of a whole document for /diagnose_pdf_import
+
+        The job counts against the same limits as imports. Its future
+        resolves to the tuple returned by _run_diagnostics().
+
+        Args:
+            admin_id (int): Admin who uploaded the file
+            source (bytes or str): The PDF file contents, or a file path
+            on_done (callable): Called with the PDFJob once it is done, see
+                                submit()
+            trace_samples (int): Samples per category of the ParseTrace
+            sample_chars (int): Characters of the first page to return
+
+        Returns:
+            tuple: (PDFJob, None), or (None, reason) if a limit was reached
+        """
+        def run(job):
+            job.parts.append(self._executor.submit(
+                _run_diagnostics, source, job.cancel_event, self.layout, trace_samples, sample_chars
+            ))
+
+        job, reason = self._add_job(admin_id, None, run)
+        if job is not None:
+            self._watch_parts(job, on_done)
+        return job, reason
+
+    def _add_job(self, admin_id, on_progress, queue_tasks):
+        """
+        Register a job unless a limit is reached
+
+        If the workers or the manager turn out to be gone, they are
+        replaced and the job is queued on the new ones.
+
+        Args:
+            queue_tasks (callable): Called with the new job, with the lock
+                                    held, to submit its first tasks
+
+        Returns:
+            tuple: (PDFJob, None), or (None, reason)
+        """
+        self.start()
+        retired = []
+        job = None
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.admin_id == admin_id)
+            if running >= self.per_admin:
+                return None, (
+                    "You already have a PDF import running. "
+                    "Wait for it to finish or stop it with /cancel_pdf."
+                )
+            if len(self._jobs) >= self.max_jobs:
+                return None, "Too many PDF imports are in progress. Please try again in a minute."
+
+            for _ in range(2):
+                try:
+                    job = PDFJob(next(self._ids), admin_id, self._manager.Event(), on_progress)
+                    job.executor = self._executor
+                    queue_tasks(job)
+                    break
+                except BrokenExecutor:
+                    retired.append((self._replace_executor(self._executor), None))
+                except (EOFError, OSError):
+                    retired.append((None, self._replace_manager()))
+                job = None
+            if job is not None:
+                self._jobs[job.job_id] = job
+
+        for executor, manager in retired:
+            self._retire(executor, manager)
+        if job is None:
+            return None, "The PDF import workers are restarting. Please try again in a minute."
+        return job, None
+
+    def _start_parts(self, job, source, on_done, counting):
+        """Done callback of a job's page count: queue the document, whole or in page ranges"""
+        pages = None
+        if not counting.cancelled():
+            if isinstance(counting.exception(), BrokenExecutor):
+                # The worker died opening the document; don't queue it again
+                job.error = counting.exception()
+            elif counting.exception() is None:
+                pages = counting.result()
+        # An unreadable document is still queued whole; its worker reports the error
+        ranges = self._page_ranges(pages)
+
+        broken = None
+        with self._lock:
+            if job.error is not None:
+                broken = self._replace_executor(job.executor)
+            # A job cancelled or a pool stopped meanwhile finishes without parts
+            elif self._executor is not None and not job.cancelled():
+                job.total_pages = pages
+                job.ranges = ranges
+                job.progress = [(0, 0)] * (len(ranges) if ranges else 1)
+
+                def reporter(part):
+                    if job.on_progress is None:
+                        return None
+                    return _ProgressReporter(self._progress_queue, job.job_id, part, self.progress_interval)
+
+                job.executor = self._executor
+                try:
+                    if ranges is None:
+                        job.parts.append(self._executor.submit(
+                            _run_import, source, job.cancel_event, self.layout, self.trace_samples, reporter(0)
+                        ))
+                    else:
+                        for part, (start, stop) in enumerate(ranges):
+                            job.parts.append(self._executor.submit(
+                                _run_range, source, start, stop, job.cancel_event, self.layout, reporter(part)
+                            ))
+                except BrokenExecutor as e:
+                    # Parts already queued fail with the same error
+                    job.error = e
+                    job.parts.clear()
+                    broken = self._replace_executor(job.executor)
+        self._retire(executor=broken)
+        self._watch_parts(job, on_done)
+
+    def _watch_parts(self, job, on_done):
+        """Finish a job on the completion thread once all of its parts are done"""
+        if not job.parts:
+            self._completions.submit(self._finish, job, on_done)
+            return
+
+        remaining = [len(job.parts)]
+
+        def part_done(future):
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            self._completions.submit(self._finish, job, on_done)
+
+        for part in job.parts:
+            part.add_done_callback(part_done)
+
+    def _outcome(self, job):
+        """Combine the parts of a job into (questions, ImportStats, cancelled, ParseTrace or None)"""
+        if job.error is not None:
+            raise job.error
+        if not job.parts:
+            return [], ImportStats(), True, None
+        if job.ranges is None:
+            part = job.parts[0]
+            if part.cancelled():
+                return [], ImportStats(), True, None
+            return part.result()
+
+        # Ranges are stitched in page order; after a cancelled or cut short
+        # range the rest can't continue the questions, so they are dropped
+        stats = ImportStats()
+        token_lists = []
+        cancelled = False
+        for part, (start, stop) in zip(job.parts, job.ranges):
+            if part.cancelled():
+                cancelled = True
+                break
+            tokens, part_stats = part.result()
+            token_lists.append(tokens)
+            stats.merge(part_stats)
+            if part_stats.pages < stop - start:
+                cancelled = True
+                break
+        # The tokens all come back here, so they are traced here
+        trace = ParseTrace(self.trace_samples) if self.trace_samples is not None else None
+        questions = list(iter_token_ranges(token_lists, stats, trace))
+        return questions, stats, cancelled, trace
+
+    def _finish(self, job, on_done):
+        try:
+            job.future.set_result(self._outcome(job))
+        except Exception as e:
+            job.future.set_exception(e)
+
+        broken = None
+        with self._lock:
+            if isinstance(job.future.exception(), BrokenExecutor):
+                broken = self._replace_executor(job.executor)
+            self._jobs.pop(job.job_id, None)
+            if job.future.exception() is not None:
+                self.failed_count += 1
+            elif job.future.result()[2]:
+                self.cancelled_count += 1
+            else:
+                self.completed_count += 1
+
+        self._retire(executor=broken)
+
+        if job.future.exception() is not None:
+            logger.error(f"PDF import {job.job_id} failed: {job.future.exception()}")
+        else:
+            _, stats, cancelled, trace = job.future.result()[:4]
+            parts = f" in {len(job.ranges)} parts" if job.ranges else ""
+            logger.info(
+                f"PDF import {job.job_id}{parts}{' (cancelled)' if cancelled else ''}: {stats.summary()}, "
+                f"{time.time() - job.submitted_at:.2f}s after submission"
+            )
+            if trace is not None:
+                logger.info(f"PDF import {job.job_id} parse trace: {trace.summary()}")
+        try:
+            on_done(job)
+        except Exception:
+            logger.exception(f"Completion callback of PDF import {job.job_id} failed")
+
+    def cancel(self, admin_id, job_id=None):
+        """
+        Cancel an admin's queued and running imports
+
+        Args:
+            admin_id (int): Admin whose imports to cancel
+            job_id (int, optional): Only cancel this import of the admin
+
+        Returns:
+            int: Number of jobs cancelled
+        """
+        with self._lock:
+            jobs = [
+                job for job in self._jobs.values()
+                if job.admin_id == admin_id and (job_id is None or job.job_id == job_id)
+            ]
+        for job in jobs:
+            # Running parts stop before their next page; the job still reports back
+            job.cancel_event.set()
+            if job.counting is not None:
+                job.counting.cancel()
+            for part in job.parts:
+                part.cancel()
+        return len(jobs)
+
+    def stats(self):
+        """
+        Returns:
+            dict: workers, jobs (running or queued), completed, cancelled, failed
+        """
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'jobs': len(self._jobs),
+                'completed': self.completed_count,
+                'cancelled': self.cancelled_count,
+                'failed': self.failed_count
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pdf_import_pool():
+    """Get the shared PDF import pool; it starts with the first submit() or start()"""
+    global _pool
+    if _pool is None:
+        from config import (
+            PDF_IMPORT_WORKERS, PDF_IMPORT_MAX_JOBS, PDF_IMPORTS_PER_ADMIN, PDF_PARALLEL_MIN_PAGES,
+            PDF_LAYOUT_EXTRACTION, PDF_PARSE_TRACE, PDF_TRACE_SAMPLES, PDF_PROGRESS_INTERVAL
+        )
+        with _pool_lock:
+            if _pool is None:
+                _pool = PDFImportPool(
+                    workers=PDF_IMPORT_WORKERS,
+                    max_jobs=PDF_IMPORT_MAX_JOBS,
+                    per_admin=PDF_IMPORTS_PER_ADMIN,
+                    parallel_pages=PDF_PARALLEL_MIN_PAGES,
+                    layout=PDF_LAYOUT_EXTRACTION,
+                    trace_samples=PDF_TRACE_SAMPLES if PDF_PARSE_TRACE else None,
+                    progress_interval=PDF_PROGRESS_INTERVAL
+                )
+    return _pool
@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Layout-aware text extraction of question-bank pages
+
+Plain text extraction returns lines in content-stream order, which breaks
+on the PDFs coaching institutes publish: two-column pages typeset row by
+row come out with the columns interleaved, options set out in a grid
+("A) ...   B) ..." on one row) come out as one line, and the correct
+answer is often shown only by printing it in bold or in another color.
+
+page_text() rebuilds a page from PyMuPDF's spans instead:
+
+    1. Spans are grouped into rows by their vertical position, and the
+       spans of a row are merged into cells unless a wide horizontal gap
+       separates them, so every option of a grid gets its own line.
+    2. A two-column page is recognized by a vertical strip near the
+       middle of the page that almost no text crosses, and read column by
+       column. Rows crossing the strip are headings, read in place, or
+       running headers and footers, dropped, when above or below both
+       columns. Lettered options that come out of order (grids filled
+       column by column) are put back in letter order.
+    3. The most common text style (color, bold) of the page is the body
+       style. An option printed in another style is the highlighted
+       answer, unless most options of the page share that style, in which
+       case it's just how options are typeset. Styles are weighed by
+       characters: the style must cover most of the option, or all of its
+       text after the option marker, so a word emphasized inside a wrong
+       option doesn't mark it.
+
+The result is page text in the format tokenize() reads, with a "✓" line
+after each highlighted option; the question parser already treats a
+check mark on its own line as marking the option above it. Pages are
+handled one at a time and only the current page's spans are held in
+memory; embedded images are not extracted.
+"""
+
+import re
+from collections import Counter
+
+from utils.pdf_import import LINE_RE, clean_line
+
+# PyMuPDF's "dict" extraction flags without TEXT_PRESERVE_IMAGES (4): images
+# would be decoded into the result for nothing
+TEXT_FLAGS = 1 | 2 | 64
+# Span flag of bold fonts
+BOLD_FLAG = 16
+
+# Spans further apart than this many font sizes start a new cell
+CELL_GAP = 1.5
+# Spans closer than this many font sizes are joined without a space
+JOIN_GAP = 0.1
+# A run of spaces followed by an option marker inside one span starts a new cell
+GRID_SPACES_RE = re.compile(r' {3,}(?=\(?[A-Ja-j] ?[.)] )')
+
+# Column detection: the page width is cut into bins, and a gutter is a
+# run of at least GUTTER_BINS bins within the middle of the page that text
+# crosses for at most GUTTER_CROSSING of the height of the page's text
+# (headers, footers and headings across both columns)
+PAGE_BINS = 100
+GUTTER_BINS = 2
+GUTTER_RANGE = (30, 70)
+GUTTER_CROSSING = 0.1
+
+class _Fragment:
+    """A piece of text with its position and style"""
+
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'size', 'text', 'style', 'starts_cell')
+
+    def __init__(self, x0, y0, x1, y1, size, text, style, starts_cell=False):
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.size = size
+        self.text = text
+        self.style = style
+        # Split from the previous fragment by a run of spaces inside a span
+        self.starts_cell = starts_cell
+
+def _char_count(text):
+    """Characters of text other than whitespace"""
+    return len(''.join(text.split()))
+
+class _Cell:
+    """Fragments of one row read as one line, counting characters per style"""
+
+    __slots__ = ('x0', 'x1', 'parts', 'styles', 'text', 'match')
+
+    def __init__(self, fragment):
+        self.x0 = fragment.x0
+        self.x1 = fragment.x1
+        self.parts = [fragment.text]
+        self.styles = Counter({fragment.style: _char_count(fragment.text)})
+        self.text = None
+        self.match = None
+
+    def add(self, fragment):
+        if fragment.x0 - self.x1 > JOIN_GAP * fragment.size and not self.parts[-1].endswith(' '):
+            self.parts.append(' ')
+        self.parts.append(fragment.text)
+        self.styles[fragment.style] += _char_count(fragment.text)
+        self.x1 = max(self.x1, fragment.x1)
+
+    def finish(self):
+        """Clean the text and classify it; returns False for empty cells"""
+        self.text = clean_line(''.join(self.parts))
+        if not self.text:
+            return False
+        self.match = LINE_RE.match(self.text)
+        return True
+
+    def option_key(self):
+        """Letter of an option cell, else None"""
+        key = self.match.group('option_key')
+        return key.upper() if key else None
+
+    def is_option(self):
+        """Whether the cell is an option, including a numbered "1." option"""
+        return self.match.group('option') is not None or self.match.group('bare_number') is not None
+
+    def is_highlighted(self, highlights):
+        """Whether most of an option, or all of its text after the marker, is in the highlight styles"""
+        marked = sum(self.styles[style] for style in highlights)
+        if not marked:
+            return False
+        body = self.match.group('option') or self.match.group('question')
+        return marked * 2 > sum(self.styles.values()) or marked >= _char_count(body)
+
+def _fragments(page, weights):
+    """
+    Horizontal text spans of a page, counting characters per style
+
+    Returns:
+        list: _Fragment objects
+    """
+    fragments = []
+    for block in page.get_text("dict", flags=TEXT_FLAGS)["blocks"]:
+        for line in block.get("lines", ()):
+            if line["dir"][0] < 0.99:
+                # Rotated watermarks and vertical text
+                continue
+            for span in line["spans"]:
+                text = span["text"]
+                if not text.strip():
+                    continue
+                bold = bool(span["flags"] & BOLD_FLAG) or 'bold' in span["font"].lower()
+                style = (span["color"], bold)
+                weights[style] += len(text)
+                x0, y0, x1, y1 = span["bbox"]
+                size = span["size"]
+
+                pieces = GRID_SPACES_RE.split(text)
+                if len(pieces) == 1:
+                    fragments.append(_Fragment(x0, y0, x1, y1, size, text, style))
+                    continue
+                # Position the pieces in proportion to their offsets in the span
+                scale = (x1 - x0) / len(text)
+                offset = 0
+                for i, piece in enumerate(pieces):
+                    start = text.index(piece, offset)
+                    offset = start + len(piece)
+                    fragments.append(_Fragment(
+                        x0 + start * scale, y0, x0 + offset * scale, y1, size, piece, style, i > 0
+                    ))
+    return fragments
+
+def _group_rows(fragments):
+    """
+    Group fragments into rows by their vertical centers
+
+    Returns:
+        list: Lists of fragments, top to bottom
+    """
+    rows = []
+    bottom = None
+    for fragment in sorted(fragments, key=lambda f: (f.y0 + f.y1) / 2):
+        if bottom is not None and (fragment.y0 + fragment.y1) / 2 <= bottom:
+            rows[-1].append(fragment)
+        else:
+            rows.append([fragment])
+            bottom = fragment.y1
+    return rows
+
+def _cells(row):
+    """
+    Merge the fragments of a row into cells, split at wide gaps
+
+    Returns:
+        list: _Cell objects left to right, without empty ones
+    """
+    cells = []
+    for fragment in sorted(row, key=lambda f: f.x0):
+        if cells and not fragment.starts_cell and fragment.x0 - cells[-1].x1 <= CELL_GAP * fragment.size:
+            cells[-1].add(fragment)
+        else:
+            cells.append(_Cell(fragment))
+    return [cell for cell in cells if cell.finish()]
+
+def _rows(fragments):
+    """
+    Returns:
+        list: Rows of cells of some fragments, top to bottom
+    """
+    rows = []
+    for row in _group_rows(fragments):
+        cells = _cells(row)
+        if cells:
+            rows.append(cells)
+    return rows
+
+def _find_gutter(fragments, width):
+    """
+    x coordinate of the empty strip between two columns, or None
+
+    Only a candidate: _read_columns() checks that the right side holds
+    questions rather than the second column of an option grid.
+    """
+    if not width:
+        return None
+    # Height of text covering each bin
+    bins = [0.0] * PAGE_BINS
+    for fragment in fragments:
+        first = max(0, int(fragment.x0 / width * PAGE_BINS))
+        last = min(PAGE_BINS - 1, int(fragment.x1 / width * PAGE_BINS))
+        height = fragment.y1 - fragment.y0
+        for i in range(first, last + 1):
+            bins[i] += height
+    if not any(bins[:GUTTER_RANGE[0]]) or not any(bins[GUTTER_RANGE[1]:]):
+        return None
+
+    allowed = GUTTER_CROSSING * (max(f.y1 for f in fragments) - min(f.y0 for f in fragments))
+    best_start = best_length = length = 0
+    for i in range(*GUTTER_RANGE):
+        length = length + 1 if bins[i] <= allowed else 0
+        if length > best_length:
+            best_start, best_length = i - length + 1, length
+    if best_length < GUTTER_BINS:
+        return None
+    return (best_start + best_length / 2) / PAGE_BINS * width
+
+def _starts_questions(rows):
+    """
+    Whether rows hold the start of a question or of an option list
+
+    The second column of an option grid holds neither: its options
+    start at B or 2, and a question number there would be a "2." option.
+    """
+    for row in rows:
+        for cell in row:
+            match = cell.match
+            if cell.option_key() == 'A' or match.group('bare_number') == '1':
+                return True
+            if match.group('question') is not None and match.group('bare_number') is None:
+                return True
+    return False
+
+def _read_columns(fragments, gutter):
+    """
+    Rows of a two-column page in reading order, or None if it isn't one
+
+    Rows crossing the gutter (headings across both columns) split the
+    page into bands, each read left column first; those above or below
+    all of the columns are running headers and footers, and are dropped.
+    """
+    sections = []
+    left, right = [], []
+    for row in _group_rows(fragments):
+        if any(f.x0 < gutter < f.x1 for f in row):
+            if left or right:
+                sections.append((left, right))
+                left, right = [], []
+            sections.append((row, None))
+            continue
+        for fragment in row:
+            (left if fragment.x1 <= gutter else right).append(fragment)
+    if left or right:
+        sections.append((left, right))
+
+    rows = []
+    found_columns = False
+    for first, second in sections:
+        if second is None:
+            rows.append((False, _rows(first)))
+            continue
+        right_rows = _rows(second)
+        if right_rows and _starts_questions(right_rows):
+            found_columns = True
+        rows.append((True, _rows(first) + right_rows))
+    if not found_columns:
+        return None
+
+    while rows and not rows[0][0]:
+        rows.pop(0)
+    while rows and not rows[-1][0]:
+        rows.pop()
+    return [row for _, section in rows for row in section]
+
+def _sort_options(cells):
+    """Put each run of lettered options in letter order, for column-major grids"""
+    start = 0
+    while start < len(cells):
+        if cells[start].option_key() is None:
+            start += 1
+            continue
+        end = start
+        while end < len(cells) and cells[end].option_key() is not None:
+            end += 1
+        keys = [cell.option_key() for cell in cells[start:end]]
+        if len(set(keys)) == len(keys) and keys != sorted(keys):
+            cells[start:end] = sorted(cells[start:end], key=lambda cell: cell.option_key())
+        start = end
+
+def _highlight_styles(cells, weights):
+    """Styles marking answers: neither the body style nor highlighting most options"""
+    if not weights:
+        return set()
+    body = weights.most_common(1)[0][0]
+    options = [cell for cell in cells if cell.is_option()]
+    usage = Counter(
+        style for cell in options for style in cell.styles
+        if style != body and cell.is_highlighted((style,))
+    )
+    return {style for style, count in usage.items() if count * 2 <= len(options)}
+
+def page_text(page):
+    """
+    Text of a PyMuPDF page in reading order, with highlighted options marked
+
+    Args:
+        page (fitz.Page): The page
+
+    Returns:
+        str: Page text for tokenize()
+    """
+    weights = Counter()
+    fragments = _fragments(page, weights)
+    if not fragments:
+        return ""
+
+    rows = None
+    gutter = _find_gutter(fragments, page.rect.width)
+    if gutter is not None:
+        rows = _read_columns(fragments, gutter)
+    if rows is None:
+        rows = _rows(fragments)
+
+    cells = [cell for row in rows for cell in row]
+    _sort_options(cells)
+    highlights = _highlight_styles(cells, weights)
+
+    lines = []
+    for cell in cells:
+        lines.append(cell.text)
+        if highlights and cell.is_option() and cell.is_highlighted(highlights):
+            lines.append("✓")
+    return "\n".join(lines)
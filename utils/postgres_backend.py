@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PostgreSQL storage backend for quiz data
+"""
+
+import json
+import logging
+import threading
+from contextlib import contextmanager
+
+from models.quiz import Quiz
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS quizzes (
+        id TEXT PRIMARY KEY,
+        data JSONB NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGINT PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        last_name TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_results (
+        user_id BIGINT NOT NULL,
+        quiz_id TEXT NOT NULL,
+        quiz_title TEXT,
+        score DOUBLE PRECISION NOT NULL,
+        max_score INTEGER NOT NULL,
+        timestamp DOUBLE PRECISION NOT NULL,
+        negative_marking_factor DOUBLE PRECISION,
+        answers JSONB NOT NULL,
+        PRIMARY KEY (user_id, quiz_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_quiz_results_quiz ON quiz_results (quiz_id)",
+    """
+    CREATE TABLE IF NOT EXISTS user_answers (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT NOT NULL,
+        quiz_id TEXT NOT NULL,
+        question_index INTEGER NOT NULL,
+        selected_option INTEGER NOT NULL,
+        is_correct BOOLEAN NOT NULL,
+        timestamp DOUBLE PRECISION NOT NULL
+    )
+    """,
+    # Also serves (user_id, quiz_id) lookups; uniqueness makes journal replay idempotent
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_user_answers_unique ON user_answers (user_id, quiz_id, question_index, timestamp)",
+)
+
+SQL_SAVE_QUIZ = (
+    "INSERT INTO quizzes (id, data) VALUES (%s, %s) "
+    "ON CONFLICT (id) DO UPDATE SET data = EXCLUDED.data"
+)
+SQL_DELETE_QUIZ = "DELETE FROM quizzes WHERE id = %s"
+SQL_LOAD_QUIZZES = "SELECT data FROM quizzes"
+SQL_SAVE_USER = (
+    "INSERT INTO users (id, username, first_name, last_name) VALUES (%s, %s, %s, %s) "
+    "ON CONFLICT (id) DO UPDATE SET username = EXCLUDED.username, "
+    "first_name = EXCLUDED.first_name, last_name = EXCLUDED.last_name"
+)
+SQL_LOAD_USERS = "SELECT id, username, first_name, last_name FROM users"
+SQL_SAVE_RESULT = (
+    "INSERT INTO quiz_results "
+    "(user_id, quiz_id, quiz_title, score, max_score, timestamp, negative_marking_factor, answers) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON CONFLICT (user_id, quiz_id) DO UPDATE SET quiz_title = EXCLUDED.quiz_title, "
+    "score = EXCLUDED.score, max_score = EXCLUDED.max_score, timestamp = EXCLUDED.timestamp, "
+    "negative_marking_factor = EXCLUDED.negative_marking_factor, answers = EXCLUDED.answers"
+)
+SQL_LOAD_RESULTS = (
+    "SELECT user_id, quiz_id, quiz_title, score, max_score, timestamp, negative_marking_factor, answers "
+    "FROM quiz_results"
+)
+SQL_SAVE_ANSWER = (
+    "INSERT INTO user_answers (user_id, quiz_id, question_index, selected_option, is_correct, timestamp) "
+    "VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT DO NOTHING"
+)
+SQL_DELETE_ANSWERS = "DELETE FROM user_answers WHERE user_id = %s AND quiz_id = %s"
+SQL_LOAD_ANSWERS = (
+    "SELECT user_id, quiz_id, question_index, selected_option, is_correct, timestamp "
+    "FROM user_answers ORDER BY id"
+)
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of PostgreSQL connections
+
+    psycopg2's ThreadedConnectionPool raises PoolError once every connection
+    is checked out; this wrapper makes callers wait for a free connection
+    instead, so the number of open connections never exceeds the pool size.
+    """
+
+    def __init__(self, dsn, size):
+        """
+        Create the pool
+
+        Args:
+            dsn (str): libpq connection string or postgresql:// URL
+            size (int): Maximum number of open connections
+        """
+        from psycopg2.pool import ThreadedConnectionPool
+
+        self.size = size
+        self._slots = threading.BoundedSemaphore(size)
+        self._pool = ThreadedConnectionPool(1, size, dsn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the duration of a transaction
+
+        The transaction is committed when the block exits normally and
+        rolled back if it raises.
+        """
+        with self._slots:
+            conn = self._pool.getconn()
+            try:
+                with conn:
+                    yield conn
+            finally:
+                self._pool.putconn(conn)
+
+    def close(self):
+        """Close all pooled connections"""
+        self._pool.closeall()
+
+class PostgresBackend:
+    """
+    Durable storage for quizzes, users and results in PostgreSQL
+    """
+
+    def __init__(self, dsn, pool_size):
+        """
+        Connect to the database and create the schema if needed
+
+        Args:
+            dsn (str): libpq connection string or postgresql:// URL
+            pool_size (int): Maximum number of pooled connections
+        """
+        self.pool = ConnectionPool(dsn, pool_size)
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            for statement in SCHEMA:
+                cur.execute(statement)
+        logger.info(f"Connected to PostgreSQL with a pool of {pool_size} connections")
+
+    def _write(self, sql, params):
+        """Execute a single write statement in its own transaction"""
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(sql, params)
+
+    def _read(self, sql):
+        """Fetch all rows for a read statement"""
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(sql)
+            return cur.fetchall()
+
+    def save_quiz(self, quiz):
+        """Insert or replace a quiz"""
+        self._write(SQL_SAVE_QUIZ, (quiz.id, json.dumps(quiz.to_dict())))
+
+    def delete_quiz(self, quiz_id):
+        """Delete a quiz"""
+        self._write(SQL_DELETE_QUIZ, (quiz_id,))
+
+    def load_quizzes(self):
+        """Load all stored quizzes"""
+        # JSONB columns are decoded to dicts by psycopg2
+        return [Quiz.from_dict(data) for (data,) in self._read(SQL_LOAD_QUIZZES)]
+
+    def save_user(self, user):
+        """Insert or replace a user"""
+        self._write(SQL_SAVE_USER, (user.id, user.username, user.first_name, user.last_name))
+
+    def load_users(self):
+        """Load all stored users"""
+        return [User(*row) for row in self._read(SQL_LOAD_USERS)]
+
+    def save_result(self, user_id, quiz_id, result):
+        """Store a finished quiz result, superseding any in-progress answers"""
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(SQL_SAVE_RESULT, (
+                user_id,
+                quiz_id,
+                result['quiz_title'],
+                result['score'],
+                result['max_score'],
+                result['timestamp'],
+                result['negative_marking_factor'],
+                json.dumps(result['answers'])
+            ))
+            cur.execute(SQL_DELETE_ANSWERS, (user_id, quiz_id))
+
+    def load_results(self):
+        """
+        Load all stored quiz results
+
+        Returns:
+            list: (user_id, quiz_id, result) tuples
+        """
+        results = []
+        for row in self._read(SQL_LOAD_RESULTS):
+            user_id, quiz_id, quiz_title, score, max_score, timestamp, negative_marking_factor, answers = row
+            results.append((user_id, quiz_id, {
+                'quiz_id': quiz_id,
+                'quiz_title': quiz_title,
+                'score': score,
+                'max_score': max_score,
+                'timestamp': timestamp,
+                'answers': answers,
+                'negative_marking_factor': negative_marking_factor
+            }))
+        return results
+
+    def save_answers(self, records):
+        """Append a batch of in-progress answer records in one transaction"""
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.executemany(SQL_SAVE_ANSWER, [
+                (user_id, quiz_id, question_index, selected_option, bool(is_correct), timestamp)
+                for user_id, quiz_id, question_index, selected_option, is_correct, timestamp in records
+            ])
+
+    def load_answers(self):
+        """
+        Load in-progress answers in the order they were recorded
+
+        Returns:
+            list: (user_id, quiz_id, question_index, selected_option, is_correct, timestamp) tuples
+        """
+        return [tuple(row) for row in self._read(SQL_LOAD_ANSWERS)]
+
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cache of pre-rendered quiz questions
+
+Every user taking a quiz sees the same "Question i/N" text and the same
+answer keyboard, so both are built once per (quiz_id, question_index) and
+shared by all sessions.
+"""
+
+import threading
+
+# Telegram's limits for quiz polls
+POLL_QUESTION_MAX_LENGTH = 300
+POLL_OPTION_MAX_LENGTH = 100
+POLL_MIN_OPTIONS = 2
+POLL_MAX_OPTIONS = 10
+POLL_MIN_OPEN_PERIOD = 5
+POLL_MAX_OPEN_PERIOD = 600
+
+class QuestionPayload:
+    """
+    Rendered question: text header, initial message text and answer keyboard,
+    plus the quiz poll form of the question when it fits Telegram's limits
+    """
+
+    __slots__ = ('header', 'text', 'reply_markup', 'time_limit', 'poll_question', 'poll_options', 'open_period')
+
+    def __init__(self, header, reply_markup, time_limit, poll_question=None, poll_options=None):
+        """
+        Initialize a payload
+
+        Args:
+            header (str): "Question i/N" line and question text, ready for a timer line
+            reply_markup (InlineKeyboardMarkup): Answer keyboard
+            time_limit (int): Effective time limit of the question in seconds
+            poll_question (str, optional): Quiz poll question, None if it can't be sent as a poll
+            poll_options (list, optional): Quiz poll options
+        """
+        self.header = header
+        self.text = f"{header}⏱️ Time remaining: {time_limit} seconds"
+        self.reply_markup = reply_markup
+        self.time_limit = time_limit
+        self.poll_question = poll_question
+        self.poll_options = poll_options
+        self.open_period = min(POLL_MAX_OPEN_PERIOD, max(POLL_MIN_OPEN_PERIOD, time_limit))
+
+# quiz_id -> {question_index -> QuestionPayload}
+_payloads = {}
+_lock = threading.Lock()
+
+def build_question_payload(quiz, question_index):
+    """Render a question of a quiz"""
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+    question = quiz.questions[question_index]
+    keyboard = [
+        [InlineKeyboardButton(option, callback_data=f"answer_{question_index}_{i}")]
+        for i, option in enumerate(question.options)
+    ]
+    time_limit = question.time_limit if question.time_limit is not None else quiz.time_limit
+    header = (
+        f"Question {question_index + 1}/{len(quiz.questions)}:\n\n"
+        f"{question.text}\n\n"
+    )
+
+    poll_question = f"[{question_index + 1}/{len(quiz.questions)}] {question.text}"
+    poll_options = list(question.options)
+    if (len(poll_question) > POLL_QUESTION_MAX_LENGTH
+            or not POLL_MIN_OPTIONS <= len(poll_options) <= POLL_MAX_OPTIONS
+            or any(len(option) > POLL_OPTION_MAX_LENGTH for option in poll_options)):
+        poll_question = poll_options = None
+
+    return QuestionPayload(header, InlineKeyboardMarkup(keyboard), time_limit, poll_question, poll_options)
+
+def get_question_payload(quiz, question_index):
+    """
+    Get the rendered payload of a question, building it on first use
+
+    Args:
+        quiz (Quiz): The quiz
+        question_index (int): 0-based question index
+
+    Returns:
+        QuestionPayload: The cached payload
+    """
+    quiz_payloads = _payloads.get(quiz.id)
+    if quiz_payloads is not None:
+        payload = quiz_payloads.get(question_index)
+        if payload is not None:
+            return payload
+
+    payload = build_question_payload(quiz, question_index)
+    with _lock:
+        _payloads.setdefault(quiz.id, {})[question_index] = payload
+    return payload
+
+def warm_quiz(quiz):
+    """Render every question of a quiz ahead of time"""
+    payloads = {i: build_question_payload(quiz, i) for i in range(len(quiz.questions))}
+    with _lock:
+        _payloads[quiz.id] = payloads
+
+def invalidate_quiz(quiz_id):
+    """Drop the rendered questions of a quiz after it changes"""
+    with _lock:
+        _payloads.pop(quiz_id, None)
@@ -8,7 +8,8 @@ Quiz management utilities for handling active quiz sessions
 import json
 import logging
 import uuid
-from models.quiz import Quiz, Question
+from array import array
+from models.quiz import Quiz, Question, DELIVERY_BUTTONS, DELIVERY_MODES
 from utils.database import record_user_answer
 
 # Enable logging
@@ -21,6 +22,11 @@ logger = logging.getLogger(__name__)
 class QuizSession:
     """
     Class to manage an active quiz session for a user
+    
+    Answers are stored compactly: one signed byte per question for the
+    selected option (-1 means no answer) and one bit per question for
+    correctness. Question details are read from the shared Quiz object
+    only when results are rendered.
     """
     
     def __init__(self, user_id, quiz):
@@ -34,14 +40,35 @@ class QuizSession:
         self.user_id = user_id
         self.quiz = quiz
         self.current_question_index = 0
-        self.answers = []
         
-        # Initialize answer placeholders for each question
-        for _ in range(len(quiz.questions)):
-            self.answers.append({
-                'selected_option': -1,  # -1 means no answer
-                'is_correct': False
-            })
+        question_count = len(quiz.questions)
+        self.selected_options = array('b', [-1]) * question_count
+        self.correct_bits = bytearray((question_count + 7) // 8)
+        
+        # Where the current question was sent and when it times out
+        self.chat_id = None
+        self.current_message_id = None
+        self.current_poll_id = None
+        self.deadline = None
+        
+        # Bumped on every change, so snapshots only re-serialize changed sessions
+        self.version = 0
+    
+    def set_current_message(self, chat_id, message_id, deadline=None, poll_id=None):
+        """
+        Remember the message showing the current question
+        
+        Args:
+            chat_id (int): Chat the question was sent to
+            message_id (int): Message ID of the question
+            deadline (float, optional): Unix time the question times out
+            poll_id (str, optional): Quiz poll ID when delivered as a poll
+        """
+        self.chat_id = chat_id
+        self.current_message_id = message_id
+        self.deadline = deadline
+        self.current_poll_id = poll_id
+        self.version += 1
     
     def get_current_question(self):
         """Get the current question or None if quiz is over"""
@@ -49,48 +76,62 @@ class QuizSession:
             return self.quiz.questions[self.current_question_index]
         return None
     
+    def is_answer_correct(self, question_index):
+        """Check whether the answer to a question was correct"""
+        return bool(self.correct_bits[question_index >> 3] & (1 << (question_index & 7)))
+    
     def record_answer(self, selected_option, is_correct):
         """Record user's answer for the current question"""
-        if self.current_question_index < len(self.answers):
-            # Get the current question for more details
-            question = self.get_current_question()
-            
-            # Create detailed answer record
-            answer = {
-                'selected_option': selected_option,
-                'is_correct': is_correct
-            }
-            
-            # Add question details if available
-            if question:
-                answer['question_text'] = question.text
-                answer['options'] = question.options
-                answer['correct_option'] = question.correct_option
-            
-            # Update the answers list
-            self.answers[self.current_question_index] = answer
+        index = self.current_question_index
+        if index < len(self.selected_options):
+            self.selected_options[index] = selected_option
+            if is_correct:
+                self.correct_bits[index >> 3] |= 1 << (index & 7)
+            else:
+                self.correct_bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+            self.version += 1
             
             # Record in database for persistence
             record_user_answer(
                 self.user_id,
                 self.quiz.id,
-                self.current_question_index,
+                index,
                 selected_option,
                 is_correct
             )
     
+    @property
+    def answers(self):
+        """
+        Detailed answer records, built from the quiz on demand
+        
+        Returns:
+            list: One dict per question with selected_option, is_correct,
+                  question_text, options and correct_option
+        """
+        answers = []
+        for i, question in enumerate(self.quiz.questions):
+            answers.append({
+                'selected_option': self.selected_options[i],
+                'is_correct': self.is_answer_correct(i),
+                'question_text': question.text,
+                'options': question.options,
+                'correct_option': question.correct_option
+            })
+        return answers
+    
     def move_to_next_question(self):
         """Move to the next question"""
         self.current_question_index += 1
+        self.deadline = None
+        self.version += 1
     
     def calculate_score(self):
         """Calculate the final score with negative marking"""
-        score = 0
-        for answer in self.answers:
-            if answer['is_correct']:
-                score += 1
-            elif answer['selected_option'] != -1:  # Wrong answer (but not no answer)
-                score -= self.quiz.negative_marking_factor
+        correct = sum(bin(byte).count('1') for byte in self.correct_bits)
+        answered = len(self.selected_options) - self.selected_options.count(-1)
+        wrong = answered - correct  # Wrong answers (but not no answer)
+        score = correct - wrong * self.quiz.negative_marking_factor if wrong else correct
         
         return max(0, score)  # Score can't go below 0
 
@@ -118,8 +159,12 @@ def import_quiz_from_file(quiz_data, creator_id):
         description = quiz_data['description']
         time_limit = quiz_data.get('time_limit', 60)
         negative_marking_factor = quiz_data.get('negative_marking_factor', 0.25)
+        delivery_mode = quiz_data.get('delivery_mode', DELIVERY_BUTTONS)
+        if delivery_mode not in DELIVERY_MODES:
+            logger.error(f"Unknown delivery_mode: {delivery_mode}")
+            return None
         
-        quiz = Quiz(title, description, creator_id, time_limit, negative_marking_factor)
+        quiz = Quiz(title, description, creator_id, time_limit, negative_marking_factor, delivery_mode)
         
         # Add questions
         for q_data in quiz_data['questions']:
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Bounded registry of active quiz sessions
+
+Users who walk away from a quiz without /cancel used to stay in memory
+forever. SessionManager keeps sessions in least-recently-used order and
+hands back the ones that went idle for longer than the TTL, or that were
+pushed out because the registry is full, so the caller can finalize them.
+
+Only user actions (starting a quiz, answering, continuing) mark a session
+as used; timer callbacks read sessions without touching them. A session
+whose current question deadline is still ahead is never treated as idle.
+
+Handlers run on several dispatcher workers, so a user's answer, the
+question deadline and the Continue button can all reach the same session
+at once. lock(user_id) returns one of a fixed set of reentrant locks,
+picked by user ID, that serializes changes to a user's session without a
+lock object per user.
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Rough per-session cost of the registry's own bookkeeping and the session's
+# timer entries, on top of the session object and its answer arrays
+SESSION_OVERHEAD_BYTES = 600
+
+# Users whose IDs map to the same stripe share a lock
+LOCK_STRIPES = 1024
+
+class SessionManager:
+    """
+    Active quiz sessions by user ID, with an idle TTL and a size cap
+
+    Supports the read side of a dict (``in``, ``[]``, ``get``, ``len``,
+    ``items``) so it can stand in for the old ``active_sessions`` dict.
+    """
+
+    def __init__(self, max_sessions=50000, idle_ttl=1800):
+        """
+        Initialize the session manager
+
+        Args:
+            max_sessions (int): Most sessions kept; the least recently used
+                                one is evicted beyond this
+            idle_ttl (float): Seconds without user activity before a
+                              session expires
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+
+        # user_id -> session, least recently used first
+        self._sessions = OrderedDict()
+        # user_id -> time of the last user action
+        self._last_active = {}
+        self._lock = threading.Lock()
+        self._user_locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+
+        self.expired_count = 0
+        self.evicted_count = 0
+
+    def __contains__(self, user_id):
+        return user_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __getitem__(self, user_id):
+        return self._sessions[user_id]
+
+    def lock(self, user_id):
+        """
+        Lock to hold while reading and changing a user's session
+
+        Returns:
+            threading.RLock: The user's stripe lock
+        """
+        return self._user_locks[hash(user_id) % LOCK_STRIPES]
+
+    def get(self, user_id, default=None):
+        """Get a session without marking it as used"""
+        return self._sessions.get(user_id, default)
+
+    def items(self):
+        """Copy of the (user_id, session) pairs"""
+        with self._lock:
+            return list(self._sessions.items())
+
+    def add(self, user_id, session):
+        """
+        Register a session and mark it as used
+
+        Returns:
+            list: Sessions evicted to stay within max_sessions, for the
+                  caller to finalize
+        """
+        evicted = []
+        with self._lock:
+            self._sessions[user_id] = session
+            self._sessions.move_to_end(user_id)
+            self._last_active[user_id] = time.time()
+            while len(self._sessions) > self.max_sessions:
+                old_user_id, old_session = self._sessions.popitem(last=False)
+                del self._last_active[old_user_id]
+                evicted.append(old_session)
+            self.evicted_count += len(evicted)
+
+        if evicted:
+            logger.warning(f"Evicted {len(evicted)} quiz sessions, limit is {self.max_sessions}")
+        return evicted
+
+    def touch(self, user_id):
+        """
+        Get a session and mark it as used by its user
+
+        Returns:
+            QuizSession: The session, or None if the user has none
+        """
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is not None:
+                self._sessions.move_to_end(user_id)
+                self._last_active[user_id] = time.time()
+            return session
+
+    def pop(self, user_id, default=None):
+        """Remove and return a session"""
+        with self._lock:
+            self._last_active.pop(user_id, None)
+            return self._sessions.pop(user_id, default)
+
+    def discard(self, user_id, session):
+        """
+        Remove a user's session if it is still the given one
+
+        Returns:
+            bool: False if the session was already removed or replaced
+        """
+        with self._lock:
+            if self._sessions.get(user_id) is not session:
+                return False
+            del self._sessions[user_id]
+            del self._last_active[user_id]
+            return True
+
+    def __delitem__(self, user_id):
+        if self.pop(user_id) is None:
+            raise KeyError(user_id)
+
+    def reap(self, now=None):
+        """
+        Remove sessions idle for longer than the TTL
+
+        Sessions are kept in order of last use, so this only walks the
+        expired ones plus the few still waiting on a question deadline.
+
+        Returns:
+            list: Expired sessions, for the caller to finalize
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.idle_ttl
+        expired = []
+        with self._lock:
+            for user_id, session in self._sessions.items():
+                if self._last_active[user_id] > cutoff:
+                    break
+                # A question is still running; its timers keep the session going
+                if session.deadline is not None and session.deadline > cutoff:
+                    continue
+                expired.append(session)
+            for session in expired:
+                del self._sessions[session.user_id]
+                del self._last_active[session.user_id]
+            self.expired_count += len(expired)
+        return expired
+
+    def stats(self):
+        """
+        Counts and approximate memory held by the registry
+
+        Returns:
+            dict: sessions, max_sessions, idle_ttl, idle (sessions unused for
+                  half the TTL or more), expired, evicted and approx_bytes
+        """
+        half_idle = time.time() - self.idle_ttl / 2
+        with self._lock:
+            sessions = list(self._sessions.values())
+            idle = sum(1 for last_active in self._last_active.values() if last_active <= half_idle)
+            approx_bytes = sys.getsizeof(self._sessions) + sys.getsizeof(self._last_active)
+
+        # Quizzes and rendered questions are shared, so only per-session data counts
+        for session in sessions:
+            approx_bytes += (
+                sys.getsizeof(session) + sys.getsizeof(session.__dict__) +
+                sys.getsizeof(session.selected_options) + sys.getsizeof(session.correct_bits) +
+                SESSION_OVERHEAD_BYTES
+            )
+
+        return {
+            'sessions': len(sessions),
+            'max_sessions': self.max_sessions,
+            'idle_ttl': self.idle_ttl,
+            'idle': idle,
+            'expired': self.expired_count,
+            'evicted': self.evicted_count,
+            'approx_bytes': approx_bytes
+        }
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SQLite storage backend for quiz data
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+
+from models.quiz import Quiz
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS quizzes (
+        id TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        username TEXT,
+        first_name TEXT,
+        last_name TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quiz_results (
+        user_id INTEGER NOT NULL,
+        quiz_id TEXT NOT NULL,
+        quiz_title TEXT,
+        score REAL NOT NULL,
+        max_score INTEGER NOT NULL,
+        timestamp REAL NOT NULL,
+        negative_marking_factor REAL,
+        answers TEXT NOT NULL,
+        PRIMARY KEY (user_id, quiz_id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_quiz_results_quiz ON quiz_results (quiz_id)",
+    """
+    CREATE TABLE IF NOT EXISTS user_answers (
+        user_id INTEGER NOT NULL,
+        quiz_id TEXT NOT NULL,
+        question_index INTEGER NOT NULL,
+        selected_option INTEGER NOT NULL,
+        is_correct INTEGER NOT NULL,
+        timestamp REAL NOT NULL
+    )
+    """,
+    # Also serves (user_id, quiz_id) lookups; uniqueness makes journal replay idempotent
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_user_answers_unique ON user_answers (user_id, quiz_id, question_index, timestamp)",
+)
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache always hands back the same prepared statement
+SQL_SAVE_QUIZ = "INSERT OR REPLACE INTO quizzes (id, data) VALUES (?, ?)"
+SQL_DELETE_QUIZ = "DELETE FROM quizzes WHERE id = ?"
+SQL_LOAD_QUIZZES = "SELECT data FROM quizzes"
+SQL_SAVE_USER = "INSERT OR REPLACE INTO users (id, username, first_name, last_name) VALUES (?, ?, ?, ?)"
+SQL_LOAD_USERS = "SELECT id, username, first_name, last_name FROM users"
+SQL_SAVE_RESULT = (
+    "INSERT OR REPLACE INTO quiz_results "
+    "(user_id, quiz_id, quiz_title, score, max_score, timestamp, negative_marking_factor, answers) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_LOAD_RESULTS = (
+    "SELECT user_id, quiz_id, quiz_title, score, max_score, timestamp, negative_marking_factor, answers "
+    "FROM quiz_results"
+)
+SQL_SAVE_ANSWER = (
+    "INSERT OR IGNORE INTO user_answers (user_id, quiz_id, question_index, selected_option, is_correct, timestamp) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_DELETE_ANSWERS = "DELETE FROM user_answers WHERE user_id = ? AND quiz_id = ?"
+SQL_LOAD_ANSWERS = (
+    "SELECT user_id, quiz_id, question_index, selected_option, is_correct, timestamp "
+    "FROM user_answers ORDER BY rowid"
+)
+
+class SQLiteBackend:
+    """
+    Durable storage for quizzes, users and results in a SQLite file
+    """
+
+    def __init__(self, path):
+        """
+        Open (or create) the database file
+
+        Args:
+            path (str): Path of the SQLite database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Handlers run on the dispatcher's worker threads, so the single
+        # connection is shared and serialized through self._lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+        logger.info(f"Opened SQLite database at {path}")
+
+    def _write(self, sql, params):
+        """Execute a single write statement in its own transaction"""
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    def _read(self, sql):
+        """Fetch all rows for a read statement"""
+        with self._lock:
+            return self._conn.execute(sql).fetchall()
+
+    def save_quiz(self, quiz):
+        """Insert or replace a quiz"""
+        self._write(SQL_SAVE_QUIZ, (quiz.id, json.dumps(quiz.to_dict())))
+
+    def delete_quiz(self, quiz_id):
+        """Delete a quiz"""
+        self._write(SQL_DELETE_QUIZ, (quiz_id,))
+
+    def load_quizzes(self):
+        """Load all stored quizzes"""
+        return [Quiz.from_dict(json.loads(data)) for (data,) in self._read(SQL_LOAD_QUIZZES)]
+
+    def save_user(self, user):
+        """Insert or replace a user"""
+        self._write(SQL_SAVE_USER, (user.id, user.username, user.first_name, user.last_name))
+
+    def load_users(self):
+        """Load all stored users"""
+        return [User(*row) for row in self._read(SQL_LOAD_USERS)]
+
+    def save_result(self, user_id, quiz_id, result):
+        """Store a finished quiz result, superseding any in-progress answers"""
+        with self._lock, self._conn:
+            self._conn.execute(SQL_SAVE_RESULT, (
+                user_id,
+                quiz_id,
+                result['quiz_title'],
+                result['score'],
+                result['max_score'],
+                result['timestamp'],
+                result['negative_marking_factor'],
+                json.dumps(result['answers'])
+            ))
+            self._conn.execute(SQL_DELETE_ANSWERS, (user_id, quiz_id))
+
+    def load_results(self):
+        """
+        Load all stored quiz results
+
+        Returns:
+            list: (user_id, quiz_id, result) tuples
+        """
+        results = []
+        for row in self._read(SQL_LOAD_RESULTS):
+            user_id, quiz_id, quiz_title, score, max_score, timestamp, negative_marking_factor, answers = row
+            results.append((user_id, quiz_id, {
+                'quiz_id': quiz_id,
+                'quiz_title': quiz_title,
+                'score': score,
+                'max_score': max_score,
+                'timestamp': timestamp,
+                'answers': json.loads(answers),
+                'negative_marking_factor': negative_marking_factor
+            }))
+        return results
+
+    def save_answers(self, records):
+        """Append a batch of in-progress answer records in one transaction"""
+        with self._lock, self._conn:
+            self._conn.executemany(SQL_SAVE_ANSWER, records)
+
+    def load_answers(self):
+        """
+        Load in-progress answers in the order they were recorded
+
+        Returns:
+            list: (user_id, quiz_id, question_index, selected_option, is_correct, timestamp) tuples
+        """
+        return [
+            (user_id, quiz_id, question_index, selected_option, bool(is_correct), timestamp)
+            for user_id, quiz_id, question_index, selected_option, is_correct, timestamp in self._read(SQL_LOAD_ANSWERS)
+        ]
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Hierarchical timing wheel for question deadlines and countdown ticks
+
+A single thread owns every timer. Arming and cancelling a timer are O(1)
+dictionary operations; on each tick the timers that expired are collected
+and handed to a thread pool in batches, so thousands of concurrent quiz
+takers cost one scheduler thread instead of one JobQueue job each.
+"""
+
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Expired timers run per thread pool task
+FIRE_BATCH_SIZE = 32
+
+class Timer:
+    """A callback scheduled on the wheel"""
+    __slots__ = ('key', 'deadline', 'callback', 'args', 'bucket')
+
+    def __init__(self, key, deadline, callback, args):
+        self.key = key
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.bucket = None
+
+class TimerWheel:
+    """
+    Hashed hierarchical timing wheel driven by a background thread
+
+    Level 0 has wheel_size slots of one tick each, level 1 slots span
+    wheel_size ticks, and so on. Timers due beyond the top level wait in an
+    overflow bucket until the wheel comes round.
+    """
+
+    def __init__(self, tick=0.1, wheel_size=64, levels=4, workers=4):
+        """
+        Initialize the wheel
+
+        Args:
+            tick (float): Resolution in seconds
+            wheel_size (int): Slots per level
+            levels (int): Number of levels
+            workers (int): Threads running expired callbacks
+        """
+        self.tick = tick
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self.workers = workers
+
+        self._wheels = [[{} for _ in range(wheel_size)] for _ in range(levels)]
+        self._overflow = {}
+        self._timers = {}
+        self._current = 0
+        self._origin = time.monotonic()
+        self._lock = threading.Lock()
+        self._armed = threading.Condition(self._lock)
+        self._stopped = False
+        self._executor = None
+        self._thread = None
+
+    def __len__(self):
+        return len(self._timers)
+
+    def start(self):
+        """Start the wheel thread"""
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="timer-wheel")
+            self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+            self._thread.start()
+
+    def schedule(self, delay, callback, *args, key=None):
+        """
+        Run callback(*args) after a delay
+
+        Args:
+            delay (float): Seconds from now
+            callback (callable): Function to run on a pool thread
+            *args: Arguments for the callback
+            key (hashable, optional): Timer name; scheduling a key again
+                replaces the pending timer with that key
+
+        Returns:
+            Timer: The armed timer
+        """
+        with self._lock:
+            now = time.monotonic() - self._origin
+            if not self._timers:
+                # The wheel was idle, so it can jump to the present without cascading
+                self._current = max(self._current, int(now / self.tick))
+            deadline = max(self._current + 1, math.ceil((now + delay) / self.tick))
+            timer = Timer(key, deadline, callback, args)
+            if key is not None:
+                previous = self._timers.pop(key, None)
+                if previous is not None:
+                    del previous.bucket[previous]
+                self._timers[key] = timer
+            else:
+                self._timers[timer] = timer
+            self._place(timer)
+            if len(self._timers) == 1:
+                self._armed.notify()
+        return timer
+
+    def cancel(self, key):
+        """
+        Cancel a pending timer
+
+        Args:
+            key: Timer name, or a Timer returned by schedule()
+
+        Returns:
+            bool: True if a pending timer was removed
+        """
+        with self._lock:
+            if isinstance(key, Timer):
+                timer = key
+                key = timer.key if timer.key is not None else timer
+                # The key may have been re-armed since this timer was returned
+                if self._timers.get(key) is not timer:
+                    return False
+            timer = self._timers.pop(key, None)
+            if timer is None:
+                return False
+            del timer.bucket[timer]
+            return True
+
+    def stop(self):
+        """Stop the wheel thread and drop pending timers"""
+        with self._lock:
+            self._stopped = True
+            self._armed.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._executor.shutdown(wait=False)
+
+    def _now_tick(self):
+        return int((time.monotonic() - self._origin) / self.tick)
+
+    def _place(self, timer):
+        """Put a timer in the slot matching its deadline (lock held)"""
+        deadline = timer.deadline
+        slot_span = 1
+        for level in range(self.levels):
+            round_span = slot_span * self.wheel_size
+            # The timer belongs to the lowest level whose current round it falls in
+            if deadline // round_span == self._current // round_span:
+                bucket = self._wheels[level][(deadline // slot_span) % self.wheel_size]
+                break
+            slot_span = round_span
+        else:
+            bucket = self._overflow
+        timer.bucket = bucket
+        bucket[timer] = timer
+
+    def _advance(self, expired):
+        """Move one tick forward, collecting expired timers (lock held)"""
+        self._current += 1
+        current = self._current
+
+        # Cascade higher levels whose slot boundary we just crossed
+        span = self.wheel_size
+        for level in range(1, self.levels + 1):
+            if current % span:
+                break
+            if level == self.levels:
+                bucket = self._overflow
+                self._overflow = {}
+            else:
+                bucket = self._wheels[level][(current // span) % self.wheel_size]
+                self._wheels[level][(current // span) % self.wheel_size] = {}
+            for timer in bucket:
+                self._place(timer)
+            span *= self.wheel_size
+
+        slot = current % self.wheel_size
+        bucket = self._wheels[0][slot]
+        if bucket:
+            self._wheels[0][slot] = {}
+            for timer in bucket:
+                self._timers.pop(timer.key if timer.key is not None else timer, None)
+                expired.append(timer)
+
+    def _run(self):
+        """Wheel thread: advance to the current time and fire expired timers"""
+        while True:
+            expired = []
+            with self._lock:
+                while not self._timers and not self._stopped:
+                    self._armed.wait()
+                if self._stopped:
+                    return
+                target = self._now_tick()
+                while self._current < target:
+                    self._advance(expired)
+
+            for start in range(0, len(expired), FIRE_BATCH_SIZE):
+                self._executor.submit(self._fire, expired[start:start + FIRE_BATCH_SIZE])
+
+            next_tick = self._origin + (self._current + 1) * self.tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _fire(self, timers):
+        """Run a batch of expired callbacks"""
+        for timer in timers:
+            try:
+                timer.callback(*timer.args)
+            except Exception:
+                logger.exception(f"Timer {timer.key!r} failed")
+
+_wheel = None
+_wheel_lock = threading.Lock()
+
+def get_timer_wheel():
+    """Get the shared timer wheel, starting it on first use"""
+    global _wheel
+    if _wheel is None:
+        from config import TIMER_WHEEL_TICK, TIMER_WORKERS
+        with _wheel_lock:
+            if _wheel is None:
+                wheel = TimerWheel(tick=TIMER_WHEEL_TICK, workers=TIMER_WORKERS)
+                wheel.start()
+                _wheel = wheel
+    return _wheel